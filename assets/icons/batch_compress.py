@@ -7,5 +7,7 @@ if __name__ == "__main__":
     # one.compress_svg()
     # one.generate_png()
     # one.compress_png()
+    # one.build_png() # in-memory alternative to generate_png + compress_png
+    # one.run_pipeline(upload=True) # all stages per asset, without stage barriers
     # one.upload_to_cloudflare_r2()
     one.generate_icon_list_md()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare one palette search per size (``PngQuantCmd``) against one shared
+palette search per icon (``SharedPaletteCmd``), for both quantization backends.
+
+The composite of the shared palette has as many pixels as all sizes together,
+and it adds a quality check and a PNG encode per size, so it only saves CPU
+time if one palette search per icon is cheaper than one per size. Every mode
+runs serially in this process, the CPU time includes the pngquant processes.
+
+Usage::
+
+    python manual_tests/benchmark_shared_palette.py
+"""
+
+import time
+import shutil
+
+from my_icon_vault.base import get_cpu_time, get_file_size
+from my_icon_vault.cairosvg_wrapper import PngTarget, Svg2PngMultiSizeCmd
+from my_icon_vault.pngquant_wrapper import PngQuantCmd
+from my_icon_vault.palette import SharedPaletteCmd
+from my_icon_vault.quantize import QuantizeBackendEnum
+from my_icon_vault.catalog import AssetCatalog
+from my_icon_vault.constants import size_list
+from my_icon_vault.paths import dir_tmp, path_bin_pngquant, path_catalog_db
+
+dir_bench = dir_tmp / "benchmark_shared_palette"
+
+
+def render() -> list[list[PngQuantCmd]]:
+    """
+    Render every size of every icon once, return the pngquant commands of
+    each icon, the output files are next to the renders.
+    """
+    shutil.rmtree(dir_bench, ignore_errors=True)
+    dir_bench.mkdir(parents=True)
+    catalog = AssetCatalog(path_db=path_catalog_db)
+    catalog.refresh()
+    groups = list()
+    for asset in catalog.list_assets():
+        targets = [
+            PngTarget(dir_bench / f"{asset.name}-{size}x{size}.png", size, size)
+            for size in size_list
+        ]
+        Svg2PngMultiSizeCmd(
+            path_in=asset.path_svg,
+            path_out=None,
+            targets=targets,
+        ).run()
+        groups.append(
+            [
+                PngQuantCmd(
+                    path_bin=path_bin_pngquant,
+                    path_in=target.path_out,
+                    path_out=target.path_out.with_suffix(".out.png"),
+                    quality_range=(25, 50),
+                    force=True,
+                )
+                for target in targets
+            ]
+        )
+    return groups
+
+
+def timeit(title: str, groups: list[list[PngQuantCmd]], func):
+    wall_start, cpu_start = time.perf_counter(), get_cpu_time()
+    for cmds in groups:
+        func(cmds)
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = get_cpu_time() - cpu_start
+    bytes_out = sum(get_file_size(cmd.path_out) for cmds in groups for cmd in cmds)
+    return title, len(groups), wall_time, cpu_time, bytes_out
+
+
+def set_backend(groups: list[list[PngQuantCmd]], backend: str):
+    for cmds in groups:
+        for cmd in cmds:
+            cmd.backend = backend
+
+
+if __name__ == "__main__":
+    groups = render()
+    results = list()
+    for backend in QuantizeBackendEnum:
+        set_backend(groups, backend.value)
+        results.extend(
+            [
+                timeit(
+                    f"{backend.value}, one palette per size",
+                    groups,
+                    lambda cmds: [cmd.run() for cmd in cmds],
+                ),
+                timeit(
+                    f"{backend.value}, one palette per size, batched",
+                    groups,
+                    lambda cmds: PngQuantCmd.batch_run(cmds),
+                ),
+                timeit(
+                    f"{backend.value}, shared palette",
+                    groups,
+                    lambda cmds: SharedPaletteCmd(
+                        path_in=None, path_out=None, cmds=cmds
+                    ).run(),
+                ),
+            ]
+        )
+    for title, n_icon, wall_time, cpu_time, bytes_out in results:
+        print(
+            f"{title:<45} {n_icon} icons {wall_time:8.3f} sec wall, "
+            f"{cpu_time:8.3f} sec CPU, {bytes_out:>10} bytes"
+        )
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compare one svgo process per file against batched svgo processes.
+
+Usage::
+
+    python manual_tests/benchmark_svgo_batch.py
+"""
+
+import time
+import shutil
+
+from my_icon_vault.svgo_wrapper import SvgoCmd
+from my_icon_vault.catalog import AssetCatalog
+from my_icon_vault.paths import dir_tmp, path_bin_svgo, path_catalog_db
+
+n_copy = 10  # number of copies of each icon in the corpus
+dir_bench = dir_tmp / "benchmark_svgo_batch"
+
+
+def make_cmds() -> list[SvgoCmd]:
+    shutil.rmtree(dir_bench, ignore_errors=True)
+    dir_bench.mkdir(parents=True)
+    catalog = AssetCatalog(path_db=path_catalog_db)
+    catalog.refresh()
+    cmds = list()
+    for asset in catalog.list_assets():
+        for i in range(n_copy):
+            path = dir_bench / f"{asset.name}-{i}.svg"
+            shutil.copyfile(asset.path_svg, path)
+            cmds.append(
+                SvgoCmd(
+                    path_bin=path_bin_svgo,
+                    path_in=path,
+                    path_out=path,
+                    precision=1,
+                    quite=True,
+                    multipass=True,
+                )
+            )
+    return cmds
+
+
+def timeit(title: str, func) -> tuple[str, int, float]:
+    cmds = make_cmds()  # fresh copies, so every mode optimizes the same input
+    start = time.perf_counter()
+    func(cmds)
+    elapsed = time.perf_counter() - start
+    return title, len(cmds), elapsed
+
+
+if __name__ == "__main__":
+    results = [
+        timeit(
+            "one process per file, serial",
+            lambda cmds: [cmd.run() for cmd in cmds],
+        ),
+        timeit(
+            "one process per file, parallel",
+            lambda cmds: SvgoCmd.parallel_run(cmds),
+        ),
+        timeit(
+            "batched, serial",
+            lambda cmds: SvgoCmd.batch_run(cmds),
+        ),
+        timeit(
+            "batched, parallel (chunk_size=50)",
+            lambda cmds: SvgoCmd.parallel_batch_run(cmds, chunk_size=50),
+        ),
+    ]
+    for title, n_file, elapsed in results:
+        print(
+            f"{title:<40} {n_file} files {elapsed:8.3f} sec, "
+            f"{n_file / elapsed:8.1f} files/sec"
+        )
@@ -1,5 +1,22 @@
 # -*- coding: utf-8 -*-
 
+from .base import BatchRunError
+from .base import CmdResult
 from .svgo_wrapper import SvgoCmd
+from .svgmin import SvgMinifier
 from .cairosvg_wrapper import Svg2PngCmd
-from .pngquant_wrapper import PngQuantCmd
\ No newline at end of file
+from .cairosvg_wrapper import PngTarget
+from .cairosvg_wrapper import Svg2PngMultiSizeCmd
+from .pngquant_wrapper import PngQuantCmd
+from .quantize import PillowQuantizer
+from .autotune import AutoTuner
+from .palette import SharedPaletteCmd
+from .render_quantize import RenderQuantizeCmd
+from .executor import WorkerPoolExecutor
+from .async_runner import AsyncCmdRunner
+from .report import RunReport
+from .tracing import Tracer
+from .catalog import AssetCatalog
+from .bundle import BundleReader
+from .atlas import AtlasBuilder
+from .client import IconClient
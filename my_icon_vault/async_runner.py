@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio Subprocess Runner - drive many tool processes from one Python process
+
+svgo and pngquant do all of their work in an external process, the Python side
+only waits for it. ``parallel_run`` forks one Python worker per CPU just to
+block in ``subprocess.run``. This module starts the tool processes with
+``asyncio.create_subprocess_exec`` from a single event loop instead, and bounds
+the number of concurrent processes with a semaphore. It uses no forked
+interpreters, and the number of concurrent tool processes doesn't depend on
+the number of Python workers.
+
+Example::
+
+    runner = AsyncCmdRunner(concurrency=16)
+    runner.run(svgo_cmds)  # sync entry point
+
+    async def main():
+        await runner.arun(pngquant_cmds)  # async entry point
+"""
+
+import typing as T
+import os
+import time
+import asyncio
+import dataclasses
+
+from .base import BatchRunError, CmdResult, BaseCmd
+
+
+class ToolCmd(T.Protocol):
+    """
+    A command that runs one external process, e.g.
+    :class:`~my_icon_vault.svgo_wrapper.SvgoCmd` or
+    :class:`~my_icon_vault.pngquant_wrapper.PngQuantCmd`.
+    """
+
+    path_in: T.Any
+
+    def to_args(self) -> list[str]: ...
+
+
+@dataclasses.dataclass
+class ProcessResult:
+    """
+    The outcome of one external process.
+    """
+
+    args: list[str] = dataclasses.field()
+    returncode: int = dataclasses.field()
+    stdout: bytes = dataclasses.field(default=b"")
+    stderr: bytes = dataclasses.field(default=b"")
+
+    @property
+    def is_succeeded(self) -> bool:
+        return self.returncode == 0
+
+
+async def run_process(args: list[str], input: bytes | None = None) -> ProcessResult:
+    """
+    Run one process to completion, optionally feeding ``input`` to its stdin.
+
+    Raises:
+        FileNotFoundError: If the executable is not found.
+    """
+    if input is None:
+        stdin = asyncio.subprocess.DEVNULL
+    else:
+        stdin = asyncio.subprocess.PIPE
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=stdin,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate(input)
+    return ProcessResult(
+        args=args,
+        returncode=process.returncode,
+        stdout=stdout,
+        stderr=stderr,
+    )
+
+
+@dataclasses.dataclass
+class AsyncCmdRunner:
+    """
+    Run tool commands concurrently from one asyncio event loop.
+
+    Args:
+        concurrency: Maximum number of tool processes running at the same time,
+            defaults to twice the number of CPUs.
+    """
+
+    concurrency: int = dataclasses.field(
+        default_factory=lambda: 2 * (os.cpu_count() or 1),
+    )
+
+    async def arun(
+        self,
+        cmds: T.Sequence[ToolCmd],
+        verbose: bool = False,
+    ) -> list[CmdResult]:
+        """
+        Run every command, at most :attr:`concurrency` at a time.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command, in the
+            same order. The CPU time of the tool processes is not measured.
+
+        Raises:
+            BatchRunError: If any command failed, after all commands finished.
+        """
+        # created per call, a semaphore is bound to the running event loop
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(ith: int, cmd: ToolCmd) -> CmdResult:
+            async with semaphore:
+                is_base_cmd = isinstance(cmd, BaseCmd)
+                if verbose:
+                    print(f"[{ith}] Compressing: {cmd.path_in}")
+                if verbose and is_base_cmd:
+                    cmd._log_before()
+                if is_base_cmd:
+                    result = cmd._new_result()
+                else:
+                    result = CmdResult(path_in=cmd.path_in)
+                result.start_time, result.pid = time.time(), os.getpid()
+                wall_start = time.perf_counter()
+                try:
+                    process_result = await run_process(cmd.to_args())
+                    result.returncode = process_result.returncode
+                    result.stderr = process_result.stderr.decode(
+                        "utf-8", errors="replace"
+                    )
+                except OSError as e:
+                    result.returncode = -1
+                    result.stderr = str(e)
+                result.wall_time = time.perf_counter() - wall_start
+                if result.is_succeeded and is_base_cmd:
+                    result.bytes_out = cmd._get_bytes_out()
+                    if verbose:
+                        cmd._log_after()
+                return result
+
+        results = await asyncio.gather(
+            *(run_one(i, cmd) for i, cmd in enumerate(cmds, start=1))
+        )
+        results = list(results)
+        failures = {
+            result.path_in: result.stderr.strip() or f"exit code {result.returncode}"
+            for result in results
+            if result.is_succeeded is False
+        }
+        if failures:
+            raise BatchRunError(failures, results=results)
+        return results
+
+    def run(
+        self,
+        cmds: T.Sequence[ToolCmd],
+        verbose: bool = False,
+    ) -> list[CmdResult]:
+        """
+        Sync entry point of :meth:`arun`, it can't be called from a running
+        event loop.
+        """
+        return asyncio.run(self.arun(cmds, verbose=verbose))
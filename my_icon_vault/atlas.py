@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sprite Atlas - every icon of one size in a few PNG files
+
+A page that shows 40 icons makes 40 requests for the individual PNG files.
+:class:`AtlasBuilder` packs all icons of one size into one atlas PNG, or more
+if they don't fit in ``max_size`` x ``max_size`` pixels, and writes a JSON and
+a CSS coordinate map next to it, so the page makes one request per atlas::
+
+    assets/atlas/icons-96.json    # coordinate map
+    assets/atlas/icons-96.css     # one class per icon, e.g. .icons-96-github
+    assets/atlas/icons-96-0.png   # atlas pages
+    assets/atlas/icons-96-1.png
+
+The icons are placed with a shelf packer: a page is a stack of shelves, a
+sprite goes on the shortest shelf that is tall enough and has room left, or on
+a new shelf on top, or on a new page. A full pack places the tallest sprites
+first.
+
+The packer state (the shelves of every page, and the free slots of removed
+icons) is saved in the JSON map, so a later build is incremental:
+
+- an icon whose content changed but not its dimensions keeps its slot;
+- a removed icon leaves a free slot, a new icon takes the first free slot it
+  fits in, or is packed after the existing shelves;
+- only the pages with a changed sprite are composed and quantized again.
+
+A change of ``max_size`` or ``padding`` repacks from scratch, a change of the
+quantization settings quantizes every page again. The JSON map::
+
+    {
+        "version": 1,
+        "size": 96,
+        "layout": {"max_size": 2048, "padding": 2},
+        "quantize": {"params": {...}, "tool_version": "..."},
+        "pages": [
+            {
+                "file": "icons-96-0.png",
+                "width": 2046,
+                "height": 1646,
+                "hash": "1a2b3c4d5e6f",
+                "shelves": [[0, 96, 2048], ...]
+            }
+        ],
+        "free": [[0, 98, 0, 96, 96]],
+        "sprites": {
+            "github": {
+                "page": 0, "x": 0, "y": 0, "width": 96, "height": 96,
+                "hash": "0f1e2d3c4b5a"
+            }
+        }
+    }
+
+``shelves`` are ``[y, height, next_x]`` and ``free`` slots are
+``[page, x, y, width, height]``, only the packer uses them.
+"""
+
+import typing as T
+import re
+import json
+import subprocess
+import dataclasses
+from pathlib import Path
+
+from PIL import Image
+
+from .paths import dir_atlas, path_bin_pngquant
+from .pngquant_wrapper import PngQuantCmd
+from .quantize import (
+    EXIT_CODE_QUALITY_TOO_LOW,
+    QuantizeBackendEnum,
+    QualityTooLowError,
+)
+from .palette import to_png_bytes
+from .publish import get_content_hash
+
+ATLAS_VERSION = 1
+
+#: maximum width and height of an atlas page
+DEFAULT_MAX_SIZE = 2048
+
+
+@dataclasses.dataclass
+class Sprite:
+    """
+    The slot of one icon in an atlas.
+    """
+
+    page: int = dataclasses.field()
+    x: int = dataclasses.field()
+    y: int = dataclasses.field()
+    width: int = dataclasses.field()
+    height: int = dataclasses.field()
+    hash: str = dataclasses.field()
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return dataclasses.asdict(self)
+
+
+@dataclasses.dataclass
+class Shelf:
+    y: int = dataclasses.field()
+    height: int = dataclasses.field()
+    next_x: int = dataclasses.field(default=0)
+
+
+@dataclasses.dataclass
+class AtlasPage:
+    """
+    One atlas PNG file.
+
+    Args:
+        file: The file name, relative to the JSON map.
+        shelves: The shelves of the packer.
+        hash: Content hash of the file, see
+            :func:`~my_icon_vault.publish.get_content_hash`.
+    """
+
+    file: str = dataclasses.field()
+    shelves: list[Shelf] = dataclasses.field(default_factory=list)
+    hash: str | None = dataclasses.field(default=None)
+
+    def get_dimensions(self, padding: int) -> tuple[int, int]:
+        if not self.shelves:
+            return 1, 1
+        width = max(shelf.next_x for shelf in self.shelves) - padding
+        height = max(shelf.y + shelf.height for shelf in self.shelves)
+        return max(1, width), max(1, height)
+
+
+@dataclasses.dataclass
+class AtlasMap:
+    """
+    The layout of the atlas of one size, and the shelf packer that maintains
+    it, see module docstring.
+    """
+
+    size: int = dataclasses.field()
+    prefix: str = dataclasses.field()
+    max_size: int = dataclasses.field(default=DEFAULT_MAX_SIZE)
+    padding: int = dataclasses.field(default=2)
+    quantize: dict[str, T.Any] = dataclasses.field(default_factory=dict)
+    pages: list[AtlasPage] = dataclasses.field(default_factory=list)
+    free: list[tuple[int, int, int, int, int]] = dataclasses.field(
+        default_factory=list
+    )
+    sprites: dict[str, Sprite] = dataclasses.field(default_factory=dict)
+
+    def _new_page(self) -> AtlasPage:
+        page = AtlasPage(file=f"{self.prefix}-{self.size}-{len(self.pages)}.png")
+        self.pages.append(page)
+        return page
+
+    def _place(self, width: int, height: int) -> tuple[int, int, int]:
+        """
+        Return the ``(page, x, y)`` of a new sprite.
+        """
+        if width > self.max_size or height > self.max_size:
+            raise ValueError(
+                f"a {width}x{height} sprite doesn't fit in a "
+                f"{self.max_size}x{self.max_size} atlas"
+            )
+        for i, (page, x, y, free_width, free_height) in enumerate(self.free):
+            if width <= free_width and height <= free_height:
+                del self.free[i]
+                return page, x, y
+        for i, page in enumerate(self.pages):
+            # the shortest shelf that fits wastes the least height
+            shelves = [
+                shelf
+                for shelf in page.shelves
+                if height <= shelf.height and shelf.next_x + width <= self.max_size
+            ]
+            if shelves:
+                shelf = min(shelves, key=lambda shelf: shelf.height)
+                x = shelf.next_x
+                shelf.next_x += width + self.padding
+                return i, x, shelf.y
+            top = (
+                max(shelf.y + shelf.height for shelf in page.shelves) + self.padding
+                if page.shelves
+                else 0
+            )
+            if top + height <= self.max_size:
+                page.shelves.append(
+                    Shelf(y=top, height=height, next_x=width + self.padding)
+                )
+                return i, 0, top
+        self._new_page()
+        return self._place(width, height)
+
+    def insert(self, name: str, width: int, height: int, hash: str) -> Sprite:
+        page, x, y = self._place(width, height)
+        sprite = Sprite(page=page, x=x, y=y, width=width, height=height, hash=hash)
+        self.sprites[name] = sprite
+        return sprite
+
+    def remove(self, name: str) -> Sprite:
+        """
+        Remove a sprite, its slot is reused by a later :meth:`insert`.
+        """
+        sprite = self.sprites.pop(name)
+        self.free.append(
+            (sprite.page, sprite.x, sprite.y, sprite.width, sprite.height)
+        )
+        return sprite
+
+    def get_page_sprites(self, page: int) -> dict[str, Sprite]:
+        return {
+            name: sprite for name, sprite in self.sprites.items() if sprite.page == page
+        }
+
+    def to_dict(self) -> dict[str, T.Any]:
+        pages = list()
+        for page in self.pages:
+            width, height = page.get_dimensions(self.padding)
+            pages.append(
+                {
+                    "file": page.file,
+                    "width": width,
+                    "height": height,
+                    "hash": page.hash,
+                    "shelves": [
+                        [shelf.y, shelf.height, shelf.next_x] for shelf in page.shelves
+                    ],
+                }
+            )
+        return {
+            "version": ATLAS_VERSION,
+            "size": self.size,
+            "layout": {"max_size": self.max_size, "padding": self.padding},
+            "quantize": self.quantize,
+            "pages": pages,
+            "free": [list(slot) for slot in self.free],
+            "sprites": {
+                name: sprite.to_dict() for name, sprite in sorted(self.sprites.items())
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any], prefix: str) -> "AtlasMap":
+        return cls(
+            size=data["size"],
+            prefix=prefix,
+            max_size=data["layout"]["max_size"],
+            padding=data["layout"]["padding"],
+            quantize=data["quantize"],
+            pages=[
+                AtlasPage(
+                    file=page["file"],
+                    shelves=[Shelf(*shelf) for shelf in page["shelves"]],
+                    hash=page["hash"],
+                )
+                for page in data["pages"]
+            ],
+            free=[tuple(slot) for slot in data["free"]],
+            sprites={
+                name: Sprite(**sprite) for name, sprite in data["sprites"].items()
+            },
+        )
+
+    def to_css(self) -> str:
+        """
+        One class per icon, the atlas URL has the content hash of the page as
+        query string, so a changed page is never served from a stale cache.
+        """
+        base = f"{self.prefix}-{self.size}"
+        lines = [
+            f".{base} {{",
+            "    display: inline-block;",
+            "    background-repeat: no-repeat;",
+            "}",
+        ]
+        for name, sprite in sorted(self.sprites.items()):
+            page = self.pages[sprite.page]
+            lines.extend(
+                [
+                    f".{base}-{to_css_class(name)} {{",
+                    f'    background-image: url("{page.file}?v={page.hash}");',
+                    f"    background-position: -{sprite.x}px -{sprite.y}px;",
+                    f"    width: {sprite.width}px;",
+                    f"    height: {sprite.height}px;",
+                    "}",
+                ]
+            )
+        return "\n".join(lines) + "\n"
+
+
+def to_css_class(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "-", name)
+
+
+@dataclasses.dataclass
+class AtlasBuilder:
+    """
+    Build and incrementally update the sprite atlases, see module docstring.
+
+    Args:
+        dir_out: Directory of the atlas files.
+        prefix: File name prefix and CSS class prefix.
+        max_size: Maximum width and height of a page.
+        padding: Transparent pixels between sprites, so scaled sprites don't
+            bleed into each other.
+        quality_range: pngquant quality range (min, max) of the pages. A page
+            below the minimum keeps its unquantized pixels.
+        speed: pngquant speed/quality trade-off.
+        path_bin: Path to the pngquant binary executable.
+        backend: Quantization backend, see :mod:`my_icon_vault.quantize`.
+
+    Example:
+        >>> builder = AtlasBuilder()
+        >>> atlas_map = builder.build(96, {"github": Path("github-96x96.png")})
+        >>> atlas_map.sprites["github"]
+        Sprite(page=0, x=0, y=0, width=96, height=96, hash='0f1e2d3c4b5a')
+    """
+
+    dir_out: Path = dataclasses.field(default=dir_atlas)
+    prefix: str = dataclasses.field(default="icons")
+    max_size: int = dataclasses.field(default=DEFAULT_MAX_SIZE)
+    padding: int = dataclasses.field(default=2)
+    quality_range: tuple[int, int] = dataclasses.field(default=(25, 80))
+    speed: int | None = dataclasses.field(default=None)
+    path_bin: Path = dataclasses.field(default=path_bin_pngquant)
+    backend: str = dataclasses.field(default=QuantizeBackendEnum.pngquant.value)
+
+    def get_path_map(self, size: int) -> Path:
+        return self.dir_out / f"{self.prefix}-{size}.json"
+
+    def get_path_css(self, size: int) -> Path:
+        return self.dir_out / f"{self.prefix}-{size}.css"
+
+    def to_pngquant_cmd(self) -> PngQuantCmd:
+        return PngQuantCmd(
+            path_bin=self.path_bin,
+            path_in=None,
+            path_out=None,
+            quality_range=self.quality_range,
+            speed=self.speed,
+            backend=self.backend,
+        )
+
+    def get_quantize_settings(self) -> dict[str, T.Any]:
+        cmd = self.to_pngquant_cmd()
+        settings = {"params": cmd.to_params(), "tool_version": cmd.get_tool_version()}
+        # as loaded from the JSON map, e.g. tuples become lists
+        return json.loads(json.dumps(settings))
+
+    def load_map(self, size: int) -> AtlasMap | None:
+        """
+        Load the map of the last build, return None if there is none, or if it
+        was written by an incompatible version.
+        """
+        try:
+            data = json.loads(self.get_path_map(size).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        if data.get("version") != ATLAS_VERSION:
+            return None
+        return AtlasMap.from_dict(data, prefix=self.prefix)
+
+    def list_files(self, size: int) -> list[Path]:
+        """
+        Return the files of the atlas of a size, e.g. to publish them.
+        """
+        atlas_map = self.load_map(size)
+        if atlas_map is None:
+            return []
+        return [
+            self.get_path_map(size),
+            self.get_path_css(size),
+            *(self.dir_out / page.file for page in atlas_map.pages),
+        ]
+
+    def _quantize(self, image: Image.Image) -> bytes:
+        data = to_png_bytes(image, optimize=False)
+        try:
+            return self.to_pngquant_cmd().to_quantizer().quantize_bytes(data)
+        except QualityTooLowError:
+            pass
+        except subprocess.CalledProcessError as e:
+            if e.returncode != EXIT_CODE_QUALITY_TOO_LOW:
+                raise
+        return to_png_bytes(image)
+
+    def _render_page(
+        self,
+        atlas_map: AtlasMap,
+        page: int,
+        paths: dict[str, Path],
+    ):
+        atlas_page = atlas_map.pages[page]
+        canvas = Image.new(
+            "RGBA", atlas_page.get_dimensions(atlas_map.padding), (0, 0, 0, 0)
+        )
+        for name, sprite in atlas_map.get_page_sprites(page).items():
+            with Image.open(paths[name]) as image:
+                canvas.paste(image.convert("RGBA"), (sprite.x, sprite.y))
+        path_page = self.dir_out / atlas_page.file
+        path_page.write_bytes(self._quantize(canvas))
+        atlas_page.hash = get_content_hash(path_page)
+
+    def build(
+        self,
+        size: int,
+        paths: dict[str, Path],
+        force: bool = False,
+        verbose: bool = False,
+    ) -> AtlasMap:
+        """
+        Pack the icons of one size, and write the atlas pages and maps.
+
+        Args:
+            size: The icon size, only used in the file names.
+            paths: ``{name: path}`` of the icon PNG files.
+            force: If True, repack and quantize every page.
+
+        Returns:
+            The new :class:`AtlasMap`.
+        """
+        self.dir_out.mkdir(parents=True, exist_ok=True)
+        hashes = {name: get_content_hash(path) for name, path in paths.items()}
+        quantize = self.get_quantize_settings()
+        previous = self.load_map(size)
+        atlas_map = None if force else previous
+        if atlas_map is not None and (atlas_map.max_size, atlas_map.padding) != (
+            self.max_size,
+            self.padding,
+        ):
+            atlas_map = None
+
+        dirty: set[int] = set()
+        if atlas_map is None:
+            n_pages = 0 if previous is None else len(previous.pages)
+            atlas_map = AtlasMap(
+                size=size,
+                prefix=self.prefix,
+                max_size=self.max_size,
+                padding=self.padding,
+            )
+            dimensions = dict()
+            for name, path in paths.items():
+                with Image.open(path) as image:
+                    dimensions[name] = image.size
+            # tallest first, then widest, so the shelves are well filled
+            for name in sorted(
+                paths,
+                key=lambda name: (-dimensions[name][1], -dimensions[name][0], name),
+            ):
+                atlas_map.insert(name, *dimensions[name], hash=hashes[name])
+            dirty.update(range(len(atlas_map.pages)))
+            # remove the pages the new layout doesn't need
+            for page in range(len(atlas_map.pages), n_pages):
+                self.dir_out.joinpath(f"{self.prefix}-{size}-{page}.png").unlink(
+                    missing_ok=True
+                )
+        else:
+            for name in sorted(set(atlas_map.sprites).difference(paths)):
+                dirty.add(atlas_map.remove(name).page)
+            for name in sorted(paths):
+                sprite = atlas_map.sprites.get(name)
+                if sprite is not None and sprite.hash == hashes[name]:
+                    continue
+                with Image.open(paths[name]) as image:
+                    width, height = image.size
+                if sprite is not None:
+                    if (sprite.width, sprite.height) == (width, height):
+                        sprite.hash = hashes[name]
+                        dirty.add(sprite.page)
+                        continue
+                    dirty.add(atlas_map.remove(name).page)
+                dirty.add(atlas_map.insert(name, width, height, hashes[name]).page)
+            if atlas_map.quantize != quantize:
+                dirty.update(range(len(atlas_map.pages)))
+            for page, atlas_page in enumerate(atlas_map.pages):
+                if not self.dir_out.joinpath(atlas_page.file).exists():
+                    dirty.add(page)
+
+        atlas_map.quantize = quantize
+        for page in sorted(dirty):
+            self._render_page(atlas_map, page, paths)
+        if verbose:
+            print(
+                f"[atlas] {size}px: {len(atlas_map.sprites)} icons in "
+                f"{len(atlas_map.pages)} pages, {len(dirty)} pages rebuilt"
+            )
+        self.get_path_map(size).write_text(
+            json.dumps(atlas_map.to_dict(), indent=4) + "\n", encoding="utf-8"
+        )
+        self.get_path_css(size).write_text(atlas_map.to_css(), encoding="utf-8")
+        return atlas_map
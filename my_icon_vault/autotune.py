@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+"""
+Quality Auto-Tuning - the smallest PNG above a perceptual threshold
+
+:meth:`~my_icon_vault.structure.IconAsset.to_pngquant_cmds` uses one quality
+range for every icon, which is too lossy for gradients and wasteful for flat
+logos. :class:`AutoTuner` searches the pngquant settings per asset and size
+instead:
+
+1. quantize the unquantized render (the output of the ``generate_png`` stage)
+   with every candidate ``(quality, ncolors)``, where ``quality`` is the
+   maximum of the pngquant ``quality_range``;
+2. score each output against the render with SSIM or PSNR, computed with
+   NumPy on premultiplied RGBA, see :mod:`my_icon_vault.raster`;
+3. pick the smallest output whose score reaches the threshold, or the best
+   scoring one if none does.
+
+For a fixed ``ncolors`` a higher quality gives a better score and a larger
+file, so the search walks the qualities upwards and stops at the first one
+that passes.
+
+The chosen settings are cached in :class:`AutoTuneCache`, keyed by the SHA256
+of the render and by the tuner settings, so a later build only searches the
+renders that changed::
+
+    {
+        "version": 1,
+        "assets": {
+            "github": {
+                "96": {
+                    "input_hash": "9f86d0...",
+                    "key": "5e8848...",
+                    "quality_range": [0, 50],
+                    "ncolors": 64,
+                    "score": 0.9931,
+                    "bytes_out": 1234
+                }
+            }
+        }
+    }
+
+.. note::
+
+    NumPy is an optional dependency, install it with
+    ``pip install my_icon_vault[raster]``.
+"""
+
+import typing as T
+import io
+import enum
+import json
+import hashlib
+import dataclasses
+from pathlib import Path
+
+from .paths import path_bin_pngquant
+from .manifest import get_file_sha256
+from .executor import WorkerPoolExecutor, parallel_map
+from .pngquant_wrapper import PngQuantCmd
+from .quantize import QuantizeBackendEnum
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .structure import IconAsset
+
+AUTOTUNE_CACHE_VERSION = 1
+
+
+class MetricEnum(str, enum.Enum):
+    ssim = "ssim"
+    psnr = "psnr"
+
+
+#: default threshold of each metric
+DEFAULT_THRESHOLDS = {
+    MetricEnum.ssim.value: 0.99,
+    MetricEnum.psnr.value: 38.0,
+}
+
+
+@dataclasses.dataclass
+class TuneResult:
+    """
+    The chosen pngquant settings of one render.
+
+    Args:
+        input_hash: SHA256 of the render.
+        key: :meth:`AutoTuner.get_key` of the tuner that chose the settings.
+        quality_range: pngquant quality range (min, max).
+        ncolors: Number of colors in the output palette.
+        score: Score of the output, see :attr:`AutoTuner.metric`.
+        bytes_out: Size of the output.
+    """
+
+    input_hash: str = dataclasses.field()
+    key: str = dataclasses.field()
+    quality_range: tuple[int, int] = dataclasses.field()
+    ncolors: int = dataclasses.field()
+    score: float = dataclasses.field()
+    bytes_out: int = dataclasses.field()
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "TuneResult":
+        data = dict(data)
+        data["quality_range"] = tuple(data["quality_range"])
+        return cls(**data)
+
+
+#: ``{asset_name: {size: TuneResult}}``
+TuneSettings = dict[str, dict[int, TuneResult]]
+
+
+@dataclasses.dataclass
+class AutoTuneCache:
+    """
+    Persisted :data:`TuneSettings`, see module docstring.
+    """
+
+    path: Path = dataclasses.field()
+    assets: TuneSettings = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "AutoTuneCache":
+        """
+        Load the cache from disk, return an empty cache if the file does not
+        exist or was written by an incompatible version.
+        """
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path=path)
+        if data.get("version") != AUTOTUNE_CACHE_VERSION:
+            return cls(path=path)
+        assets = {
+            name: {
+                int(size): TuneResult.from_dict(result)
+                for size, result in sizes.items()
+            }
+            for name, sizes in data.get("assets", {}).items()
+        }
+        return cls(path=path, assets=assets)
+
+    def dump(self):
+        data = {
+            "version": AUTOTUNE_CACHE_VERSION,
+            "assets": {
+                name: {
+                    str(size): result.to_dict()
+                    for size, result in sorted(sizes.items())
+                }
+                for name, sizes in sorted(self.assets.items())
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=4) + "\n", encoding="utf-8")
+
+    def get(self, name: str, size: int) -> TuneResult | None:
+        return self.assets.get(name, {}).get(size)
+
+    def update(self, name: str, size: int, result: TuneResult):
+        self.assets.setdefault(name, dict())[size] = result
+
+    def prune(self, names: T.Iterable[str]):
+        """
+        Remove the results of assets that no longer exist.
+        """
+        names = set(names)
+        for name in list(self.assets):
+            if name not in names:
+                self.assets.pop(name)
+
+
+def _to_premultiplied_array(data: bytes):
+    import numpy as np  # NumPy is an optional dependency
+    from PIL import Image
+
+    from . import raster
+
+    with Image.open(io.BytesIO(data)) as image:
+        return raster.premultiply(np.asarray(image.convert("RGBA")))
+
+
+@dataclasses.dataclass
+class AutoTuner:
+    """
+    Search the smallest pngquant output above a quality threshold, see
+    module docstring.
+
+    Args:
+        metric: ``"ssim"`` or ``"psnr"``.
+        threshold: Minimum score, defaults to :data:`DEFAULT_THRESHOLDS`.
+        qualities: Candidate maximum qualities, searched in ascending order.
+        ncolors_list: Candidate palette sizes.
+        speed: pngquant speed/quality trade-off.
+        path_bin: Path to the pngquant binary executable.
+        backend: Quantization backend, see :mod:`my_icon_vault.quantize`.
+
+    Example:
+        >>> tuner = AutoTuner(metric="ssim", threshold=0.99)
+        >>> result = tuner.tune_png(Path("tmp/github-96x96.png"))
+        >>> result.quality_range, result.ncolors
+        ((0, 50), 64)
+    """
+
+    metric: str = dataclasses.field(default=MetricEnum.ssim.value)
+    threshold: float | None = dataclasses.field(default=None)
+    qualities: tuple[int, ...] = dataclasses.field(default=(20, 35, 50, 65, 80, 90))
+    ncolors_list: tuple[int, ...] = dataclasses.field(default=(16, 64, 256))
+    speed: int | None = dataclasses.field(default=None)
+    path_bin: Path = dataclasses.field(default=path_bin_pngquant)
+    backend: str = dataclasses.field(default=QuantizeBackendEnum.pngquant.value)
+
+    def __post_init__(self):
+        self.metric = MetricEnum(self.metric).value
+        if self.threshold is None:
+            self.threshold = DEFAULT_THRESHOLDS[self.metric]
+
+    def to_pngquant_cmd(self, quality: int, ncolors: int) -> PngQuantCmd:
+        return PngQuantCmd(
+            path_bin=self.path_bin,
+            path_in=None,
+            path_out=None,
+            quality_range=(0, quality),
+            speed=self.speed,
+            ncolors=ncolors,
+            backend=self.backend,
+        )
+
+    def get_key(self) -> str:
+        """
+        Return a hash of everything that determines the chosen settings,
+        a cached result with another key is searched again.
+        """
+        settings = {
+            "metric": self.metric,
+            "threshold": self.threshold,
+            "qualities": list(self.qualities),
+            "ncolors_list": list(self.ncolors_list),
+            "speed": self.speed,
+            "backend": self.backend,
+            "tool_version": self.to_pngquant_cmd(100, 256).get_tool_version(),
+        }
+        data = json.dumps(settings, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def score(self, reference, data: bytes) -> float:
+        """
+        Score a quantized PNG against the premultiplied reference array.
+        """
+        from . import raster  # NumPy is an optional dependency
+
+        arr = _to_premultiplied_array(data)
+        if self.metric == MetricEnum.psnr.value:
+            return raster.psnr(reference, arr)
+        return raster.ssim(reference, arr)
+
+    def tune_png(self, path_png: Path, key: str | None = None) -> TuneResult:
+        """
+        Search the settings of one render.
+
+        Args:
+            path_png: The unquantized render.
+            key: :meth:`get_key`, pass it to avoid recomputing it per file.
+        """
+        data = path_png.read_bytes()
+        reference = _to_premultiplied_array(data)
+        candidates = list()  # (bytes_out, score, quality, ncolors)
+        for ncolors in self.ncolors_list:
+            for quality in sorted(self.qualities):
+                quantizer = self.to_pngquant_cmd(quality, ncolors).to_quantizer()
+                png = quantizer.quantize_bytes(data)
+                score = self.score(reference, png)
+                candidates.append((len(png), score, quality, ncolors))
+                # a higher quality only makes the file larger
+                if score >= self.threshold:
+                    break
+        passing = [c for c in candidates if c[1] >= self.threshold]
+        if passing:
+            bytes_out, score, quality, ncolors = min(passing, key=lambda c: c[0])
+        else:
+            bytes_out, score, quality, ncolors = max(
+                candidates, key=lambda c: (c[1], -c[0])
+            )
+        return TuneResult(
+            input_hash=hashlib.sha256(data).hexdigest(),
+            key=self.get_key() if key is None else key,
+            quality_range=(0, quality),
+            ncolors=ncolors,
+            score=score,
+            bytes_out=bytes_out,
+        )
+
+    def tune(
+        self,
+        assets: list["IconAsset"],
+        cache: AutoTuneCache,
+        executor: WorkerPoolExecutor | None = None,
+    ) -> TuneSettings:
+        """
+        Return the settings of every render of the assets. The renders that
+        changed since they were cached are searched in parallel, and the
+        cache is written back.
+
+        A render that doesn't exist (e.g. ``tmp/`` was cleaned) keeps its
+        cached settings.
+        """
+        key = self.get_key()
+        settings: TuneSettings = dict()
+        tasks = list()
+        for asset in assets:
+            for size, path_png in asset.get_render_paths().items():
+                cached = cache.get(asset.name, size)
+                if path_png.exists() is False:
+                    if cached is not None:
+                        settings.setdefault(asset.name, dict())[size] = cached
+                    continue
+                if (
+                    cached is not None
+                    and cached.key == key
+                    and cached.input_hash == get_file_sha256(path_png)
+                ):
+                    settings.setdefault(asset.name, dict())[size] = cached
+                    continue
+                tasks.append(
+                    {
+                        "tuner": self,
+                        "name": asset.name,
+                        "size": size,
+                        "path_png": path_png,
+                        "key": key,
+                    }
+                )
+        if tasks:
+            print(f"[auto_tune] searching {len(tasks)} renders")
+            results = parallel_map(_tune_main, tasks, executor=executor)
+            for task, result in zip(tasks, results):
+                settings.setdefault(task["name"], dict())[task["size"]] = result
+                cache.update(task["name"], task["size"], result)
+            cache.dump()
+        return settings
+
+
+# module level function, so it can be sent to a reused worker pool
+def _tune_main(
+    tuner: AutoTuner,
+    name: str,
+    size: int,
+    path_png: Path,
+    key: str,
+) -> TuneResult:
+    return tuner.tune_png(path_png, key=key)
@@ -1,15 +1,273 @@
 # -*- coding: utf-8 -*-
 
+import typing as T
+import os
+import time
+import locale
+import tempfile
+import threading
+import contextlib
+import subprocess
 import dataclasses
 from pathlib import Path
 from pathlib_mate.mate_tool_box import repr_data_size
 
+from .profiler import profile_block
+
+
+def get_file_size(path: Path | None) -> int:
+    """
+    Return the file size in bytes, 0 if there is no such file.
+    """
+    if path is None:
+        return 0
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+# CPU time of the tool processes started by each thread, see :func:`run_tool`
+_thread_local = threading.local()
+
+
+def get_cpu_time() -> float:
+    """
+    Return the CPU time in seconds of the calling thread plus the tool
+    processes (e.g. svgo and pngquant) it ran with :func:`run_tool`.
+
+    Unlike the process wide :func:`os.times`, commands that run concurrently
+    in the threads of one process are not charged each other's CPU time.
+    """
+    return time.thread_time() + getattr(_thread_local, "child_cpu_time", 0.0)
+
+
+def _wait(process: subprocess.Popen) -> float:
+    """
+    Reap the process and return its own CPU time, 0.0 on platforms without
+    :func:`os.wait4`.
+    """
+    if not hasattr(os, "wait4"):  # pragma: no cover
+        process.wait()
+        return 0.0
+    _, status, rusage = os.wait4(process.pid, 0)
+    # the process is reaped, Popen must not wait for it again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage.ru_utime + rusage.ru_stime
+
+
+def run_tool(
+    args: list[str],
+    input: bytes | str | None = None,
+    text: bool = False,
+    check: bool = False,
+) -> subprocess.CompletedProcess:
+    """
+    Same as ``subprocess.run(args, input=input, capture_output=True, ...)``,
+    and add the CPU time of the process to the calling thread,
+    see :func:`get_cpu_time`.
+
+    The standard streams are anonymous temp files instead of pipes, so the
+    process can be reaped with :func:`os.wait4`, which returns its resource
+    usage, without reading the pipes concurrently.
+
+    Raises:
+        subprocess.CalledProcessError: If ``check`` is True and the process
+            exits with non-zero status.
+    """
+    encoding = locale.getpreferredencoding(False)
+    if isinstance(input, str):
+        input = input.encode(encoding)
+    with contextlib.ExitStack() as stack:
+        f_in = None
+        if input is not None:
+            f_in = stack.enter_context(tempfile.TemporaryFile())
+            f_in.write(input)
+            f_in.seek(0)
+        f_out = stack.enter_context(tempfile.TemporaryFile())
+        f_err = stack.enter_context(tempfile.TemporaryFile())
+        process = subprocess.Popen(args, stdin=f_in, stdout=f_out, stderr=f_err)
+        try:
+            cpu_time = _wait(process)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        f_out.seek(0)
+        f_err.seek(0)
+        stdout, stderr = f_out.read(), f_err.read()
+    _thread_local.child_cpu_time = (
+        getattr(_thread_local, "child_cpu_time", 0.0) + cpu_time
+    )
+    if text:
+        stdout, stderr = stdout.decode(encoding), stderr.decode(encoding)
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode, args, output=stdout, stderr=stderr
+        )
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+
+@dataclasses.dataclass
+class CmdResult:
+    """
+    The outcome of one command on one input file.
+
+    :param path_in: the input file.
+    :param path_out: the output file, None for commands with multiple outputs.
+    :param wall_time: elapsed time in seconds.
+    :param cpu_time: CPU time in seconds of the thread that ran the command,
+        including its tool processes, see :func:`get_cpu_time`.
+    :param bytes_in: size of the input file before the command ran.
+    :param bytes_out: total size of the output files.
+    :param returncode: exit status, 0 if the command succeeded.
+    :param stderr: the error output of the tool.
+    :param start_time: seconds since the epoch when the command started,
+        comparable across processes, used by :mod:`my_icon_vault.tracing`.
+    :param pid: the process that ran the command.
+    """
+
+    path_in: Path | None = dataclasses.field()
+    path_out: Path | None = dataclasses.field(default=None)
+    wall_time: float = dataclasses.field(default=0.0)
+    cpu_time: float = dataclasses.field(default=0.0)
+    bytes_in: int = dataclasses.field(default=0)
+    bytes_out: int = dataclasses.field(default=0)
+    returncode: int = dataclasses.field(default=0)
+    stderr: str = dataclasses.field(default="")
+    start_time: float = dataclasses.field(default=0.0)
+    pid: int = dataclasses.field(default=0)
+
+    @property
+    def is_succeeded(self) -> bool:
+        return self.returncode == 0
+
+    @property
+    def compression_ratio(self) -> float | None:
+        """
+        ``bytes_out / bytes_in``, lower is better.
+        """
+        if self.bytes_in == 0:
+            return None
+        return self.bytes_out / self.bytes_in
+
+    def to_dict(self) -> dict[str, T.Any]:
+        data = dataclasses.asdict(self)
+        for key in ["path_in", "path_out"]:
+            if data[key] is not None:
+                data[key] = str(data[key])
+        data["compression_ratio"] = self.compression_ratio
+        return data
+
+
+class BatchRunError(Exception):
+    """
+    Raised when some files of a batched command failed. The other files
+    of the batch were processed successfully.
+
+    :param failures: mapping of the failed input file to the tool error message.
+    :param results: the result of every file of the batch, including the
+        failed ones, if available. Usually :class:`CmdResult`, the uploader
+        uses :class:`~my_icon_vault.uploader.UploadResult`.
+    """
+
+    def __init__(
+        self,
+        failures: dict[Path, str],
+        results: list[T.Any] | None = None,
+    ):
+        self.failures = failures
+        self.results = results if results is not None else []
+        lines = [f"{len(failures)} file(s) failed:"]
+        for path, error in failures.items():
+            lines.append(f"  {path}: {error}")
+        super().__init__("\n".join(lines))
+
 
 @dataclasses.dataclass
 class BaseCmd:
     path_in: Path = dataclasses.field()
     path_out: Path | None = dataclasses.field()
 
+    # fields that don't affect the content of the output file,
+    # they are excluded from :meth:`to_params`
+    _non_param_fields = ("path_in", "path_out", "path_bin")
+
+    def to_params(self) -> dict[str, T.Any]:
+        """
+        Return the parameters that determine the output content, used by
+        the build manifest to detect parameter changes.
+        """
+        return {
+            field.name: getattr(self, field.name)
+            for field in dataclasses.fields(self)
+            if field.name not in self._non_param_fields
+        }
+
+    def _get_bytes_in(self) -> int:
+        return get_file_size(self.path_in)
+
+    def _get_bytes_out(self) -> int:
+        return get_file_size(self.path_out)
+
+    def _new_result(self) -> CmdResult:
+        return CmdResult(
+            path_in=self.path_in,
+            path_out=self.path_out,
+            bytes_in=self._get_bytes_in(),
+        )
+
+    @contextlib.contextmanager
+    def _measure(self, profile_dir: Path | None = None) -> T.Iterator[CmdResult]:
+        """
+        Measure the command executed in the with block, the block may
+        set :attr:`CmdResult.stderr`. If ``profile_dir`` is given, also
+        profile it, see :mod:`my_icon_vault.profiler`.
+
+        Example:
+            >>> with self._measure() as result:
+            ...     res = subprocess.run(args, check=True, capture_output=True, text=True)
+            ...     result.stderr = res.stderr
+            >>> return result
+        """
+        result = self._new_result()
+        result.start_time, result.pid = time.time(), os.getpid()
+        wall_start, cpu_start = time.perf_counter(), get_cpu_time()
+        with profile_block(profile_dir, label=str(self.path_in)):
+            yield result
+        result.wall_time = time.perf_counter() - wall_start
+        result.cpu_time = get_cpu_time() - cpu_start
+        result.bytes_out = self._get_bytes_out()
+
+    @classmethod
+    @contextlib.contextmanager
+    def _measure_batch(
+        cls,
+        cmds: list["BaseCmd"],
+        profile_dir: Path | None = None,
+    ) -> T.Iterator[list[CmdResult]]:
+        """
+        Same as :meth:`_measure` for commands that run in one process.
+        The time of the batch is split evenly between its commands, the with
+        block sets :attr:`CmdResult.returncode` of the failed commands.
+        """
+        results = [cmd._new_result() for cmd in cmds]
+        start_time = time.time()
+        wall_start, cpu_start = time.perf_counter(), get_cpu_time()
+        label = f"{cmds[0].path_in} (+{len(cmds) - 1} files)"
+        with profile_block(profile_dir, label=label):
+            yield results
+        wall_time = (time.perf_counter() - wall_start) / max(1, len(cmds))
+        cpu_time = (get_cpu_time() - cpu_start) / max(1, len(cmds))
+        for ith, (cmd, result) in enumerate(zip(cmds, results)):
+            # the commands are laid out back to back in the batch time
+            result.start_time = start_time + ith * wall_time
+            result.pid = os.getpid()
+            result.wall_time = wall_time
+            result.cpu_time = cpu_time
+            if result.is_succeeded:
+                result.bytes_out = cmd._get_bytes_out()
+
     def _log_before(self):
         self._size_before = self.path_in.stat().st_size
 
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark Suite - time every stage over a reproducible synthetic icon corpus
+
+:class:`CorpusSpec` generates a corpus of random but reproducible SVG icons
+(same seed, same bytes) with a configurable number of icons, paths, gradients
+and embedded rasters. :class:`Benchmark` times each stage on that corpus,
+serially and in parallel, and reports the throughput in icons / sec and
+bytes / sec:
+
+- ``svgo``: :class:`~my_icon_vault.svgo_wrapper.SvgoCmd`
+- ``svg2png``: :class:`~my_icon_vault.cairosvg_wrapper.Svg2PngCmd`, one command per size
+- ``pngquant``: :class:`~my_icon_vault.pngquant_wrapper.PngQuantCmd` on the ``svg2png`` outputs
+- ``manifest``: list the corpus, hash the SVG files and check the build manifest
+- ``upload``: :class:`~my_icon_vault.uploader.R2Uploader` against any S3
+  compatible endpoint, e.g. a local ``moto`` stand-in
+
+Example::
+
+    benchmark = Benchmark(
+        spec=CorpusSpec(n_icons=500, n_paths=20, n_gradients=2),
+        dir_root=dir_tmp / "benchmark",
+    )
+    benchmark.run(stages=["svgo", "svg2png", "pngquant", "manifest"])
+    benchmark.print_table()
+    benchmark.dump(dir_tmp / "benchmark.json")
+
+The load tests in ``tests_load/`` run it on a small corpus.
+"""
+
+import typing as T
+import json
+import time
+import zlib
+import base64
+import random
+import shutil
+import struct
+import dataclasses
+from pathlib import Path
+from functools import cached_property
+
+from s3pathlib import S3Path
+
+from .constants import size_list
+from .paths import path_bin_svgo, path_bin_pngquant
+from .manifest import get_file_sha256, StageRecord, BuildManifest
+from .svgo_wrapper import SvgoCmd
+from .pngquant_wrapper import PngQuantCmd
+from .executor import WorkerPoolExecutor
+from .uploader import UploadTask, R2Uploader
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .cairosvg_wrapper import Svg2PngCmd
+
+
+def encode_png(width: int, height: int, rgb: bytes) -> bytes:
+    """
+    Encode 8 bit RGB pixels to a minimal PNG file, without any dependency.
+    """
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+    stride = width * 3
+    # filter type 0 (none) at the start of every row
+    raw = b"".join(
+        b"\x00" + rgb[y * stride : (y + 1) * stride] for y in range(height)
+    )
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            chunk(b"IDAT", zlib.compress(raw)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+@dataclasses.dataclass
+class CorpusSpec:
+    """
+    The size and complexity of a synthetic icon corpus.
+
+    Args:
+        n_icons: Number of icons.
+        n_paths: Number of random cubic Bézier paths per icon.
+        n_gradients: Number of linear gradients per icon, the first paths
+            are filled with them.
+        n_rasters: Number of embedded base64 PNG images per icon.
+        raster_size: Width and height of the embedded images.
+        seed: Random seed, the same spec always generates the same files.
+    """
+
+    n_icons: int = dataclasses.field(default=100)
+    n_paths: int = dataclasses.field(default=8)
+    n_gradients: int = dataclasses.field(default=0)
+    n_rasters: int = dataclasses.field(default=0)
+    raster_size: int = dataclasses.field(default=32)
+    seed: int = dataclasses.field(default=0)
+
+    def make_svg(self, rng: random.Random) -> str:
+        def point() -> str:
+            return f"{rng.uniform(0, 100):.3f} {rng.uniform(0, 100):.3f}"
+
+        def color() -> str:
+            return f"#{rng.randrange(0x1000000):06x}"
+
+        lines = [
+            '<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" '
+            'width="100" height="100" viewBox="0 0 100 100">'
+        ]
+        if self.n_gradients:
+            lines.append("  <defs>")
+            for i in range(self.n_gradients):
+                lines.append(
+                    f'    <linearGradient id="g{i}" x1="0" y1="0" x2="1" y2="1">'
+                    f'<stop offset="0" stop-color="{color()}"/>'
+                    f'<stop offset="1" stop-color="{color()}"/>'
+                    f"</linearGradient>"
+                )
+            lines.append("  </defs>")
+        for i in range(self.n_paths):
+            fill = f"url(#g{i})" if i < self.n_gradients else color()
+            curves = " ".join(
+                f"C {point()}, {point()}, {point()}" for _ in range(rng.randint(2, 6))
+            )
+            lines.append(
+                f'  <path d="M {point()} {curves} Z" fill="{fill}" '
+                f'fill-opacity="{rng.uniform(0.3, 1):.2f}"/>'
+            )
+        for _ in range(self.n_rasters):
+            size = self.raster_size
+            rgb = bytes(rng.randrange(256) for _ in range(size * size * 3))
+            data = base64.b64encode(encode_png(size, size, rgb)).decode("ascii")
+            x, y = rng.uniform(0, 100 - size), rng.uniform(0, 100 - size)
+            lines.append(
+                f'  <image x="{x:.1f}" y="{y:.1f}" width="{size}" height="{size}" '
+                f'xlink:href="data:image/png;base64,{data}"/>'
+            )
+        lines.append("</svg>")
+        return "\n".join(lines) + "\n"
+
+    def generate(self, dir_root: Path) -> list[Path]:
+        """
+        Write the corpus to ``${dir_root}/${name}/${name}.svg``, the same
+        layout as ``assets/icons``. Existing files in ``dir_root`` are removed.
+        """
+        shutil.rmtree(dir_root, ignore_errors=True)
+        rng = random.Random(self.seed)
+        paths = list()
+        for i in range(self.n_icons):
+            name = f"icon-{i:05d}"
+            path = dir_root.joinpath(name, f"{name}.svg")
+            path.parent.mkdir(parents=True)
+            path.write_text(self.make_svg(rng), encoding="utf-8")
+            paths.append(path)
+        return paths
+
+
+@dataclasses.dataclass
+class ThroughputResult:
+    """
+    The timing of one stage in one mode.
+
+    Args:
+        stage: Name of the stage.
+        mode: ``serial``, ``parallel`` or ``batch``.
+        n_icons: Number of icons processed.
+        n_bytes: Number of input bytes processed.
+        elapsed: Wall clock time in seconds.
+    """
+
+    stage: str = dataclasses.field()
+    mode: str = dataclasses.field()
+    n_icons: int = dataclasses.field()
+    n_bytes: int = dataclasses.field()
+    elapsed: float = dataclasses.field()
+
+    @property
+    def icons_per_sec(self) -> float:
+        return self.n_icons / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_sec(self) -> float:
+        return self.n_bytes / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> dict[str, T.Any]:
+        data = dataclasses.asdict(self)
+        data["icons_per_sec"] = self.icons_per_sec
+        data["bytes_per_sec"] = self.bytes_per_sec
+        return data
+
+
+@dataclasses.dataclass
+class Benchmark:
+    """
+    Time each stage over a synthetic corpus, see module docstring.
+
+    Args:
+        spec: The corpus to generate.
+        dir_root: Working directory, the corpus is in ``corpus/``, the stage
+            outputs are in ``svgo/``, ``png/`` and ``pngquant/``.
+        n_jobs: Number of worker processes in parallel mode.
+        upload_concurrency: Number of concurrent uploads in parallel mode.
+    """
+
+    spec: CorpusSpec = dataclasses.field()
+    dir_root: Path = dataclasses.field()
+    n_jobs: int | None = dataclasses.field(default=None)
+    upload_concurrency: int = dataclasses.field(default=16)
+    results: list[ThroughputResult] = dataclasses.field(default_factory=list)
+
+    @cached_property
+    def corpus(self) -> list[Path]:
+        return self.spec.generate(self.dir_root / "corpus")
+
+    @cached_property
+    def executor(self) -> WorkerPoolExecutor:
+        return WorkerPoolExecutor(n_jobs=self.n_jobs)
+
+    def _out(self, dirname: str, path: Path, suffix: str = "") -> Path:
+        dir_out = self.dir_root / dirname
+        dir_out.mkdir(parents=True, exist_ok=True)
+        return dir_out / f"{path.stem}{suffix}{path.suffix}"
+
+    def timeit(
+        self,
+        stage: str,
+        mode: str,
+        paths: list[Path],
+        func: T.Callable[[], T.Any],
+    ) -> ThroughputResult:
+        """
+        Time ``func`` that processes the given input files, and record it.
+        """
+        n_bytes = sum(path.stat().st_size for path in paths)
+        start = time.perf_counter()
+        func()
+        result = ThroughputResult(
+            stage=stage,
+            mode=mode,
+            n_icons=len(paths),
+            n_bytes=n_bytes,
+            elapsed=time.perf_counter() - start,
+        )
+        self.results.append(result)
+        return result
+
+    def bench_svgo(self, path_bin: Path | str = path_bin_svgo):
+        cmds = [
+            SvgoCmd(
+                path_bin=path_bin,
+                path_in=path,
+                path_out=self._out("svgo", path),
+                precision=1,
+                quite=True,
+            )
+            for path in self.corpus
+        ]
+        self.timeit("svgo", "serial", self.corpus, lambda: [c.run() for c in cmds])
+        self.timeit(
+            "svgo",
+            "parallel",
+            self.corpus,
+            lambda: SvgoCmd.parallel_run(cmds, executor=self.executor),
+        )
+        self.timeit(
+            "svgo",
+            "batch",
+            self.corpus,
+            lambda: SvgoCmd.parallel_batch_run(cmds, executor=self.executor),
+        )
+
+    def to_svg2png_cmds(self) -> list["Svg2PngCmd"]:
+        # cairosvg needs the native cairo library, it is only imported by the
+        # stages that render, so the other stages run without it
+        from .cairosvg_wrapper import Svg2PngCmd
+
+        return [
+            Svg2PngCmd(
+                path_in=path,
+                path_out=self._out("png", path, f"-{size}x{size}").with_suffix(".png"),
+                output_width=size,
+                output_height=size,
+            )
+            for path in self.corpus
+            for size in size_list
+        ]
+
+    def bench_svg2png(self):
+        from .cairosvg_wrapper import Svg2PngCmd
+
+        # one icon is rendered at every size
+        cmds = self.to_svg2png_cmds()
+        self.timeit("svg2png", "serial", self.corpus, lambda: [c.run() for c in cmds])
+        self.timeit(
+            "svg2png",
+            "parallel",
+            self.corpus,
+            lambda: Svg2PngCmd.parallel_run(cmds, executor=self.executor),
+        )
+
+    def bench_pngquant(self, path_bin: Path | str = path_bin_pngquant):
+        from .cairosvg_wrapper import Svg2PngCmd
+
+        svg2png_cmds = self.to_svg2png_cmds()
+        if not all(cmd.path_out.exists() for cmd in svg2png_cmds):
+            Svg2PngCmd.parallel_run(svg2png_cmds, executor=self.executor)
+        paths = [cmd.path_out for cmd in svg2png_cmds]
+        cmds = [
+            PngQuantCmd(
+                path_bin=path_bin,
+                path_in=path,
+                path_out=self._out("pngquant", path),
+                quality_range=(25, 50),
+                force=True,
+            )
+            for path in paths
+        ]
+        self.timeit("pngquant", "serial", paths, lambda: [c.run() for c in cmds])
+        self.timeit(
+            "pngquant",
+            "parallel",
+            paths,
+            lambda: PngQuantCmd.parallel_run(cmds, executor=self.executor),
+        )
+        self.timeit(
+            "pngquant",
+            "batch",
+            paths,
+            lambda: PngQuantCmd.parallel_batch_run(cmds, executor=self.executor),
+        )
+
+    def bench_manifest(self):
+        """
+        Time what an incremental build does before it runs any tool: list the
+        assets, hash every SVG and compare it with the build manifest.
+        """
+        dir_corpus = self.dir_root / "corpus"
+        manifest = BuildManifest(path=self.dir_root / "build-manifest.json")
+        for path in self.corpus:
+            manifest.update(
+                "compress_svg",
+                path.stem,
+                StageRecord(
+                    input_hash=get_file_sha256(path),
+                    params={},
+                    tool_version="",
+                ),
+            )
+
+        def main():
+            for path in dir_corpus.rglob("*.svg"):
+                if len(path.relative_to(dir_corpus).parts) == 2:
+                    record = StageRecord(
+                        input_hash=get_file_sha256(path),
+                        params={},
+                        tool_version="",
+                    )
+                    manifest.is_up_to_date("compress_svg", path.stem, record)
+
+        self.timeit("manifest", "serial", self.corpus, main)
+
+    def bench_upload(self, s3_client, s3dir: S3Path):
+        """
+        Upload the corpus with one worker and with :attr:`upload_concurrency`
+        workers, e.g. to a ``moto`` stand-in of Cloudflare R2.
+        """
+        tasks = [
+            UploadTask(
+                path=path,
+                s3path=s3dir.joinpath(path.parent.name, path.name),
+                content_type="image/svg+xml",
+            )
+            for path in self.corpus
+        ]
+        for mode, max_workers in [
+            ("serial", 1),
+            ("parallel", self.upload_concurrency),
+        ]:
+            uploader = R2Uploader(s3_client=s3_client, max_workers=max_workers)
+            self.timeit("upload", mode, self.corpus, lambda: uploader.upload(tasks))
+
+    def run(
+        self,
+        stages: T.Iterable[str] = ("svgo", "svg2png", "pngquant", "manifest"),
+        s3_client=None,
+        s3dir: S3Path | None = None,
+    ) -> list[ThroughputResult]:
+        """
+        Run the given stages, ``upload`` also needs ``s3_client`` and ``s3dir``.
+        """
+        try:
+            for stage in stages:
+                if stage == "upload":
+                    self.bench_upload(s3_client, s3dir)
+                else:
+                    getattr(self, f"bench_{stage}")()
+        finally:
+            if "executor" in self.__dict__:
+                self.executor.close()
+        return self.results
+
+    def print_table(self):
+        print(
+            f"{'stage':<10} {'mode':<9} {'icons':>7} {'sec':>9} "
+            f"{'icons/sec':>11} {'MB/sec':>9}"
+        )
+        for r in self.results:
+            print(
+                f"{r.stage:<10} {r.mode:<9} {r.n_icons:>7} {r.elapsed:>9.3f} "
+                f"{r.icons_per_sec:>11.1f} {r.bytes_per_sec / 1_000_000:>9.2f}"
+            )
+
+    def dump(self, path: Path):
+        data = {
+            "spec": dataclasses.asdict(self.spec),
+            "results": [result.to_dict() for result in self.results],
+        }
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=4) + "\n", encoding="utf-8")
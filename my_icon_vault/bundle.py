@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+"""
+Icon Bundle - pack every SVG and PNG variant into one memory-mapped file
+
+Reading icons from ``assets/icons/<name>/`` costs one file open per icon and
+size. A bundle packs all of them into a single file, and :class:`BundleReader`
+maps it into memory once, so a lookup is a dict lookup plus a zero-copy
+``memoryview`` slice, without any file system call.
+
+Bundle layout, all integers are little-endian::
+
+    +-------------------------------------------------------------+
+    | header: magic b"MIVB", version u16, reserved u16,           |
+    |         index offset u64, index length u64                  |
+    +-------------------------------------------------------------+
+    | file contents, back to back                                 |
+    +-------------------------------------------------------------+
+    | index: JSON {"entries": [[name, size, format, offset,       |
+    |                           length], ...]}                    |
+    +-------------------------------------------------------------+
+
+The index is written last, so the files are streamed into the bundle one at a
+time. The key of a file is ``(name, size, format)``, e.g. ``("github", 96, "png")``,
+the size of an SVG is 0.
+
+Example::
+
+    write_bundle(path, [(("github", 0, "svg"), path_svg), ...])
+    with BundleReader(path) as reader:
+        view = reader.get("github", 96, "png")  # memoryview, zero-copy
+        svg = reader.get_decoded("github", 0, "svg")  # str, LRU cached
+"""
+
+import typing as T
+import os
+import json
+import mmap
+import shutil
+import struct
+import threading
+import dataclasses
+from pathlib import Path
+from collections import OrderedDict
+
+MAGIC = b"MIVB"
+BUNDLE_VERSION = 1
+
+_HEADER = struct.Struct("<4sHHQQ")
+
+#: ``(name, size, format)``
+BundleKey = tuple[str, int, str]
+
+
+def write_bundle(
+    path: Path,
+    files: T.Iterable[tuple[BundleKey, Path]],
+) -> int:
+    """
+    Write the files to a new bundle. The bundle is written to a temp file
+    and then renamed, so readers that still map the old bundle keep working.
+
+    Args:
+        path: The bundle file.
+        files: ``(key, path)`` pairs.
+
+    Returns:
+        The number of files in the bundle.
+
+    Raises:
+        ValueError: If two files have the same key, the bundle is not written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f"{path.name}.tmp")
+    entries = list()
+    keys = set()
+    try:
+        with path_tmp.open("wb") as f:
+            f.write(_HEADER.pack(MAGIC, BUNDLE_VERSION, 0, 0, 0))
+            for key, path_file in files:
+                if key in keys:
+                    raise ValueError(f"duplicate bundle key: {key}")
+                keys.add(key)
+                offset = f.tell()
+                with path_file.open("rb") as f_in:
+                    shutil.copyfileobj(f_in, f)
+                name, size, fmt = key
+                entries.append([name, size, fmt, offset, f.tell() - offset])
+            index = json.dumps({"entries": entries}).encode("utf-8")
+            index_offset = f.tell()
+            f.write(index)
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, BUNDLE_VERSION, 0, index_offset, len(index)))
+        os.replace(path_tmp, path)
+    except BaseException:
+        # e.g. a duplicate key, don't leave a partial bundle behind
+        path_tmp.unlink(missing_ok=True)
+        raise
+    return len(entries)
+
+
+def decode_svg(view: memoryview) -> str:
+    return str(view, "utf-8")
+
+
+def decode_bytes(view: memoryview) -> bytes:
+    return bytes(view)
+
+
+#: default decoder of each format, used by :meth:`BundleReader.get_decoded`
+DEFAULT_DECODERS: dict[str, T.Callable[[memoryview], T.Any]] = {
+    "svg": decode_svg,
+    "png": decode_bytes,
+}
+
+
+class LRUCache:
+    """
+    A thread-safe least recently used cache.
+
+    :param maxsize: maximum number of items.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[T.Hashable, T.Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key: T.Hashable, func: T.Callable[[], T.Any]) -> T.Any:
+        """
+        Return the cached value of ``key``, call ``func`` to create it on miss.
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            except KeyError:
+                self.misses += 1
+        # decode outside the lock, two threads may decode the same key once
+        value = func()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+@dataclasses.dataclass
+class BundleReader:
+    """
+    Random access to the files of a bundle, see module docstring.
+
+    The index is loaded once when the reader is created, after that no
+    lookup touches the file system.
+
+    .. note::
+
+        The ``memoryview`` returned by :meth:`get` points into the mapped
+        file, release it (or copy it with ``bytes(view)``) before
+        :meth:`close`. The decoded values of :meth:`get_decoded` are copies.
+
+    Args:
+        path: The bundle file.
+        decoders: ``{format: decoder}``, see :data:`DEFAULT_DECODERS`.
+        cache_size: Number of decoded files kept by :meth:`get_decoded`.
+    """
+
+    path: Path = dataclasses.field()
+    decoders: dict[str, T.Callable[[memoryview], T.Any]] = dataclasses.field(
+        default_factory=lambda: dict(DEFAULT_DECODERS)
+    )
+    cache_size: int = dataclasses.field(default=1024)
+
+    def __post_init__(self):
+        with self.path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        magic, version, _, index_offset, index_length = _HEADER.unpack_from(
+            self._view
+        )
+        if magic != MAGIC or version != BUNDLE_VERSION:
+            self.close()
+            raise ValueError(f"not a version {BUNDLE_VERSION} icon bundle: {self.path}")
+        index = json.loads(
+            bytes(self._view[index_offset : index_offset + index_length])
+        )
+        self._index: dict[BundleKey, tuple[int, int]] = {
+            (name, size, fmt): (offset, length)
+            for name, size, fmt, offset, length in index["entries"]
+        }
+        self.cache = LRUCache(maxsize=self.cache_size)
+
+    def get(self, name: str, size: int = 0, fmt: str = "svg") -> memoryview:
+        """
+        Return the content of a file as a zero-copy ``memoryview``.
+
+        Raises:
+            KeyError: If the bundle doesn't have the file.
+        """
+        offset, length = self._index[(name, size, fmt)]
+        return self._view[offset : offset + length]
+
+    def get_decoded(self, name: str, size: int = 0, fmt: str = "svg") -> T.Any:
+        """
+        Return the content of a file decoded by the decoder of its format,
+        the decoded values are cached in :attr:`cache`.
+
+        Raises:
+            KeyError: If the bundle doesn't have the file.
+        """
+        key = (name, size, fmt)
+        view = self.get(*key)
+        decode = self.decoders[fmt]
+        return self.cache.get_or_set(key, lambda: decode(view))
+
+    def __contains__(self, key: BundleKey) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def keys(self) -> T.KeysView[BundleKey]:
+        return self._index.keys()
+
+    def close(self):
+        """
+        Unmap the bundle.
+        """
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "BundleReader":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -14,6 +14,7 @@ for web applications, mobile apps, or print media.
 Key features:
 
 - Single SVG to PNG conversion with custom dimensions
+- Multi-size conversion that reads the SVG only once
 - Batch processing with multiprocessing support
 - Preserves SVG quality and vector graphics fidelity
 - Configurable output dimensions for different use cases
@@ -26,13 +27,22 @@ Typical use cases include:
 - Preparing graphics for platforms that don't support SVG format
 """
 
+import io
+import typing as T
 import dataclasses
 from pathlib import Path
 
-import mpire
 import cairosvg
+import cairocffi as cairo
+from cairosvg.parser import Tree
+from cairosvg.surface import PNGSurface
+from pathlib_mate.mate_tool_box import repr_data_size
 
-from .base import BaseCmd
+from .base import CmdResult, BaseCmd, get_file_size
+from .executor import WorkerPoolExecutor, parallel_map
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    import numpy as np
 
 
 @dataclasses.dataclass
@@ -72,7 +82,18 @@ class Svg2PngCmd(BaseCmd):
     output_width: int = dataclasses.field()
     output_height: int = dataclasses.field()
 
-    def run(self, verbose: bool = False):
+    @classmethod
+    def get_version(cls) -> str:
+        """
+        Return the version of the installed CairoSVG library.
+        """
+        return cairosvg.__version__
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
         """
         Execute SVG to PNG conversion for the configured input file.
 
@@ -80,6 +101,9 @@ class Svg2PngCmd(BaseCmd):
         to render it as a PNG image with the specified output dimensions.
         The SVG content is read as UTF-8 text and passed to CairoSVG as a byte string.
 
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the conversion.
+
         Raises:
             FileNotFoundError: If the input SVG file does not exist.
             UnicodeDecodeError: If the SVG file contains invalid UTF-8 content.
@@ -98,17 +122,25 @@ class Svg2PngCmd(BaseCmd):
         """
         if verbose:
             self._log_before()
-        cairosvg.svg2png(
-            bytestring=self.path_in.read_text(encoding="utf-8"),
-            write_to=str(self.path_out),
-            output_width=self.output_width,
-            output_height=self.output_height,
-        )
+        with self._measure(profile_dir) as result:
+            cairosvg.svg2png(
+                bytestring=self.path_in.read_text(encoding="utf-8"),
+                write_to=str(self.path_out),
+                output_width=self.output_width,
+                output_height=self.output_height,
+            )
         if verbose:
             self._log_after()
+        return result
 
     @classmethod
-    def parallel_run(cls, cmds: list["Svg2PngCmd"], verbose: bool = False):
+    def parallel_run(
+        cls,
+        cmds: list["Svg2PngCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ):
         """
         Batch convert multiple SVG files to PNG in parallel using multiprocessing.
 
@@ -119,10 +151,13 @@ class Svg2PngCmd(BaseCmd):
         Args:
             cmds: List of Svg2PngCmd instances, each configured for a specific
                   input SVG file and target PNG output with desired dimensions.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
 
         Returns:
-            List of results from each worker process (typically None for each
-            successful conversion).
+            One :class:`~my_icon_vault.base.CmdResult` per command.
 
         Raises:
             FileNotFoundError: If any input SVG file does not exist.
@@ -147,14 +182,341 @@ class Svg2PngCmd(BaseCmd):
             significant rendering time.
         """
 
-        def main(ith: int, cmd: Svg2PngCmd):
-            print(f"[{ith}] Converting: {cmd.path_in} -> {cmd.path_out}")
-            cmd.run(verbose=verbose)
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_svg2png_main, tasks, executor=executor)
+
+
+def _surface_to_array(surface: cairo.ImageSurface) -> "np.ndarray":
+    """
+    Copy the pixels of a cairo ``ARGB32`` surface into a ``(height, width, 4)``
+    uint8 array. The channels are premultiplied and in native byte order.
+    """
+    import numpy as np
+
+    surface.flush()
+    height, width, stride = surface.get_height(), surface.get_width(), surface.get_stride()
+    data = np.frombuffer(surface.get_data(), dtype=np.uint8).reshape(height, stride)
+    return data[:, : width * 4].reshape(height, width, 4).copy()
+
+
+def _surface_to_png(surface: cairo.ImageSurface) -> bytes:
+    """
+    Encode a cairo surface as in-memory PNG content.
+    """
+    buffer = io.BytesIO()
+    surface.write_to_png(buffer)
+    return buffer.getvalue()
+
+
+def _array_to_surface(arr: "np.ndarray") -> cairo.ImageSurface:
+    """
+    The inverse of :func:`_surface_to_array`.
+    """
+    import numpy as np
+
+    height, width = arr.shape[:2]
+    stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width)
+    data = np.zeros((height, stride), dtype=np.uint8)
+    data[:, : width * 4] = arr.reshape(height, width * 4)
+    return cairo.ImageSurface.create_for_data(
+        bytearray(data.tobytes()), cairo.FORMAT_ARGB32, width, height, stride
+    )
+
+
+@dataclasses.dataclass
+class PngTarget:
+    """
+    One output of :class:`Svg2PngMultiSizeCmd`.
+
+    Args:
+        path_out: Path where the output PNG file will be saved.
+        output_width: Width of the output PNG image in pixels.
+        output_height: Height of the output PNG image in pixels.
+    """
+
+    path_out: Path = dataclasses.field()
+    output_width: int = dataclasses.field()
+    output_height: int = dataclasses.field()
+
+
+@dataclasses.dataclass
+class Svg2PngMultiSizeCmd(BaseCmd):
+    """
+    Command configuration for converting one SVG file to PNG at multiple sizes.
+
+    :class:`Svg2PngCmd` reads the SVG once per output size. This command
+    reads it once, then parses and draws it to one cairo surface per target,
+    so it schedules one task per SVG instead of one task per size. Drawing
+    mutates the parsed tree, and parsing an icon is cheaper than a deep copy
+    of its tree, so every target gets a freshly parsed tree.
+
+    Args:
+        path_in: Path to the input SVG file to be converted.
+        path_out: Not used, set it to None. The outputs are defined by ``targets``.
+        targets: The output PNG files and their dimensions.
+        downsample: If True, only render the largest target with cairo, and
+            produce the smaller targets of the same aspect ratio by area
+            averaging the large render (requires NumPy).
+        quality_check: Only used in downsample mode. If True, also render the
+            smallest target directly and compare it against the downsampled
+            image. If the PSNR is below ``min_psnr`` (typically icons with
+            hairlines that vanish when averaged), every target is rendered
+            directly instead. On by default, so downsampling never ships a
+            degraded render. The reference render costs about as much as the
+            direct render it replaces, so with it a three size icon saves one
+            cairo render instead of two, turn it off to save both.
+        min_psnr: The quality check threshold in dB.
+
+    Example:
+        >>> cmd = Svg2PngMultiSizeCmd(
+        ...     path_in=Path("icon.svg"),
+        ...     path_out=None,
+        ...     targets=[
+        ...         PngTarget(Path("icon-96x96.png"), 96, 96),
+        ...         PngTarget(Path("icon-512x512.png"), 512, 512),
+        ...     ],
+        ... )
+        >>> cmd.run()
+        # Reads icon.svg once and writes both PNG files
+    """
+
+    targets: list[PngTarget] = dataclasses.field(default_factory=list)
+    downsample: bool = dataclasses.field(default=False)
+    quality_check: bool = dataclasses.field(default=True)
+    min_psnr: float = dataclasses.field(default=40.0)
+
+    @classmethod
+    def get_version(cls) -> str:
+        """
+        Return the version of the installed CairoSVG library.
+        """
+        return cairosvg.__version__
 
-        tasks = [{"ith": i, "cmd": cmd} for i, cmd in enumerate(cmds, start=1)]
-        with mpire.WorkerPool(start_method="fork") as pool:
-            results = pool.map(
-                main,
-                tasks,
+    def to_params(self) -> dict[str, T.Any]:
+        params = {
+            "sizes": [
+                (target.output_width, target.output_height) for target in self.targets
+            ]
+        }
+        if self.downsample:
+            params["downsample"] = True
+            params["quality_check"] = self.quality_check
+            params["min_psnr"] = self.min_psnr
+        return params
+
+    def parse(self, data: bytes) -> Tree:
+        """
+        Parse the content of the input SVG file into a new tree.
+        """
+        return Tree(bytestring=data)
+
+    def render(
+        self,
+        tree: Tree,
+        output_width: int,
+        output_height: int,
+        output: T.Any = None,
+    ) -> PNGSurface:
+        """
+        Draw a parsed SVG tree to a new PNG surface.
+
+        Args:
+            tree: The parsed SVG tree, see :meth:`parse`. Drawing mutates some
+                nodes of the tree (masks, patterns, images), parse a new tree
+                if it will be drawn again.
+            output_width: Width of the surface in pixels.
+            output_height: Height of the surface in pixels.
+            output: Filename or file-like object the PNG is written to when the
+                surface is finished, None to only render in memory.
+        """
+        return PNGSurface(
+            tree,
+            output,
+            96,
+            output_width=output_width,
+            output_height=output_height,
+        )
+
+    def iter_png(self) -> T.Iterator[tuple[PngTarget, bytes]]:
+        """
+        Read the input SVG file once and yield the in-memory PNG content of
+        every target, without touching the output paths.
+
+        Yields:
+            ``(target, png_bytes)`` tuples, not necessarily in ``targets`` order.
+        """
+        data = self.path_in.read_bytes()
+        if self.downsample and len(self.targets) > 1:
+            yield from self._iter_png_downsample(data)
+        else:
+            yield from self._iter_png_direct(data, self.targets)
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
+        """
+        Read the input SVG file once and write one PNG file per target.
+
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the conversion,
+            ``bytes_out`` is the total size of all targets.
+
+        Raises:
+            FileNotFoundError: If the input SVG file does not exist.
+            ValueError: If the SVG content is malformed or cannot be parsed.
+            OSError: If there are permission issues writing the output files.
+        """
+        if verbose:
+            self._log_before()
+        with self._measure(profile_dir) as result:
+            for target, png in self.iter_png():
+                target.path_out.write_bytes(png)
+        if verbose:
+            self._log_after()
+        return result
+
+    def _get_bytes_out(self) -> int:
+        return sum(get_file_size(target.path_out) for target in self.targets)
+
+    def _iter_png_direct(
+        self,
+        data: bytes,
+        targets: list[PngTarget],
+    ) -> T.Iterator[tuple[PngTarget, bytes]]:
+        for target in targets:
+            buffer = io.BytesIO()
+            surface = self.render(
+                tree=self.parse(data),
+                output_width=target.output_width,
+                output_height=target.output_height,
+                output=buffer,
+            )
+            surface.finish()
+            yield target, buffer.getvalue()
+
+    def _iter_png_downsample(
+        self,
+        data: bytes,
+    ) -> T.Iterator[tuple[PngTarget, bytes]]:
+        from . import raster  # NumPy is an optional dependency
+
+        largest = max(self.targets, key=lambda t: t.output_width * t.output_height)
+        ratio = largest.output_width / largest.output_height
+        derived = [
+            target
+            for target in self.targets
+            if target is not largest
+            and abs(target.output_width / target.output_height - ratio) < 1e-6
+        ]
+        direct = [
+            target
+            for target in self.targets
+            if (target is not largest) and (target not in derived)
+        ]
+        if not derived:
+            yield from self._iter_png_direct(data, self.targets)
+            return
+
+        surface = self.render(
+            tree=self.parse(data),
+            output_width=largest.output_width,
+            output_height=largest.output_height,
+        )
+        yield largest, _surface_to_png(surface.cairo)
+        arr_large = _surface_to_array(surface.cairo)
+
+        if self.quality_check:
+            # the smallest size loses the most detail, if it passes, the
+            # larger sizes pass as well
+            smallest = min(derived, key=lambda t: t.output_width)
+            derived.remove(smallest)
+            surface = self.render(
+                tree=self.parse(data),
+                output_width=smallest.output_width,
+                output_height=smallest.output_height,
             )
-        return results
+            yield smallest, _surface_to_png(surface.cairo)
+            arr_direct = _surface_to_array(surface.cairo)
+            arr_down = raster.area_downsample(
+                arr_large, smallest.output_width, smallest.output_height
+            )
+            if raster.psnr(arr_down, arr_direct) < self.min_psnr:
+                direct.extend(derived)
+                derived = []
+
+        for target in derived:
+            arr = raster.area_downsample(
+                arr_large, target.output_width, target.output_height
+            )
+            yield target, _surface_to_png(_array_to_surface(arr))
+        if direct:
+            yield from self._iter_png_direct(data, direct)
+
+    def _log_after(self):
+        for target in self.targets:
+            size_after = target.path_out.stat().st_size
+            print(
+                f"Size before: {repr_data_size(self._size_before)}, "
+                f"after ({target.output_width}x{target.output_height}): "
+                f"{repr_data_size(size_after)}"
+            )
+
+    @classmethod
+    def parallel_run(
+        cls,
+        cmds: list["Svg2PngMultiSizeCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ):
+        """
+        Batch convert multiple SVG files to PNG in parallel using multiprocessing.
+
+        Each task reads one SVG and renders all of its sizes, so there is one
+        task per SVG file instead of one task per output file.
+
+        Args:
+            cmds: List of Svg2PngMultiSizeCmd instances.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command.
+        """
+
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_svg2png_multi_size_main, tasks, executor=executor)
+
+
+# module level functions, so they can be sent to a reused worker pool
+def _svg2png_main(
+    ith: int,
+    cmd: Svg2PngCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(f"[{ith}] Converting: {cmd.path_in} -> {cmd.path_out}")
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
+
+
+def _svg2png_multi_size_main(
+    ith: int,
+    cmd: Svg2PngMultiSizeCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(
+        f"[{ith}] Converting: {cmd.path_in} -> "
+        f"{', '.join(target.path_out.name for target in cmd.targets)}"
+    )
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
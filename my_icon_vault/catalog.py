@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+
+"""
+Asset Catalog - an indexed SQLite catalog of the icon assets
+
+Listing the assets with ``rglob`` walks the whole ``assets/icons`` tree every
+time. This module persists one row per asset in a SQLite database, so listing and querying
+a large vault is a single indexed query that doesn't touch the file system.
+
+Each row stores the SVG hash, mtime and size, the ``viewBox`` dimensions, the
+first line of the README and the generated PNG variants. :meth:`AssetCatalog.refresh`
+updates the catalog incrementally: it walks the asset directories with
+``os.scandir`` (one ``stat`` per file, no glob matching), and only re-hashes and
+re-parses the SVGs whose mtime or size changed.
+
+The asset names and the full README text are also indexed in a SQLite FTS5
+full-text index, which is updated in the same refresh when a README changes.
+:meth:`AssetCatalog.search` matches every query word as a prefix, e.g.
+``"google doc"`` finds ``google-docs``, and ranks the name matches first.
+
+Example::
+
+    catalog = AssetCatalog(path_db=path_catalog_db)
+    catalog.refresh()
+    for entry in catalog.list_entries():
+        print(entry.name, entry.width, entry.height, entry.variants)
+    for entry in catalog.search("version control"):
+        print(entry.name, entry.description)
+"""
+
+import typing as T
+import os
+import re
+import json
+import sqlite3
+import contextlib
+import dataclasses
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from .paths import dir_assets_icons
+from .manifest import get_file_sha256
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .structure import IconAsset
+
+#: bump it when the schema changes, the catalog is then rebuilt from scratch
+CATALOG_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    name TEXT PRIMARY KEY,
+    svg_mtime_ns INTEGER NOT NULL,
+    svg_size INTEGER NOT NULL,
+    svg_hash TEXT NOT NULL,
+    width REAL,
+    height REAL,
+    readme_mtime_ns INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    variants TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS asset_search USING fts5(name, text, prefix='2 3 4');
+"""
+
+#: ``${name}-${width}x${height}.png``
+_VARIANT_PATTERN = re.compile(r"^(.+)-(\d+)x(\d+)\.png$")
+
+#: bm25 weights of the ``name`` and ``text`` columns of ``asset_search``
+_NAME_WEIGHT, _TEXT_WEIGHT = 10.0, 1.0
+
+_COLUMNS = (
+    "name",
+    "svg_mtime_ns",
+    "svg_size",
+    "svg_hash",
+    "width",
+    "height",
+    "readme_mtime_ns",
+    "description",
+    "variants",
+)
+
+
+def _to_float(value: str | None) -> float | None:
+    if not value:
+        return None
+    match = re.match(r"\s*([0-9.]+)", value)
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def parse_svg_size(path: Path) -> tuple[float | None, float | None]:
+    """
+    Return the ``(width, height)`` of the ``viewBox`` of the root element,
+    or of its ``width`` / ``height`` attributes if there is no ``viewBox``.
+    Only the root element is parsed.
+    """
+    try:
+        with path.open("rb") as f:
+            for _, elem in ET.iterparse(f, events=("start",)):
+                view_box = elem.get("viewBox", "").replace(",", " ").split()
+                if len(view_box) == 4:
+                    return _to_float(view_box[2]), _to_float(view_box[3])
+                return _to_float(elem.get("width")), _to_float(elem.get("height"))
+    except ET.ParseError:
+        pass
+    return None, None
+
+
+def read_readme(path_readme: Path) -> str:
+    """
+    Return the README text, an empty string if there is no README.
+    """
+    try:
+        return path_readme.read_text("utf-8")
+    except FileNotFoundError:
+        return ""
+
+
+def get_description(readme: str) -> str:
+    """
+    Return the first line of the README, the same as the icon list uses.
+    """
+    lines = readme.splitlines()
+    return lines[0].strip() if lines else ""
+
+
+def to_match_expr(query: str) -> str | None:
+    """
+    Convert a free text query to an FTS5 query that matches every word as
+    a prefix, e.g. ``google doc`` -> ``"google"* "doc"*``.
+    None if the query has no word.
+    """
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    # quoted, so words like ``and`` or ``near`` are not FTS5 operators
+    return " ".join(f'"{word}"*' for word in words)
+
+
+@dataclasses.dataclass
+class CatalogEntry:
+    """
+    One row of the catalog.
+
+    Args:
+        name: Name of the asset, i.e. its directory name.
+        svg_mtime_ns: mtime of the SVG file in nanoseconds.
+        svg_size: Size of the SVG file in bytes.
+        svg_hash: SHA256 of the SVG file.
+        width: Width of the ``viewBox``, None if it can't be parsed.
+        height: Height of the ``viewBox``, None if it can't be parsed.
+        readme_mtime_ns: mtime of the README in nanoseconds, 0 if there is none.
+        description: First line of the README.
+        variants: The generated PNG sizes, e.g. ``["16x16", "96x96"]``.
+    """
+
+    name: str = dataclasses.field()
+    svg_mtime_ns: int = dataclasses.field()
+    svg_size: int = dataclasses.field()
+    svg_hash: str = dataclasses.field()
+    width: float | None = dataclasses.field(default=None)
+    height: float | None = dataclasses.field(default=None)
+    readme_mtime_ns: int = dataclasses.field(default=0)
+    description: str = dataclasses.field(default="")
+    variants: list[str] = dataclasses.field(default_factory=list)
+
+    def to_row(self) -> tuple:
+        row = dataclasses.astuple(self)
+        return row[:-1] + (json.dumps(self.variants),)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "CatalogEntry":
+        return cls(*row[:-1], variants=json.loads(row[-1]))
+
+    def to_icon_asset(self) -> "IconAsset":
+        from .structure import IconAsset
+
+        return IconAsset(name=self.name)
+
+
+@dataclasses.dataclass
+class RefreshResult:
+    """
+    The outcome of :meth:`AssetCatalog.refresh`.
+
+    Args:
+        added: Names of the new assets.
+        updated: Names of the assets whose SVG, README or variants changed.
+        removed: Names of the assets that no longer exist.
+        unchanged: Number of unchanged assets.
+    """
+
+    added: list[str] = dataclasses.field(default_factory=list)
+    updated: list[str] = dataclasses.field(default_factory=list)
+    removed: list[str] = dataclasses.field(default_factory=list)
+    unchanged: int = dataclasses.field(default=0)
+
+    def print_summary(self):
+        print(
+            f"[catalog] {len(self.added)} added, {len(self.updated)} updated, "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+
+
+@dataclasses.dataclass
+class AssetCatalog:
+    """
+    SQLite catalog of the assets under ``dir_root``, see module docstring.
+
+    An asset is a sub directory ``${dir_root}/${name}/`` that contains
+    ``${name}.svg``. Its PNG variants are the ``${name}-${w}x${h}.png`` files
+    next to it.
+
+    Args:
+        path_db: The SQLite database file.
+        dir_root: The directory of the asset directories.
+    """
+
+    path_db: Path = dataclasses.field()
+    dir_root: Path = dataclasses.field(default=dir_assets_icons)
+
+    _is_initialized: bool = dataclasses.field(default=False, init=False, repr=False)
+
+    def _initialize(self, conn: sqlite3.Connection):
+        """
+        Create the tables, or rebuild them if the schema version changed.
+        """
+        with conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != CATALOG_VERSION:
+                conn.execute("DROP TABLE IF EXISTS assets")
+                conn.execute("DROP TABLE IF EXISTS asset_search")
+                conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            conn.executescript(_SCHEMA)
+        self._is_initialized = True
+
+    @contextlib.contextmanager
+    def connect(self) -> T.Iterator[sqlite3.Connection]:
+        """
+        Open the database, commit on success and roll back on error.
+        The schema is checked on the first connection only.
+        """
+        if self._is_initialized is False:
+            self.path_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path_db)
+        try:
+            if self._is_initialized is False:
+                self._initialize(conn)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _scan_asset(self, entry: os.DirEntry) -> dict[str, T.Any] | None:
+        """
+        Stat the files of one asset directory, None if it is not an asset.
+        """
+        name = entry.name
+        svg_stat = None
+        readme_mtime_ns = 0
+        variants = list()
+        with os.scandir(entry.path) as it:
+            for file in it:
+                if file.name == f"{name}.svg":
+                    svg_stat = file.stat()
+                elif file.name == "README.rst":
+                    readme_mtime_ns = file.stat().st_mtime_ns
+                else:
+                    match = _VARIANT_PATTERN.match(file.name)
+                    if match and match.group(1) == name:
+                        variants.append((int(match.group(2)), int(match.group(3))))
+        if svg_stat is None:
+            return None
+        return {
+            "name": name,
+            "svg_mtime_ns": svg_stat.st_mtime_ns,
+            "svg_size": svg_stat.st_size,
+            "readme_mtime_ns": readme_mtime_ns,
+            "variants": [f"{w}x{h}" for w, h in sorted(variants)],
+        }
+
+    def refresh(self, verbose: bool = False) -> RefreshResult:
+        """
+        Bring the catalog up to date with the file system, see module docstring.
+        """
+        result = RefreshResult()
+        with self.connect() as conn:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM assets").fetchall()
+            old_entries = {row[0]: CatalogEntry.from_row(row) for row in rows}
+            seen = set()
+            changed = list()
+            readmes: dict[str, str] = dict()
+            if self.dir_root.exists():
+                with os.scandir(self.dir_root) as it:
+                    for dir_entry in it:
+                        if dir_entry.is_dir() is False:
+                            continue
+                        scanned = self._scan_asset(dir_entry)
+                        if scanned is None:
+                            continue
+                        name = scanned["name"]
+                        seen.add(name)
+                        old = old_entries.get(name)
+                        new = self._new_entry(
+                            Path(dir_entry.path), scanned, old, readmes
+                        )
+                        if old is None:
+                            result.added.append(name)
+                            changed.append(new)
+                        elif new != old:
+                            result.updated.append(name)
+                            changed.append(new)
+                        else:
+                            result.unchanged += 1
+            result.added.sort()
+            result.updated.sort()
+            result.removed = sorted(set(old_entries) - seen)
+            # the rows of asset_search share the rowid of their assets row,
+            # the upsert keeps the rowid of an updated asset
+            conn.executemany(
+                "DELETE FROM asset_search WHERE rowid = "
+                "(SELECT rowid FROM assets WHERE name = ?)",
+                [(name,) for name in [*result.removed, *readmes]],
+            )
+            conn.executemany(
+                "DELETE FROM assets WHERE name = ?",
+                [(name,) for name in result.removed],
+            )
+            conn.executemany(
+                f"INSERT INTO assets ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                f"ON CONFLICT (name) DO UPDATE SET "
+                f"{', '.join(f'{c} = excluded.{c}' for c in _COLUMNS[1:])}",
+                [entry.to_row() for entry in changed],
+            )
+            conn.executemany(
+                "INSERT INTO asset_search (rowid, name, text) "
+                "SELECT rowid, name, ? FROM assets WHERE name = ?",
+                [(text, name) for name, text in readmes.items()],
+            )
+        if verbose:
+            result.print_summary()
+        return result
+
+    def _new_entry(
+        self,
+        dir_asset: Path,
+        scanned: dict[str, T.Any],
+        old: CatalogEntry | None,
+        readmes: dict[str, str],
+    ) -> CatalogEntry:
+        """
+        Build the entry of a scanned asset, the SVG is only hashed and parsed
+        if its mtime or size changed, the README only if its mtime changed.
+        The README text that was read is added to ``readmes``.
+        """
+        name = scanned["name"]
+        svg_changed = (
+            old is None
+            or old.svg_mtime_ns != scanned["svg_mtime_ns"]
+            or old.svg_size != scanned["svg_size"]
+        )
+        if svg_changed:
+            path_svg = dir_asset / f"{name}.svg"
+            svg_hash = get_file_sha256(path_svg)
+            width, height = parse_svg_size(path_svg)
+        else:
+            svg_hash, width, height = old.svg_hash, old.width, old.height
+        if old is None or old.readme_mtime_ns != scanned["readme_mtime_ns"]:
+            readmes[name] = read_readme(dir_asset / "README.rst")
+            description = get_description(readmes[name])
+        else:
+            description = old.description
+        return CatalogEntry(
+            name=name,
+            svg_mtime_ns=scanned["svg_mtime_ns"],
+            svg_size=scanned["svg_size"],
+            svg_hash=svg_hash,
+            width=width,
+            height=height,
+            readme_mtime_ns=scanned["readme_mtime_ns"],
+            description=description,
+            variants=scanned["variants"],
+        )
+
+    def get_entry(self, name: str) -> CatalogEntry | None:
+        with self.connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM assets WHERE name = ?",
+                (name,),
+            ).fetchone()
+        return None if row is None else CatalogEntry.from_row(row)
+
+    def list_entries(self) -> list[CatalogEntry]:
+        """
+        Return all entries, sorted by name.
+        """
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM assets ORDER BY name"
+            ).fetchall()
+        return [CatalogEntry.from_row(row) for row in rows]
+
+    def list_names(self) -> list[str]:
+        with self.connect() as conn:
+            rows = conn.execute("SELECT name FROM assets ORDER BY name").fetchall()
+        return [row[0] for row in rows]
+
+    def list_assets(self) -> list["IconAsset"]:
+        """
+        All assets in the catalog as :class:`~my_icon_vault.structure.IconAsset`,
+        sorted by name.
+        """
+        from .structure import IconAsset
+
+        return [IconAsset(name=name) for name in self.list_names()]
+
+    def search(self, query: str, limit: int = 20) -> list[CatalogEntry]:
+        """
+        Full-text search over the asset names and README text, every word of
+        the query has to match the prefix of a word, see :func:`to_match_expr`.
+
+        Returns:
+            The matching entries, best match first.
+        """
+        expr = to_match_expr(query)
+        if expr is None:
+            return []
+        columns = ", ".join(f"assets.{column}" for column in _COLUMNS)
+        with self.connect() as conn:
+            rows = conn.execute(
+                f"SELECT {columns} FROM asset_search "
+                f"JOIN assets ON assets.rowid = asset_search.rowid "
+                f"WHERE asset_search MATCH ? "
+                f"ORDER BY bm25(asset_search, {_NAME_WEIGHT}, {_TEXT_WEIGHT}) "
+                f"LIMIT ?",
+                (expr, limit),
+            ).fetchall()
+        return [CatalogEntry.from_row(row) for row in rows]
+
+    def count(self) -> int:
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
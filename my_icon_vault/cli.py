@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+Command line interface::
+
+    # find icons by name and README text
+    my-icon-vault search google docs logo
+    my-icon-vault search version control --limit 5
+
+    # bring the asset catalog up to date
+    my-icon-vault refresh
+
+The search reads the prebuilt catalog, see :mod:`my_icon_vault.catalog`.
+"""
+
+import typing as T
+import argparse
+from pathlib import Path
+
+from .paths import path_catalog_db, dir_assets_icons
+from .catalog import AssetCatalog
+
+
+def new_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="my-icon-vault",
+        description="Manage the icon vault.",
+    )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=path_catalog_db,
+        help="path of the asset catalog database",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=dir_assets_icons,
+        help="directory of the asset directories",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser(
+        "search",
+        help="find icons by name and README text",
+    )
+    search.add_argument("query", nargs="+", help="words to search for")
+    search.add_argument(
+        "--limit",
+        type=int,
+        default=20,
+        help="maximum number of results",
+    )
+    search.add_argument(
+        "--refresh",
+        action="store_true",
+        help="refresh the catalog before searching",
+    )
+
+    subparsers.add_parser("refresh", help="bring the asset catalog up to date")
+    return parser
+
+
+def main(args: T.Sequence[str] | None = None) -> int:
+    options = new_parser().parse_args(args)
+    catalog = AssetCatalog(path_db=options.db, dir_root=options.root)
+    if options.command == "refresh":
+        catalog.refresh(verbose=True)
+    elif options.command == "search":
+        # an empty catalog was never built
+        if options.refresh or catalog.count() == 0:
+            catalog.refresh()
+        for entry in catalog.search(" ".join(options.query), limit=options.limit):
+            print(f"{entry.name}: {entry.description}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+
+"""
+Icon Client - fetch published icons with a local disk cache
+
+:class:`IconClient` is the consumer side of
+:meth:`One.upload_to_cloudflare_r2() <my_icon_vault.one.One.upload_to_cloudflare_r2>`.
+It downloads icons from the public URL of the vault and keeps them in a bounded
+on-disk LRU cache:
+
+- a cached icon younger than ``max_age`` is returned without any request;
+- an older one is revalidated with a conditional ``GET`` (``If-None-Match``
+  with the cached ``ETag``), a ``304 Not Modified`` costs no body transfer;
+- concurrent misses of the same icon are coalesced into one request;
+- all requests share one ``requests.Session`` with a connection pool.
+
+Example::
+
+    client = IconClient(url_root="https://icons.example.com/projects/my_icon_vault")
+    svg = client.get_icon("github")
+    png = client.get_icon("github", size=96)
+
+The cache directory holds one ``${key}.bin`` file with the content and one
+``${key}.json`` file with the URL and ``ETag`` per icon, where the key is the
+SHA256 of the URL.
+"""
+
+import typing as T
+import os
+import json
+import time
+import hashlib
+import threading
+import dataclasses
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import cached_property
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .paths import dir_icon_cache
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    """
+    Metadata of one cached file.
+
+    Args:
+        url: The URL the content was downloaded from.
+        etag: The ``ETag`` response header, None if the server didn't send one.
+        size: Size of the content in bytes.
+        checked_at: Seconds since the epoch of the last download or revalidation.
+    """
+
+    url: str = dataclasses.field()
+    etag: str | None = dataclasses.field()
+    size: int = dataclasses.field()
+    checked_at: float = dataclasses.field()
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return dataclasses.asdict(self)
+
+
+class DiskLRUCache:
+    """
+    A bounded on-disk cache, the least recently used files are deleted when
+    the total size exceeds ``max_bytes``. The access order is kept in memory,
+    after a restart it starts from the order of the last download or
+    revalidation.
+
+    :param dir_cache: the cache directory.
+    :param max_bytes: maximum total size of the cached content.
+    """
+
+    def __init__(self, dir_cache: Path, max_bytes: int):
+        self.dir_cache = dir_cache
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _path_bin(self, key: str) -> Path:
+        return self.dir_cache / f"{key}.bin"
+
+    def _path_meta(self, key: str) -> Path:
+        return self.dir_cache / f"{key}.json"
+
+    def _load(self):
+        self.dir_cache.mkdir(parents=True, exist_ok=True)
+        entries = list()
+        for path_meta in self.dir_cache.glob("*.json"):
+            key = path_meta.stem
+            try:
+                entry = CacheEntry(**json.loads(path_meta.read_text("utf-8")))
+                entry.size = self._path_bin(key).stat().st_size
+            except (FileNotFoundError, ValueError, TypeError):
+                # a partially written or corrupted entry
+                self._delete_files(key)
+                continue
+            entries.append((key, entry))
+        entries.sort(key=lambda pair: pair[1].checked_at)
+        for key, entry in entries:
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+        with self._lock:
+            self._evict()
+
+    def _delete_files(self, key: str):
+        self._path_bin(key).unlink(missing_ok=True)
+        self._path_meta(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self._delete_files(key)
+
+    def get_entry(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def read(self, key: str) -> bytes | None:
+        """
+        Return the cached content, None if it is not cached.
+        """
+        if self.get_entry(key) is None:
+            return None
+        try:
+            return self._path_bin(key).read_bytes()
+        except FileNotFoundError:
+            self.delete(key)
+            return None
+
+    def put(self, key: str, url: str, content: bytes, etag: str | None):
+        """
+        Write the content, the files are written to temp files and renamed,
+        so a reader never sees a partial file.
+        """
+        entry = CacheEntry(
+            url=url,
+            etag=etag,
+            size=len(content),
+            checked_at=time.time(),
+        )
+        path_bin = self._path_bin(key)
+        path_tmp = path_bin.with_name(f"{key}.{threading.get_ident()}.tmp")
+        path_tmp.write_bytes(content)
+        os.replace(path_tmp, path_bin)
+        self._write_meta(key, entry)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old.size
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            self._evict()
+
+    def _write_meta(self, key: str, entry: CacheEntry):
+        path_meta = self._path_meta(key)
+        path_tmp = path_meta.with_name(f"{key}.{threading.get_ident()}.meta.tmp")
+        path_tmp.write_text(json.dumps(entry.to_dict()), encoding="utf-8")
+        os.replace(path_tmp, path_meta)
+
+    def touch(self, key: str):
+        """
+        Mark a cached file as revalidated now.
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            entry.checked_at = time.time()
+            self._write_meta(key, entry)
+
+    def delete(self, key: str):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+        self._delete_files(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def get_cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+@dataclasses.dataclass
+class IconClient:
+    """
+    Fetch published icons with a local disk cache, see module docstring.
+
+    Args:
+        url_root: Public URL of the vault root, i.e. of ``One.s3dir_root``.
+        dir_cache: The cache directory.
+        max_cache_bytes: Maximum total size of the cached icons.
+        max_age: Seconds a cached icon is used without revalidation.
+        pool_size: Size of the HTTP connection pool, it should be at least
+            the number of threads that call the client at the same time.
+        timeout: Timeout in seconds of each request.
+        stale_if_error: If True, return the cached icon when the
+            revalidation fails with a network error or a server error.
+    """
+
+    url_root: str = dataclasses.field()
+    dir_cache: Path = dataclasses.field(default=dir_icon_cache)
+    max_cache_bytes: int = dataclasses.field(default=256 * 1024 * 1024)
+    max_age: float = dataclasses.field(default=300.0)
+    pool_size: int = dataclasses.field(default=16)
+    timeout: float = dataclasses.field(default=10.0)
+    stale_if_error: bool = dataclasses.field(default=True)
+
+    def __post_init__(self):
+        self._in_flight: dict[str, Future] = dict()
+        self._lock = threading.Lock()
+
+    @cached_property
+    def session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @cached_property
+    def cache(self) -> DiskLRUCache:
+        return DiskLRUCache(dir_cache=self.dir_cache, max_bytes=self.max_cache_bytes)
+
+    def get_url(self, name: str, size: int | None = None) -> str:
+        """
+        Return the URL of the SVG if ``size`` is None, otherwise of the PNG,
+        the layout is the same as in
+        :meth:`~my_icon_vault.structure.IconAsset.get_local_and_s3_pairs`.
+        """
+        url_root = self.url_root.rstrip("/")
+        if size is None:
+            return f"{url_root}/assets/icons/{name}/{name}.svg"
+        return f"{url_root}/assets/icons/{name}/{name}-{size}x{size}.png"
+
+    def get_icon(self, name: str, size: int | None = None) -> bytes:
+        """
+        Return the SVG if ``size`` is None, otherwise the PNG of that size.
+
+        Raises:
+            requests.HTTPError: If the icon doesn't exist.
+        """
+        return self.get(self.get_url(name, size))
+
+    def get(self, url: str) -> bytes:
+        """
+        Return the content of a URL, from the cache if it is fresh.
+        """
+        key = get_cache_key(url)
+        entry = self.cache.get_entry(key)
+        if entry is not None and (time.time() - entry.checked_at) < self.max_age:
+            content = self.cache.read(key)
+            if content is not None:
+                return content
+
+        # only one thread downloads a URL, the others wait for its result
+        with self._lock:
+            future = self._in_flight.get(url)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[url] = future
+        if is_leader is False:
+            return future.result()
+        try:
+            content = self._fetch(key, url)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[url]
+
+    def _fetch(self, key: str, url: str) -> bytes:
+        """
+        Download the URL, or revalidate the cached content with its ``ETag``.
+        """
+        entry = self.cache.get_entry(key)
+        cached = self.cache.read(key) if entry is not None else None
+        headers = dict()
+        if cached is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        try:
+            res = self.session.get(url, headers=headers, timeout=self.timeout)
+            if res.status_code >= 500:
+                res.raise_for_status()
+        except requests.RequestException:
+            if cached is not None and self.stale_if_error:
+                return cached
+            raise
+        if res.status_code == 304 and cached is not None:
+            self.cache.touch(key)
+            return cached
+        if res.status_code == 404:
+            self.cache.delete(key)
+        res.raise_for_status()
+        self.cache.put(key, url, res.content, res.headers.get("ETag"))
+        return res.content
+
+    def close(self):
+        if "session" in self.__dict__:
+            self.session.close()
+            del self.__dict__["session"]
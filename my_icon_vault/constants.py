@@ -1,3 +1,24 @@
 # -*- coding: utf-8 -*-
 
+import enum
+
 size_list = [96, 256, 512]
+
+
+class BuildStageEnum(str, enum.Enum):
+    """
+    Name of each build stage, used as the key in the build manifest.
+    """
+
+    compress_svg = "compress_svg"
+    generate_png = "generate_png"
+    compress_png = "compress_png"
+    build_png = "build_png"
+
+
+# the stages that write the same final ``assets/icons/*/*-NxN.png`` files,
+# recording one of them invalidates the manifest records of the others
+shared_output_stages = {
+    BuildStageEnum.compress_png: [BuildStageEnum.build_png],
+    BuildStageEnum.build_png: [BuildStageEnum.compress_png],
+}
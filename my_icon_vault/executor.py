@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared Worker Pool - one long-lived process pool for every build stage
+
+By default each ``parallel_run`` creates its own ``mpire.WorkerPool``, which
+forks the workers, runs one map call and tears the workers down again. An
+incremental build calls several stages, so it pays the pool start-up cost
+several times. :class:`WorkerPoolExecutor` keeps one pool alive (mpire
+``keep_alive=True``) and is passed to every ``parallel_run`` call instead.
+
+The executor also picks a chunk size that gives each worker a few large chunks
+of tasks, instead of mpire's default of ``n_jobs * 64`` tiny chunks that is
+dominated by the dispatch overhead when there are thousands of small icons.
+
+It also accepts single tasks with :meth:`WorkerPoolExecutor.submit`, so the
+:mod:`my_icon_vault.scheduler` pipeline runs its process stages on the same
+warm workers.
+
+Example::
+
+    with WorkerPoolExecutor(n_jobs=8) as executor:
+        SvgoCmd.parallel_batch_run(svgo_cmds, executor=executor)
+        Svg2PngMultiSizeCmd.parallel_run(svg2png_cmds, executor=executor)
+"""
+
+import typing as T
+import os
+import math
+import importlib
+import functools
+import dataclasses
+from concurrent.futures import Future
+
+import mpire
+
+from .profiler import stop_inherited_profiling
+
+
+def _init_worker(modules: tuple[str, ...]):
+    """
+    mpire ``worker_init``, reset the profilers inherited from a profiled
+    parent, see :func:`~my_icon_vault.profiler.stop_inherited_profiling`, and
+    import heavy modules once per worker, so they are already loaded when the
+    first task arrives (e.g. with ``spawn``).
+    """
+    stop_inherited_profiling()
+    for module in modules:
+        importlib.import_module(module)
+
+
+@dataclasses.dataclass
+class WorkerPoolExecutor:
+    """
+    A reusable ``mpire.WorkerPool``.
+
+    Args:
+        n_jobs: Number of worker processes, defaults to the number of CPUs.
+        chunk_size: Number of tasks a worker takes at a time. If None, split
+            the tasks into ``chunks_per_worker`` chunks per worker.
+        chunks_per_worker: Only used when ``chunk_size`` is None.
+        start_method: ``fork``, ``spawn`` or ``forkserver``.
+        preload_modules: Modules imported in every worker when it starts.
+            With ``fork`` the workers already inherit the parent's modules.
+
+    .. note::
+
+        The task functions are sent to the long-lived workers, so they have to
+        be picklable (module level functions, not closures).
+    """
+
+    n_jobs: int | None = dataclasses.field(default=None)
+    chunk_size: int | None = dataclasses.field(default=None)
+    chunks_per_worker: int = dataclasses.field(default=4)
+    start_method: str = dataclasses.field(default="fork")
+    preload_modules: tuple[str, ...] = dataclasses.field(default=("cairosvg",))
+
+    _pool: mpire.WorkerPool | None = dataclasses.field(default=None, init=False)
+
+    def __post_init__(self):
+        if self.n_jobs is None:
+            self.n_jobs = os.cpu_count() or 1
+        # mpire restarts the workers when worker_init changes,
+        # so the same object is passed to every map call
+        self._worker_init = functools.partial(_init_worker, self.preload_modules)
+
+    @property
+    def pool(self) -> mpire.WorkerPool:
+        if self._pool is None:
+            self._pool = mpire.WorkerPool(
+                n_jobs=self.n_jobs,
+                start_method=self.start_method,
+                keep_alive=True,
+            )
+        return self._pool
+
+    def start(self):
+        """
+        Fork the workers now if they are not running yet, by running a no-op
+        task. Call it before starting threads, forking a process that runs
+        other threads can deadlock the child.
+        """
+        self.pool.apply_async(int, worker_init=self._worker_init).get()
+
+    def submit(self, func: T.Callable, *args) -> Future:
+        """
+        Run ``func(*args)`` on a worker, the ``concurrent.futures`` way.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self.pool.apply_async(
+            func,
+            args=args,
+            callback=future.set_result,
+            error_callback=future.set_exception,
+            worker_init=self._worker_init,
+        )
+        return future
+
+    def get_chunk_size(self, n_tasks: int) -> int:
+        if self.chunk_size is not None:
+            return self.chunk_size
+        return max(1, math.ceil(n_tasks / (self.n_jobs * self.chunks_per_worker)))
+
+    def map(
+        self,
+        func: T.Callable,
+        tasks: list[dict[str, T.Any]],
+    ) -> list[T.Any]:
+        """
+        Same as ``mpire.WorkerPool.map`` with keyword argument tasks,
+        results are in the order of the tasks.
+        """
+        if not tasks:
+            return []
+        return self.pool.map(
+            func,
+            tasks,
+            iterable_len=len(tasks),
+            chunk_size=self.get_chunk_size(len(tasks)),
+            worker_init=self._worker_init,
+        )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def parallel_map(
+    func: T.Callable,
+    tasks: list[dict[str, T.Any]],
+    executor: WorkerPoolExecutor | None = None,
+) -> list[T.Any]:
+    """
+    Run the tasks on the shared executor, or on a throwaway
+    ``mpire.WorkerPool`` if no executor is given.
+    """
+    if executor is not None:
+        return executor.map(func, tasks)
+    with mpire.WorkerPool(start_method="fork") as pool:
+        results = pool.map(
+            func,
+            tasks,
+        )
+    return results
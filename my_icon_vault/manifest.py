@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental Build Manifest - remember what each build stage already did
+
+The build pipeline (svgo -> cairosvg -> pngquant) is deterministic: given the
+same stage input, the same stage parameters and the same tool version, it
+always produces the same artifacts. The input of a stage is the file it
+reads, the SVG for most stages and the renders of the ``generate_png`` stage
+for ``compress_png``. This module persists those three inputs for every asset
+and every stage in a small JSON file, so that the next build only has to
+process the assets whose inputs actually changed.
+
+The manifest layout looks like this::
+
+    {
+        "version": 1,
+        "stages": {
+            "compress_svg": {
+                "github": {
+                    "input_hash": "9f86d0...",
+                    "params": {"precision": 1, "multipass": true},
+                    "tool_version": "4.0.0"
+                }
+            }
+        }
+    }
+"""
+
+import typing as T
+import json
+import hashlib
+import dataclasses
+from pathlib import Path
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .structure import IconAsset
+
+MANIFEST_VERSION = 1
+
+
+def get_file_sha256(path: Path) -> str:
+    """
+    Compute the SHA256 hex digest of a file's content.
+    """
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_files_sha256(paths: T.Iterable[Path]) -> str:
+    """
+    Compute one SHA256 hex digest of several files, in the given order.
+    A missing file never matches the digest of an existing one.
+    """
+    sha256 = hashlib.sha256()
+    for path in paths:
+        digest = get_file_sha256(path) if path.exists() else "missing"
+        sha256.update(f"{path.name}:{digest}\n".encode("utf-8"))
+    return sha256.hexdigest()
+
+
+def _normalize(value: T.Any) -> T.Any:
+    """
+    Round trip a value through JSON, so that freshly computed values
+    (e.g. tuples) compare equal to the values loaded from the manifest file.
+    """
+    return json.loads(json.dumps(value, default=str))
+
+
+@dataclasses.dataclass
+class StageRecord:
+    """
+    Everything that determines the output of one build stage for one asset.
+
+    Args:
+        input_hash: SHA256 of the stage input, see
+            :meth:`~my_icon_vault.structure.IconAsset.get_stage_input_hash`.
+        params: JSON serializable parameters of the stage command(s).
+        tool_version: Version of the external tool that does the work.
+    """
+
+    input_hash: str = dataclasses.field()
+    params: T.Any = dataclasses.field()
+    tool_version: str = dataclasses.field()
+
+    def __post_init__(self):
+        self.params = _normalize(self.params)
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return dataclasses.asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, T.Any]) -> "StageRecord":
+        return cls(**data)
+
+
+@dataclasses.dataclass
+class BuildPlan:
+    """
+    The result of comparing the current assets against the build manifest.
+
+    Args:
+        stage: The build stage this plan is for.
+        todo: Assets whose inputs changed and have to be rebuilt.
+        skipped: Assets that are up to date and can be skipped.
+        cmd_kwargs: Extra arguments used to build the stage commands.
+    """
+
+    stage: str = dataclasses.field()
+    todo: list["IconAsset"] = dataclasses.field(default_factory=list)
+    skipped: list["IconAsset"] = dataclasses.field(default_factory=list)
+    cmd_kwargs: dict[str, T.Any] = dataclasses.field(default_factory=dict)
+
+    def print_summary(self):
+        print(
+            f"[{self.stage}] {len(self.todo)} assets to build, "
+            f"{len(self.skipped)} unchanged assets skipped"
+        )
+        if self.skipped:
+            print(f"  skipped: {', '.join(asset.name for asset in self.skipped)}")
+
+
+@dataclasses.dataclass
+class BuildManifest:
+    """
+    Persisted ``{stage: {asset_name: StageRecord}}`` mapping.
+
+    Example:
+        >>> manifest = BuildManifest.load(Path("build-manifest.json"))
+        >>> record = StageRecord(input_hash="abc", params={}, tool_version="1.0")
+        >>> manifest.is_up_to_date("compress_svg", "github", record)
+        False
+        >>> manifest.update("compress_svg", "github", record)
+        >>> manifest.dump()
+    """
+
+    path: Path = dataclasses.field()
+    stages: dict[str, dict[str, StageRecord]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        """
+        Load the manifest from disk, return an empty manifest if the file
+        does not exist or was written by an incompatible version.
+        """
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls(path=path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path=path)
+        stages = {
+            stage: {
+                name: StageRecord.from_dict(record)
+                for name, record in records.items()
+            }
+            for stage, records in data.get("stages", {}).items()
+        }
+        return cls(path=path, stages=stages)
+
+    def dump(self):
+        data = {
+            "version": MANIFEST_VERSION,
+            "stages": {
+                stage: {
+                    name: record.to_dict() for name, record in sorted(records.items())
+                }
+                for stage, records in sorted(self.stages.items())
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=4) + "\n", encoding="utf-8")
+
+    def get(self, stage: str, name: str) -> StageRecord | None:
+        return self.stages.get(stage, {}).get(name)
+
+    def is_up_to_date(self, stage: str, name: str, record: StageRecord) -> bool:
+        """
+        Return True if the stored record of this asset equals ``record``.
+        """
+        return self.get(stage, name) == record
+
+    def update(self, stage: str, name: str, record: StageRecord):
+        self.stages.setdefault(stage, dict())[name] = record
+
+    def remove(self, stage: str, name: str):
+        """
+        Forget the record of this asset, so the stage rebuilds it next time.
+        """
+        self.stages.get(stage, {}).pop(name, None)
+
+    def prune(self, names: T.Iterable[str]):
+        """
+        Remove the records of assets that no longer exist.
+        """
+        names = set(names)
+        for records in self.stages.values():
+            for name in list(records):
+                if name not in names:
+                    records.pop(name)
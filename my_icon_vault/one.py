@@ -1,19 +1,87 @@
 # -*- coding: utf-8 -*-
 
 import typing as T
+import os
+import json
+import time
 import itertools
+import contextlib
+from pathlib import Path
+import functools
 import dataclasses
 from functools import cached_property
 
-import boto3
 from s3pathlib import S3Path
 from home_secret.api import hs
 
-from .paths import path_icon_list_md
+from .constants import size_list, BuildStageEnum, shared_output_stages
+from .base import BatchRunError, CmdResult
+from .paths import (
+    dir_reports,
+    dir_profile,
+    dir_traces,
+    path_catalog_db,
+    path_icon_bundle,
+    path_autotune_cache,
+    path_icon_list_md,
+    path_build_manifest,
+    path_icon_manifest_json,
+)
+from .manifest import BuildManifest, BuildPlan
 from .svgo_wrapper import SvgoCmd
-from .cairosvg_wrapper import Svg2PngCmd
+from .svgmin import SvgoBackendEnum
+from .cairosvg_wrapper import Svg2PngMultiSizeCmd
 from .pngquant_wrapper import PngQuantCmd
+from .palette import SharedPaletteCmd
+from .quantize import QuantizeBackendEnum
+from .autotune import AutoTuner, AutoTuneCache, TuneSettings
+from .render_quantize import RenderQuantizeCmd
+from .atlas import AtlasMap, AtlasBuilder
+from .executor import WorkerPoolExecutor
+from .async_runner import AsyncCmdRunner
+from .report import RunReport
+from .profiler import profile_block, print_summary as print_profile_summary
+from .tracing import Tracer
+from .uploader import new_s3_client, UploadTask, UploadResult, R2Uploader
+from .publish import CACHE_CONTROL_NO_CACHE, guess_content_type, new_icon_manifest
+from .scheduler import Stage, PipelineResult, PipelineScheduler
 from .structure import IconAsset
+from .catalog import AssetCatalog
+from .bundle import write_bundle
+
+
+# the pipeline stage functions are module level functions,
+# so they can be pickled and sent to the process pool
+def _optimize_svg(
+    asset: IconAsset,
+    backend: str = SvgoBackendEnum.svgo.value,
+    profile_dir: Path | None = None,
+) -> list[CmdResult]:
+    return [asset.to_svgo_cmd(backend=backend).run(profile_dir=profile_dir)]
+
+
+def _render_png(
+    asset: IconAsset,
+    downsample: bool = False,
+    profile_dir: Path | None = None,
+) -> list[CmdResult]:
+    cmd = asset.to_svg2png_multi_size_cmd(downsample=downsample)
+    return [cmd.run(profile_dir=profile_dir)]
+
+
+def _quantize_png(
+    asset: IconAsset,
+    backend: str = QuantizeBackendEnum.pngquant.value,
+    shared_palette: bool = False,
+    profile_dir: Path | None = None,
+) -> list[CmdResult]:
+    if shared_palette:
+        cmd = asset.to_shared_palette_cmd(backend=backend)
+        return [cmd.run(profile_dir=profile_dir)]
+    return [
+        cmd.run(profile_dir=profile_dir)
+        for cmd in asset.to_pngquant_cmds(backend=backend)
+    ]
 
 
 @dataclasses.dataclass
@@ -26,6 +94,38 @@ class Config:
 
 @dataclasses.dataclass
 class One:
+    """
+    :param upload_concurrency: number of concurrent uploads to Cloudflare R2,
+        it is also the size of the boto3 connection pool.
+    :param upload_max_attempts: number of attempts per file before giving up.
+    :param public_url_root: the public URL of :attr:`s3dir_root`, used in the
+        icon manifest. If None, the manifest uses keys relative to it.
+    :param worker_count: number of worker processes of the shared worker pool,
+        defaults to the number of CPUs.
+    :param worker_chunk_size: number of tasks a worker takes at a time,
+        if None, each worker gets a few large chunks.
+    :param worker_start_method: start method of the worker processes.
+    :param tool_concurrency: maximum number of concurrent svgo / pngquant
+        processes in ``use_async`` mode, defaults to twice the number of CPUs.
+    :param tracer: if set, every stage adds its spans to it,
+        see :meth:`tracing`.
+    :param auto_tuner: the metric, threshold and candidates of
+        ``compress_png(auto_tune=True)``, defaults to :class:`AutoTuner`.
+    :param atlas_builder: the layout and quantization of :meth:`build_atlas`,
+        defaults to :class:`~my_icon_vault.atlas.AtlasBuilder`.
+    """
+
+    upload_concurrency: int = dataclasses.field(default=16)
+    upload_max_attempts: int = dataclasses.field(default=5)
+    public_url_root: str | None = dataclasses.field(default=None)
+    worker_count: int | None = dataclasses.field(default=None)
+    worker_chunk_size: int | None = dataclasses.field(default=None)
+    worker_start_method: str = dataclasses.field(default="fork")
+    tool_concurrency: int | None = dataclasses.field(default=None)
+    tracer: Tracer | None = dataclasses.field(default=None)
+    auto_tuner: AutoTuner | None = dataclasses.field(default=None)
+    atlas_builder: AtlasBuilder | None = dataclasses.field(default=None)
+
     @cached_property
     def config(self) -> Config:
         p1 = "providers.cloudflare.accounts.sh.secrets.read_and_write_all_r2_bucket.creds.endpoint"
@@ -40,12 +140,20 @@ class One:
 
     @cached_property
     def s3_client(self):
-        return boto3.client(
-            service_name="s3",
+        return new_s3_client(
             endpoint_url=self.config.cloudflare_r2_endpoint,
             aws_access_key_id=self.config.cloudflare_r2_access_key,
             aws_secret_access_key=self.config.cloudflare_r2_secret_key,
             region_name="auto",
+            max_pool_connections=self.upload_concurrency,
+        )
+
+    @cached_property
+    def uploader(self) -> R2Uploader:
+        return R2Uploader(
+            s3_client=self.s3_client,
+            max_workers=self.upload_concurrency,
+            max_attempts=self.upload_max_attempts,
         )
 
     @cached_property
@@ -55,32 +163,770 @@ class One:
         )
 
     @cached_property
-    def icon_assets(self):
-        return IconAsset.list_all()
+    def executor(self) -> WorkerPoolExecutor:
+        """
+        The worker pool shared by every build stage, its workers are started
+        by the first stage and reused until :meth:`close`.
+        """
+        return WorkerPoolExecutor(
+            n_jobs=self.worker_count,
+            chunk_size=self.worker_chunk_size,
+            start_method=self.worker_start_method,
+        )
+
+    @cached_property
+    def async_runner(self) -> AsyncCmdRunner:
+        if self.tool_concurrency is None:
+            return AsyncCmdRunner()
+        return AsyncCmdRunner(concurrency=self.tool_concurrency)
+
+    def close(self):
+        """
+        Stop the workers of the shared worker pool.
+        """
+        if "executor" in self.__dict__:
+            self.executor.close()
+            del self.__dict__["executor"]
+
+    @cached_property
+    def catalog(self) -> AssetCatalog:
+        return AssetCatalog(path_db=path_catalog_db)
+
+    @cached_property
+    def icon_assets(self) -> list[IconAsset]:
+        """
+        All assets sorted by name, from the :attr:`catalog` after an
+        incremental refresh, see :mod:`my_icon_vault.catalog`.
+        """
+        self.catalog.refresh(verbose=True)
+        return self.catalog.list_assets()
 
-    def compress_svg(self):
-        cmds = [asset.to_svgo_cmd() for asset in self.icon_assets]
-        SvgoCmd.parallel_run(cmds, verbose=True)
+    @cached_property
+    def manifest(self) -> BuildManifest:
+        return BuildManifest.load(path_build_manifest)
+
+    @cached_property
+    def auto_tune_cache(self) -> AutoTuneCache:
+        return AutoTuneCache.load(path_autotune_cache)
+
+    def auto_tune(
+        self,
+        backend: str = QuantizeBackendEnum.pngquant.value,
+    ) -> TuneSettings:
+        """
+        Choose the pngquant settings of every render with :attr:`auto_tuner`,
+        see :mod:`my_icon_vault.autotune`. Only the renders that changed since
+        the last search are searched, on the shared worker pool.
+
+        :param backend: the quantization backend to tune for.
+        """
+        tuner = dataclasses.replace(self.auto_tuner or AutoTuner(), backend=backend)
+        with self._trace("auto_tune"):
+            settings = tuner.tune(
+                self.icon_assets,
+                cache=self.auto_tune_cache,
+                executor=self.executor,
+            )
+        self.auto_tune_cache.prune(asset.name for asset in self.icon_assets)
+        self.auto_tune_cache.dump()
+        return settings
+
+    def plan(
+        self,
+        stage: BuildStageEnum,
+        force: bool = False,
+        **cmd_kwargs,
+    ) -> BuildPlan:
+        """
+        Find out which assets have to be rebuilt for the given stage.
+
+        An asset is skipped if the hash of its stage input, the stage
+        parameters and the tool version match the build manifest and all of
+        its stage outputs exist, see :meth:`IconAsset.get_stage_input_hash`.
+
+        :param force: if True, rebuild every asset.
+        :param cmd_kwargs: extra arguments used to build the stage commands.
+        """
+        plan = BuildPlan(stage=stage.value, cmd_kwargs=cmd_kwargs)
+        for asset in self.icon_assets:
+            if (force is False) and self.is_up_to_date(stage, asset, **cmd_kwargs):
+                plan.skipped.append(asset)
+            else:
+                plan.todo.append(asset)
+        plan.print_summary()
+        return plan
 
-    def generate_png(self):
-        cmds = list(
-            itertools.chain(*(asset.to_svg2png_cmds() for asset in self.icon_assets))
+    def is_up_to_date(
+        self,
+        stage: BuildStageEnum,
+        asset: IconAsset,
+        **cmd_kwargs,
+    ) -> bool:
+        return self.manifest.is_up_to_date(
+            stage.value,
+            asset.name,
+            asset.get_stage_record(stage, **cmd_kwargs),
+        ) and all(
+            path.exists() for path in asset.get_stage_outputs(stage, **cmd_kwargs)
         )
-        Svg2PngCmd.parallel_run(cmds, verbose=True)
 
-    def compress_png(self):
-        cmds = list(
-            itertools.chain(*(asset.to_pngquant_cmds() for asset in self.icon_assets))
+    def _record(self, stage: BuildStageEnum, asset: IconAsset, **cmd_kwargs):
+        self.manifest.update(
+            stage.value,
+            asset.name,
+            asset.get_stage_record(stage, **cmd_kwargs),
         )
-        PngQuantCmd.parallel_run(cmds, verbose=True)
-
-    def upload_to_cloudflare_r2(self):
-        icon_assets = IconAsset.list_all()
-        for icon_asset in icon_assets:
-            icon_asset.upload_to_cloudflare_r2(
-                s3_client=self.s3_client,
-                s3dir_root=self.s3dir_root,
+        # the other stages' outputs were overwritten, they must run again
+        for other in shared_output_stages.get(stage, []):
+            self.manifest.remove(other.value, asset.name)
+
+    def _commit(self, plan: BuildPlan):
+        """
+        Record the stage inputs of the successfully built assets.
+        """
+        stage = BuildStageEnum(plan.stage)
+        for asset in plan.todo:
+            self._record(stage, asset, **plan.cmd_kwargs)
+        self.manifest.prune(asset.name for asset in self.icon_assets)
+        self.manifest.dump()
+
+    @contextlib.contextmanager
+    def tracing(self, path: Path | None = None) -> T.Iterator[Tracer]:
+        """
+        Trace every stage executed in the with block, then write the trace to
+        ``path``, defaults to ``tmp/traces/trace-{time}.json``,
+        see :mod:`my_icon_vault.tracing`.
+        """
+        if path is None:
+            path = dir_traces / f"trace-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        tracer, self.tracer = self.tracer, Tracer()
+        try:
+            yield self.tracer
+        finally:
+            tracer, self.tracer = self.tracer, tracer
+            tracer.dump(path)
+            print(f"Trace: {path}")
+
+    @contextlib.contextmanager
+    def _trace(self, stage: str) -> T.Iterator[None]:
+        """
+        Add a stage span of the with block to :attr:`tracer`, if any.
+        """
+        if self.tracer is None:
+            yield
+            return
+        with self.tracer.span(stage):
+            yield
+
+    @contextlib.contextmanager
+    def _report(self, plan: BuildPlan) -> T.Iterator[RunReport]:
+        """
+        Measure the stage executed in the with block, the block sets
+        ``report.results``. The report is written to
+        ``tmp/reports/{stage}.json``, also if the stage failed, and the
+        results are added to :attr:`tracer`.
+        """
+        report = RunReport(stage=plan.stage)
+        start = time.perf_counter()
+        try:
+            with self._trace(plan.stage):
+                yield report
+        except BatchRunError as e:
+            report.results = e.results
+            raise
+        finally:
+            report.elapsed = time.perf_counter() - start
+            if self.tracer is not None:
+                self.tracer.add_results(plan.stage, report.results)
+            report.dump(dir_reports / f"{plan.stage}.json")
+            report.print_summary()
+
+    @contextlib.contextmanager
+    def _profile(self, plan: BuildPlan, profile: bool) -> T.Iterator[Path | None]:
+        """
+        If ``profile`` is True, profile the stage executed in the with block
+        in the main process, and yield the directory where the workers write
+        their profiles. Then merge the profiles and print a summary,
+        see :mod:`my_icon_vault.profiler`.
+        """
+        if profile is False:
+            yield None
+            return
+        profile_dir = dir_profile / f"{plan.stage}-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            with profile_block(profile_dir, label=plan.stage):
+                yield profile_dir
+        finally:
+            print_profile_summary(profile_dir)
+
+    def compress_svg(
+        self,
+        force: bool = False,
+        batch: bool = True,
+        chunk_size: int = 50,
+        use_async: bool = False,
+        profile: bool = False,
+        backend: str = SvgoBackendEnum.svgo.value,
+    ) -> BuildPlan:
+        """
+        :param batch: if True, optimize up to ``chunk_size`` files per svgo
+            process, otherwise spawn one svgo process per file.
+        :param use_async: if True, spawn one svgo process per file from an
+            asyncio event loop in this process instead of the worker pool,
+            see :attr:`async_runner`. It takes precedence over ``batch``.
+        :param profile: if True, capture cProfile stats and tracemalloc peak
+            memory in the main process and in every worker, and merge them
+            into ``tmp/profile/{stage}-{time}/merged.prof``.
+        :param backend: ``"svgo"``, or ``"svgmin"`` to optimize in the worker
+            processes without Node.js, see :mod:`my_icon_vault.svgmin`.
+            ``use_async`` requires ``"svgo"``.
+        """
+        if use_async and backend != SvgoBackendEnum.svgo.value:
+            raise ValueError("use_async requires the svgo backend")
+        plan = self.plan(BuildStageEnum.compress_svg, force=force, backend=backend)
+        cmds = [asset.to_svgo_cmd(**plan.cmd_kwargs) for asset in plan.todo]
+        with (
+            self._profile(plan, profile) as profile_dir,
+            self._report(plan) as report,
+        ):
+            if cmds and use_async:
+                report.results = self.async_runner.run(cmds, verbose=True)
+            elif cmds and batch:
+                report.results = SvgoCmd.parallel_batch_run(
+                    cmds,
+                    chunk_size=chunk_size,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+            elif cmds:
+                report.results = SvgoCmd.parallel_run(
+                    cmds,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+        # svgo rewrites the SVG in place, the record is computed after the run
+        # so the optimized SVG is treated as unchanged in the next build
+        self._commit(plan)
+        return plan
+
+    def generate_png(
+        self,
+        force: bool = False,
+        downsample: bool = False,
+        quality_check: bool = True,
+        profile: bool = False,
+    ) -> BuildPlan:
+        """
+        :param downsample: if True, render each SVG once at the largest size
+            and downsample it to the smaller sizes,
+            see :class:`~my_icon_vault.cairosvg_wrapper.Svg2PngMultiSizeCmd`.
+        :param quality_check: only used with ``downsample``, if True (the
+            default), verify the downsampled sizes against a direct render of
+            the smallest size, and render every size directly if it fails.
+        :param profile: see :meth:`compress_svg`.
+        """
+        plan = self.plan(
+            BuildStageEnum.generate_png,
+            force=force,
+            downsample=downsample,
+            quality_check=quality_check,
+        )
+        cmds = [
+            asset.to_svg2png_multi_size_cmd(**plan.cmd_kwargs) for asset in plan.todo
+        ]
+        with (
+            self._profile(plan, profile) as profile_dir,
+            self._report(plan) as report,
+        ):
+            if cmds:
+                report.results = Svg2PngMultiSizeCmd.parallel_run(
+                    cmds,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+        self._commit(plan)
+        return plan
+
+    def compress_png(
+        self,
+        force: bool = False,
+        batch: bool = True,
+        chunk_size: int = 50,
+        use_async: bool = False,
+        profile: bool = False,
+        backend: str = QuantizeBackendEnum.pngquant.value,
+        auto_tune: bool = False,
+        shared_palette: bool = False,
+    ) -> BuildPlan:
+        """
+        :param batch: if True, compress up to ``chunk_size`` files per pngquant
+            process, otherwise spawn one pngquant process per file.
+        :param use_async: see :meth:`compress_svg`.
+        :param profile: see :meth:`compress_svg`.
+        :param backend: quantization backend, ``"pngquant"`` or ``"pillow"``,
+            see :mod:`my_icon_vault.quantize`. The ``"pillow"`` backend
+            quantizes in the worker processes, ``use_async`` doesn't apply.
+        :param auto_tune: if True, compress each render with the settings
+            chosen by :meth:`auto_tune` instead of the fixed quality range.
+        :param shared_palette: if True, compress all sizes of an asset with
+            one palette, see :mod:`my_icon_vault.palette`. One command per
+            asset, ``batch`` and ``use_async`` don't apply.
+        """
+        if use_async and backend != QuantizeBackendEnum.pngquant.value:
+            raise ValueError("use_async requires the pngquant backend")
+        if use_async and shared_palette:
+            raise ValueError("use_async doesn't support shared_palette")
+        tune_settings = self.auto_tune(backend=backend) if auto_tune else None
+        plan = self.plan(
+            BuildStageEnum.compress_png,
+            force=force,
+            backend=backend,
+            tune_settings=tune_settings,
+            shared_palette=shared_palette,
+        )
+        kwargs = dict(backend=backend, tune_settings=tune_settings)
+        if shared_palette:
+            shared_cmds = [asset.to_shared_palette_cmd(**kwargs) for asset in plan.todo]
+            cmds = list()
+        else:
+            shared_cmds = list()
+            cmds = list(
+                itertools.chain(
+                    *(asset.to_pngquant_cmds(**kwargs) for asset in plan.todo)
+                )
             )
+        with (
+            self._profile(plan, profile) as profile_dir,
+            self._report(plan) as report,
+        ):
+            if shared_cmds:
+                report.results = SharedPaletteCmd.parallel_run(
+                    shared_cmds,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+            elif cmds and use_async:
+                report.results = self.async_runner.run(cmds, verbose=True)
+            elif cmds and batch:
+                report.results = PngQuantCmd.parallel_batch_run(
+                    cmds,
+                    chunk_size=chunk_size,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+            elif cmds:
+                report.results = PngQuantCmd.parallel_run(
+                    cmds,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+        self._commit(plan)
+        return plan
+
+    def build_png(
+        self,
+        force: bool = False,
+        downsample: bool = False,
+        profile: bool = False,
+        backend: str = QuantizeBackendEnum.pngquant.value,
+    ) -> BuildPlan:
+        """
+        Fused alternative to :meth:`generate_png` + :meth:`compress_png`.
+        Each asset is rendered in memory and piped through pngquant, only the
+        final PNG files are written to disk.
+
+        :param profile: see :meth:`compress_svg`.
+        :param backend: see :meth:`compress_png`.
+        """
+        plan = self.plan(
+            BuildStageEnum.build_png,
+            force=force,
+            downsample=downsample,
+            backend=backend,
+        )
+        cmds = [asset.to_render_quantize_cmd(**plan.cmd_kwargs) for asset in plan.todo]
+        with (
+            self._profile(plan, profile) as profile_dir,
+            self._report(plan) as report,
+        ):
+            if cmds:
+                report.results = RenderQuantizeCmd.parallel_run(
+                    cmds,
+                    verbose=True,
+                    executor=self.executor,
+                    profile_dir=profile_dir,
+                )
+        self._commit(plan)
+        return plan
+
+    @cached_property
+    def s3dir_icons(self) -> S3Path:
+        return self.s3dir_root.joinpath("assets", "icons").to_dir()
+
+    @cached_property
+    def s3dir_atlas(self) -> S3Path:
+        return self.s3dir_root.joinpath("assets", "atlas").to_dir()
+
+    def _upload_asset(self, asset: IconAsset) -> list[UploadResult]:
+        """
+        Upload the files of one asset, the upload stage of :meth:`run_pipeline`.
+        """
+        results = list()
+        for task in asset.to_upload_tasks(self.s3dir_root):
+            result = self.uploader.upload_one(task)
+            if result.is_succeeded is False:
+                raise IOError(f"failed to upload {task.path}: {result.error}")
+            results.append(result)
+        return results
+
+    def run_pipeline(
+        self,
+        force: bool = False,
+        downsample: bool = False,
+        upload: bool = False,
+        optimize_concurrency: int = 4,
+        render_concurrency: int = os.cpu_count() or 1,
+        quantize_concurrency: int = 8,
+        max_in_flight: int = 64,
+        optimize_backend: str = SvgoBackendEnum.svgo.value,
+        quantize_backend: str = QuantizeBackendEnum.pngquant.value,
+        shared_palette: bool = False,
+        profile: bool = False,
+    ) -> PipelineResult:
+        """
+        Build (and optionally upload) every asset as a chain of tasks:
+        optimize -> render -> quantize -> upload, without a barrier between
+        the stages, see :mod:`my_icon_vault.scheduler`.
+
+        Each stage is skipped per asset if it is up to date in the build
+        manifest and no earlier stage rebuilt the asset, e.g. a re-rendered
+        asset is always quantized again. The upload is skipped if no build
+        stage ran.
+
+        The stages that run in worker processes use the shared :attr:`executor`,
+        its workers are started before the thread stages, and stay warm for
+        the next build.
+
+        Like the staged methods, every build stage writes its
+        ``tmp/reports/{stage}.json`` report and adds its results to
+        :attr:`tracer`, the assets that failed in a stage are reported as
+        failed results of that stage.
+
+        :param force: if True, rebuild every asset.
+        :param downsample: see :meth:`generate_png`.
+        :param upload: if True, upload the rebuilt assets to Cloudflare R2,
+            with :attr:`upload_concurrency` concurrent assets.
+        :param max_in_flight: maximum number of assets inside the pipeline.
+        :param optimize_backend: see ``backend`` of :meth:`compress_svg`, the
+            in-process backend runs the optimize stage in worker processes.
+        :param quantize_backend: see ``backend`` of :meth:`compress_png`, the
+            in-process backend runs the quantize stage in worker processes.
+        :param shared_palette: see :meth:`compress_png`.
+        :param profile: see :meth:`compress_svg`, only the stages that run in
+            worker processes are profiled, the thread stages mostly wait on
+            svgo and pngquant.
+
+        :raises BatchRunError: if any asset failed, after all other assets
+            are processed.
+        """
+        # names of the assets that went through at least one build stage,
+        # the stages run in order, so a stage only sees the earlier ones
+        rebuilt: set[str] = set()
+
+        def new_stage(
+            stage: BuildStageEnum,
+            name: str,
+            func: T.Callable,
+            concurrency: int,
+            use_process: bool = False,
+            **cmd_kwargs,
+        ) -> Stage:
+            def is_up_to_date(asset: IconAsset) -> bool:
+                return (
+                    (force is False)
+                    and (asset.name not in rebuilt)
+                    and self.is_up_to_date(stage, asset, **cmd_kwargs)
+                )
+
+            def on_done(asset: IconAsset):
+                rebuilt.add(asset.name)
+                self._record(stage, asset, **cmd_kwargs)
+
+            if use_process:
+                # cProfile can't follow the threads of the thread stages
+                func = functools.partial(func, profile_dir=profile_dir)
+            return Stage(
+                name=name,
+                func=func,
+                concurrency=concurrency,
+                use_process=use_process,
+                is_up_to_date=is_up_to_date,
+                on_done=on_done,
+                executor=self.executor if use_process else None,
+            )
+
+        build_stages = {
+            "optimize": BuildStageEnum.compress_svg,
+            "render": BuildStageEnum.generate_png,
+            "quantize": BuildStageEnum.compress_png,
+        }
+        reports: dict[str, RunReport] = dict()
+        try:
+            with contextlib.ExitStack() as stack:
+                profile_dir = stack.enter_context(
+                    self._profile(BuildPlan(stage="pipeline"), profile)
+                )
+                for name, stage in build_stages.items():
+                    reports[name] = stack.enter_context(
+                        self._report(BuildPlan(stage=stage.value))
+                    )
+                stages = [
+                    new_stage(
+                        BuildStageEnum.compress_svg,
+                        name="optimize",
+                        func=functools.partial(_optimize_svg, backend=optimize_backend),
+                        concurrency=optimize_concurrency,
+                        use_process=optimize_backend != SvgoBackendEnum.svgo.value,
+                        backend=optimize_backend,
+                    ),
+                    new_stage(
+                        BuildStageEnum.generate_png,
+                        name="render",
+                        func=functools.partial(_render_png, downsample=downsample),
+                        concurrency=render_concurrency,
+                        use_process=True,
+                        downsample=downsample,
+                    ),
+                    new_stage(
+                        BuildStageEnum.compress_png,
+                        name="quantize",
+                        func=functools.partial(
+                            _quantize_png,
+                            backend=quantize_backend,
+                            shared_palette=shared_palette,
+                        ),
+                        concurrency=quantize_concurrency,
+                        use_process=(
+                            quantize_backend != QuantizeBackendEnum.pngquant.value
+                            or shared_palette
+                        ),
+                        backend=quantize_backend,
+                        shared_palette=shared_palette,
+                    ),
+                ]
+                if upload:
+                    stages.append(
+                        Stage(
+                            name="upload",
+                            func=self._upload_asset,
+                            concurrency=self.upload_concurrency,
+                            is_up_to_date=lambda asset: asset.name not in rebuilt,
+                        )
+                    )
+
+                if any(stage.use_process for stage in stages):
+                    # fork the workers before the thread stages start
+                    self.executor.start()
+                scheduler = PipelineScheduler(
+                    stages=stages,
+                    max_in_flight=max_in_flight,
+                    key=lambda asset: asset.name,
+                )
+                with self._trace("pipeline"):
+                    result = scheduler.run(self.icon_assets, verbose=True)
+
+                assets = {asset.name: asset for asset in self.icon_assets}
+                for name, report in reports.items():
+                    report.results = [
+                        cmd_result
+                        for cmd_results in result.results[name]
+                        for cmd_result in cmd_results
+                    ]
+                for asset_name, (stage_name, error) in result.failed.items():
+                    if stage_name in reports:
+                        reports[stage_name].results.append(
+                            CmdResult(
+                                path_in=assets[asset_name].path_svg,
+                                returncode=1,
+                                stderr=error,
+                            )
+                        )
+                if upload and self.tracer is not None:
+                    self.tracer.add_upload_results(
+                        upload_result
+                        for upload_results in result.results["upload"]
+                        for upload_result in upload_results
+                    )
+        finally:
+            self.manifest.prune(asset.name for asset in self.icon_assets)
+            self.manifest.dump()
+        for stage_name, names in result.skipped.items():
+            print(f"[{stage_name}] {len(names)} unchanged assets skipped")
+        if result.failed:
+            raise BatchRunError(
+                {
+                    assets[name].path_svg: f"{stage_name}: {error}"
+                    for name, (stage_name, error) in result.failed.items()
+                }
+            )
+        return result
+
+    @cached_property
+    def s3path_icon_manifest_json(self) -> S3Path:
+        return self.s3dir_root.joinpath(path_icon_manifest_json.name)
+
+    def upload_to_cloudflare_r2(
+        self,
+        sync: bool = True,
+        delete: bool = False,
+        content_addressed: bool = False,
+        atlas: bool = False,
+    ):
+        """
+        :param sync: if True, only upload the files that differ from the
+            remote objects, otherwise upload every file.
+        :param delete: only used in sync mode, if True, delete the remote
+            files of the icons that were removed locally. Content-addressed
+            files are kept, they may still be referenced by cached manifests.
+        :param content_addressed: if True, also publish every file at its
+            content-addressed key with immutable cache headers, and publish
+            the icon manifest that maps ``(name, size)`` to those URLs,
+            see :mod:`my_icon_vault.publish`.
+        :param atlas: if True, also publish the sprite atlases built by
+            :meth:`build_atlas` next to the icons.
+        """
+        tasks = list(
+            itertools.chain(
+                *(
+                    asset.to_upload_tasks(
+                        self.s3dir_root, content_addressed=content_addressed
+                    )
+                    for asset in self.icon_assets
+                )
+            )
+        )
+        upload_results = list()
+        try:
+            with self._trace("upload"):
+                if sync:
+                    upload_results = self.uploader.sync(
+                        tasks, self.s3dir_icons, delete=delete, verbose=True
+                    ).uploaded
+                else:
+                    upload_results = self.uploader.upload(tasks, verbose=True)
+                if atlas:
+                    atlas_tasks = self._to_atlas_upload_tasks()
+                    if sync:
+                        upload_results += self.uploader.sync(
+                            atlas_tasks, self.s3dir_atlas, delete=delete, verbose=True
+                        ).uploaded
+                    else:
+                        upload_results += self.uploader.upload(
+                            atlas_tasks, verbose=True
+                        )
+                if content_addressed:
+                    self.generate_icon_manifest_json()
+                    upload_results += self.uploader.upload(
+                        [
+                            UploadTask(
+                                path=path_icon_manifest_json,
+                                s3path=self.s3path_icon_manifest_json,
+                                content_type="application/json",
+                                cache_control=CACHE_CONTROL_NO_CACHE,
+                            )
+                        ],
+                        verbose=True,
+                    )
+        except BatchRunError as e:
+            upload_results = upload_results + e.results
+            raise
+        finally:
+            if self.tracer is not None:
+                self.tracer.add_upload_results(upload_results)
+
+    def build_atlas(
+        self,
+        sizes: T.Iterable[int] = tuple(size_list),
+        force: bool = False,
+    ) -> dict[int, AtlasMap]:
+        """
+        Pack the PNG files of every asset into one sprite atlas per size, with
+        a JSON and a CSS coordinate map, see :mod:`my_icon_vault.atlas`.
+        Only the atlas pages with a changed icon are rebuilt.
+
+        :param force: if True, repack and quantize every page.
+        """
+        builder = self.atlas_builder or AtlasBuilder()
+        atlas_maps = dict()
+        with self._trace("atlas"):
+            for size in sizes:
+                paths = {
+                    asset.name: asset.get_path_png(size, size)
+                    for asset in self.icon_assets
+                    if asset.get_path_png(size, size).exists()
+                }
+                atlas_maps[size] = builder.build(
+                    size, paths, force=force, verbose=True
+                )
+        return atlas_maps
+
+    def _to_atlas_upload_tasks(self) -> list[UploadTask]:
+        builder = self.atlas_builder or AtlasBuilder()
+        tasks = list()
+        for size in size_list:
+            for path in builder.list_files(size):
+                tasks.append(
+                    UploadTask(
+                        path=path,
+                        s3path=self.s3dir_atlas.joinpath(
+                            *path.relative_to(builder.dir_out).parts
+                        ),
+                        content_type=guess_content_type(path),
+                    )
+                )
+        return tasks
+
+    def build_bundle(self, path: Path = path_icon_bundle) -> int:
+        """
+        Pack the SVG and the PNG variants of every asset in the catalog into
+        one bundle file, see :mod:`my_icon_vault.bundle`.
+
+        Returns:
+            The number of files in the bundle.
+        """
+        self.catalog.refresh(verbose=True)
+        files = list()
+        for entry in self.catalog.list_entries():
+            asset = entry.to_icon_asset()
+            files.append(((entry.name, 0, "svg"), asset.path_svg))
+            for variant in entry.variants:
+                width, height = (int(i) for i in variant.split("x"))
+                if width == height:
+                    files.append(
+                        ((entry.name, width, "png"), asset.get_path_png(width, height))
+                    )
+        n_files = write_bundle(path, files)
+        print(f"Bundle {n_files} files to {path}")
+        return n_files
+
+    def generate_icon_manifest_json(self):
+        manifest = new_icon_manifest(
+            {
+                asset.name: asset.to_icon_manifest_entry(
+                    self.s3dir_root, url_root=self.public_url_root
+                )
+                for asset in self.icon_assets
+            }
+        )
+        path_icon_manifest_json.write_text(
+            json.dumps(manifest, indent=4) + "\n", encoding="utf-8"
+        )
 
     def generate_icon_list_md(self):
         lines = [
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared Palette - one palette for every size of an icon
+
+The sizes of an icon are renders of the same SVG, so they share their colors.
+Instead of one palette search per size, :class:`SharedPaletteCmd` runs one
+palette search per icon:
+
+1. paste every render into one composite image, the largest render first,
+   the padding is transparent;
+2. quantize the composite with the
+   :class:`~my_icon_vault.pngquant_wrapper.PngQuantCmd` of the largest size;
+3. crop every size out of the quantized composite, so all sizes end up with
+   the same palette, and the colors only found in the small renders (e.g. the
+   anti-aliased edges of thin lines) are in the palette too.
+
+If the quality of a size, on the pngquant 0 - 100 scale of
+:func:`~my_icon_vault.quantize.mse_to_quality`, is below the minimum of its
+``quality_range``, or more than ``max_quality_drop`` below the quality of the
+largest size, that size falls back to its own quantization. If the composite
+itself is below the minimum quality of the largest size, every size does.
+
+It does not save CPU time: the composite has as many pixels as all sizes
+together, and the quality check and the PNG encode of every crop come on top,
+so it usually costs more than one palette search per size. What it buys is one
+consistent palette per icon and, usually, smaller files. Measure both with
+``manual_tests/benchmark_shared_palette.py``.
+"""
+
+import typing as T
+import io
+import subprocess
+import dataclasses
+from pathlib import Path
+
+from pathlib_mate.mate_tool_box import repr_data_size
+from PIL import Image
+
+from .base import CmdResult, BaseCmd, get_file_size
+from .executor import WorkerPoolExecutor, parallel_map
+from .pngquant_wrapper import PngQuantCmd
+from .quantize import (
+    EXIT_CODE_QUALITY_TOO_LOW,
+    QualityTooLowError,
+    get_mse,
+    mse_to_quality,
+)
+
+#: bump it when the output of :class:`SharedPaletteCmd` changes
+SHARED_PALETTE_VERSION = 1
+
+
+def paste_composite(
+    images: list[Image.Image],
+) -> tuple[Image.Image, list[tuple[int, int, int, int]]]:
+    """
+    Stack RGBA images top to bottom into one transparent composite.
+
+    Returns:
+        The composite, and the ``(left, upper, right, lower)`` box of each
+        image in it.
+    """
+    width = max(image.width for image in images)
+    height = sum(image.height for image in images)
+    composite = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    boxes = list()
+    top = 0
+    for image in images:
+        composite.paste(image, (0, top))
+        boxes.append((0, top, image.width, top + image.height))
+        top += image.height
+    return composite, boxes
+
+
+def to_png_bytes(image: Image.Image, optimize: bool = True) -> bytes:
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        format="PNG",
+        optimize=optimize,
+        transparency=image.info.get("transparency"),
+    )
+    return buffer.getvalue()
+
+
+@dataclasses.dataclass
+class SharedPaletteCmd(BaseCmd):
+    """
+    Command configuration for compressing every size of one icon with one
+    shared palette, see module docstring.
+
+    Args:
+        path_in: Not used, set it to None. The inputs are defined by ``cmds``.
+        path_out: Not used, set it to None. The outputs are defined by ``cmds``.
+        cmds: The pngquant command of each size, the options of the largest
+            size quantize the composite.
+        max_quality_drop: A size falls back to its own quantization if its
+            quality is more than this below the quality of the largest size.
+
+    Example:
+        >>> cmd = SharedPaletteCmd(
+        ...     path_in=None,
+        ...     path_out=None,
+        ...     cmds=asset.to_pngquant_cmds(),
+        ... )
+        >>> cmd.run()
+    """
+
+    cmds: list[PngQuantCmd] = dataclasses.field(default_factory=list)
+    max_quality_drop: int = dataclasses.field(default=20)
+
+    _non_param_fields = ("path_in", "path_out", "cmds")
+
+    def __post_init__(self):
+        self._fallback_cmds: list[PngQuantCmd] = list()
+
+    def get_tool_version(self) -> str:
+        return (
+            f"{self.cmds[0].get_tool_version()}, "
+            f"shared palette {SHARED_PALETTE_VERSION}"
+        )
+
+    def to_params(self) -> dict[str, T.Any]:
+        return {
+            "shared_palette": super().to_params(),
+            "pngquant": [cmd.to_params() for cmd in self.cmds],
+        }
+
+    def _get_bytes_in(self) -> int:
+        return sum(get_file_size(cmd.path_in) for cmd in self.cmds)
+
+    def _get_bytes_out(self) -> int:
+        return sum(get_file_size(cmd._get_path_out()) for cmd in self.cmds)
+
+    def _new_result(self) -> CmdResult:
+        result = super()._new_result()
+        result.path_in = self.cmds[0].path_in
+        return result
+
+    def _quantize_composite(
+        self,
+        cmds: list[PngQuantCmd],
+        images: list[Image.Image],
+    ) -> list[Image.Image] | None:
+        """
+        Quantize the composite of all sizes, largest first, and crop it back
+        into sizes. Return None if the composite is below the minimum quality
+        of the largest size.
+        """
+        composite, boxes = paste_composite(images)
+        try:
+            png = cmds[0].to_quantizer().quantize_bytes(to_png_bytes(composite, False))
+        except QualityTooLowError:
+            return None
+        except subprocess.CalledProcessError as e:
+            if e.returncode != EXIT_CODE_QUALITY_TOO_LOW:
+                raise
+            return None
+        with Image.open(io.BytesIO(png)) as paletted:
+            paletted.load()
+            crops = [paletted.crop(box) for box in boxes]
+        for crop in crops:
+            crop.info["transparency"] = paletted.info.get("transparency")
+        return crops
+
+    def _compress(self):
+        images = dict()
+        for cmd in self.cmds:
+            with Image.open(cmd.path_in) as image:
+                images[cmd.path_in] = image.convert("RGBA")
+        cmds = sorted(
+            self.cmds,
+            key=lambda cmd: images[cmd.path_in].width * images[cmd.path_in].height,
+            reverse=True,
+        )
+        crops = self._quantize_composite(cmds, [images[cmd.path_in] for cmd in cmds])
+
+        self._fallback_cmds = list()
+        if crops is None:
+            self._fallback_cmds.extend(cmds)
+            crops = [None] * len(cmds)
+        else:
+            qualities = [
+                mse_to_quality(get_mse(images[cmd.path_in], crop))
+                for cmd, crop in zip(cmds, crops)
+            ]
+            for cmd, quality in zip(cmds, qualities):
+                min_quality = max(
+                    cmd.quality_range[0], qualities[0] - self.max_quality_drop
+                )
+                if quality < min_quality:
+                    self._fallback_cmds.append(cmd)
+
+        for cmd, crop in zip(cmds, crops):
+            if cmd in self._fallback_cmds:
+                png = cmd.to_quantizer().quantize_bytes(cmd.path_in.read_bytes())
+            else:
+                png = to_png_bytes(crop)
+            cmd._get_path_out().write_bytes(png)
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
+        """
+        Quantize all sizes of the icon with one palette.
+
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the asset,
+            ``bytes_in`` and ``bytes_out`` are the totals of all sizes.
+
+        Raises:
+            subprocess.CalledProcessError: If pngquant exits with non-zero status.
+            QualityTooLowError: If the in-process backend is below the
+                minimum quality.
+        """
+        with self._measure(profile_dir) as result:
+            self._compress()
+        if verbose:
+            self._log_after()
+        return result
+
+    def _log_after(self):
+        for cmd in self.cmds:
+            mode = "own palette" if cmd in self._fallback_cmds else "shared palette"
+            print(
+                f"Size before: {repr_data_size(get_file_size(cmd.path_in))}, "
+                f"after ({mode}): {repr_data_size(get_file_size(cmd._get_path_out()))}"
+            )
+
+    @classmethod
+    def parallel_run(
+        cls,
+        cmds: list["SharedPaletteCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ) -> list[CmdResult]:
+        """
+        Compress multiple icons in parallel using multiprocessing.
+
+        Args:
+            cmds: List of SharedPaletteCmd instances, one per icon.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command.
+        """
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_parallel_run_main, tasks, executor=executor)
+
+
+# module level function, so it can be sent to a reused worker pool
+def _parallel_run_main(
+    ith: int,
+    cmd: SharedPaletteCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(
+        f"[{ith}] Compressing with a shared palette: "
+        f"{', '.join(c.path_in.name for c in cmd.cmds)}"
+    )
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
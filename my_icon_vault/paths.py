@@ -7,9 +7,19 @@ dir_package = dir_here
 PACKAGE_NAME = dir_package.name
 
 dir_home = Path.home()
+dir_icon_cache = dir_home / ".cache" / "my_icon_vault"
 
 dir_project_root = dir_package.parent
 dir_tmp = dir_project_root / "tmp"
+dir_reports = dir_tmp / "reports"
+dir_profile = dir_tmp / "profile"
+dir_traces = dir_tmp / "traces"
+path_catalog_db = dir_tmp / "catalog.sqlite"
+path_icon_bundle = dir_tmp / "icons.bundle"
+path_autotune_cache = dir_tmp / "autotune.json"
+
+dir_assets_icons = dir_project_root / "assets" / "icons"
+dir_atlas = dir_project_root / "assets" / "atlas"
 
 # ------------------------------------------------------------------------------
 # Virtual Environment Related
@@ -30,6 +40,7 @@ dir_int_test = dir_project_root / "tests_int"
 dir_load_test = dir_project_root / "tests_load"
 path_test_png = dir_package / "tests" / "img" / "microsoft-icon.png"
 path_test_svg = dir_package / "tests" / "img" / "microsoft-icon.svg"
+path_test_hairline_svg = dir_package / "tests" / "img" / "hairline-icon.svg"
 
 # ------------------------------------------------------------------------------
 # Doc Related
@@ -41,3 +52,5 @@ path_bin_pngquant = dir_home / "pngquant" / "pngquant"
 path_bin_svgo = "svgo"
 
 path_icon_list_md = dir_project_root / "icon-list.md"
+path_build_manifest = dir_project_root / "build-manifest.json"
+path_icon_manifest_json = dir_project_root / "icon-manifest.json"
@@ -12,6 +12,7 @@ including quality ranges, speed/quality trade-offs, and color palette sizes.
 Example usage:
 
 - Single file: Compress one PNG with specific quality settings
+- Batch: Compress many PNG files that share settings in one pngquant process
 - Parallel processing: Use multiprocessing to speed up batch operations
 
 Typical use cases include optimizing PNG assets for web deployment, reducing storage
@@ -19,13 +20,22 @@ requirements for image archives, or preparing graphics for mobile applications w
 file size matters.
 """
 
-import subprocess
+import typing as T
+import shutil
+import itertools
+import functools
 import dataclasses
 from pathlib import Path
 
-import mpire
-
-from .base import BaseCmd
+from .base import BatchRunError, CmdResult, BaseCmd, get_file_size, run_tool
+from .executor import WorkerPoolExecutor, parallel_map
+from .quantize import (
+    EXIT_CODE_QUALITY_TOO_LOW,
+    QuantizeBackendEnum,
+    Quantizer,
+    QualityTooLowError,
+    PillowQuantizer,
+)
 
 
 @dataclasses.dataclass
@@ -54,6 +64,9 @@ class PngQuantCmd(BaseCmd):
                - High quality images: 256
 
        path_out: Output file path. If None, uses input filename with suffix.
+
+       backend: ``"pngquant"`` runs the pngquant binary, ``"pillow"``
+                quantizes in the current process, see :mod:`my_icon_vault.quantize`.
     """
 
     path_bin: Path = dataclasses.field()
@@ -61,6 +74,67 @@ class PngQuantCmd(BaseCmd):
     speed: int | None = dataclasses.field(default=None)
     force: bool = dataclasses.field(default=False)
     ncolors: int | None = dataclasses.field(default=None)
+    backend: str = dataclasses.field(default=QuantizeBackendEnum.pngquant.value)
+
+    _non_param_fields = ("path_in", "path_out", "path_bin", "force")
+
+    @classmethod
+    @functools.cache
+    def get_version(cls, path_bin: Path | str) -> str:
+        """
+        Return the version string reported by ``pngquant --version``.
+
+        The result is cached, so the binary is only spawned once.
+        """
+        res = run_tool([str(path_bin), "--version"], text=True, check=True)
+        return res.stdout.strip()
+
+    @property
+    def is_in_process(self) -> bool:
+        return self.backend != QuantizeBackendEnum.pngquant.value
+
+    def get_tool_version(self) -> str:
+        """
+        Return the version of the tool of :attr:`backend`.
+        """
+        if self.is_in_process:
+            return PillowQuantizer.get_version()
+        return self.get_version(self.path_bin)
+
+    def to_params(self) -> dict[str, T.Any]:
+        params = super().to_params()
+        # the default backend is left out, so the build manifest records
+        # made before the backend option existed stay valid
+        if self.backend == QuantizeBackendEnum.pngquant.value:
+            params.pop("backend")
+        return params
+
+    def to_quantizer(self) -> Quantizer:
+        """
+        Return the quantization backend, this command for ``"pngquant"``.
+        """
+        backend = QuantizeBackendEnum(self.backend)
+        if backend is QuantizeBackendEnum.pillow:
+            return PillowQuantizer(
+                quality_range=self.quality_range,
+                speed=self.speed,
+                ncolors=self.ncolors,
+            )
+        return self
+
+    def _quantize_file(self):
+        """
+        Compress the file with the in-process backend.
+        """
+        png = self.to_quantizer().quantize_bytes(self.path_in.read_bytes())
+        self._get_path_out().write_bytes(png)
+
+    def _get_path_out(self) -> Path:
+        # pngquant overwrites the input file if there is no output file
+        return self.path_in if self.path_out is None else self.path_out
+
+    def _get_bytes_out(self) -> int:
+        return get_file_size(self._get_path_out())
 
     def to_args(self) -> list[str]:
         """
@@ -94,7 +168,56 @@ class PngQuantCmd(BaseCmd):
         args.append(str(self.path_in))
         return args
 
-    def run(self, verbose: bool = False):
+    def to_stdio_args(self) -> list[str]:
+        """
+        Same as :meth:`to_args`, but read the PNG from stdin and write the
+        compressed PNG to stdout (``pngquant ... -``). ``path_in`` and
+        ``path_out`` are ignored.
+
+        Example:
+            >>> cmd = PngQuantCmd(
+            ...     path_bin=Path("pngquant"),
+            ...     path_in=None,
+            ...     path_out=None,
+            ...     quality_range=(80, 95),
+            ... )
+            >>> args = cmd.to_stdio_args()
+            >>> # Returns: ["pngquant", "--quality", "80-95", "-"]
+        """
+        args = [
+            str(self.path_bin),
+        ]
+        args.extend(["--quality", f"{self.quality_range[0]}-{self.quality_range[1]}"])
+        if self.speed is not None:
+            args.extend(["--speed", str(self.speed)])
+        if self.ncolors:
+            args.append(str(self.ncolors))
+        args.append("-")
+        return args
+
+    def quantize_bytes(self, data: bytes) -> bytes:
+        """
+        Compress in-memory PNG content by piping it through pngquant.
+
+        Args:
+            data: The PNG file content.
+
+        Returns:
+            The compressed PNG file content.
+
+        Raises:
+            subprocess.CalledProcessError: If pngquant exits with non-zero
+                status, e.g. 99 when the quality is below the minimum of
+                ``quality_range``.
+        """
+        res = run_tool(self.to_stdio_args(), input=data, check=True)
+        return res.stdout
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
         """
         Execute pngquant compression on the specified input PNG file.
 
@@ -103,10 +226,17 @@ class PngQuantCmd(BaseCmd):
 
         Args:
             verbose: If True, prints the full command line before execution.
+            profile_dir: If given, profile the command,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the compression.
 
         Raises:
             subprocess.CalledProcessError: If pngquant exits with non-zero status.
             FileNotFoundError: If the pngquant binary is not found.
+            QualityTooLowError: If the in-process backend is below the
+                minimum quality.
 
         Example:
             >>> cmd = PngQuantCmd(
@@ -123,12 +253,24 @@ class PngQuantCmd(BaseCmd):
         #     print(" ".join(args))
         if verbose:
             self._log_before()
-        subprocess.run(args, check=True)
+        with self._measure(profile_dir) as result:
+            if self.is_in_process:
+                self._quantize_file()
+            else:
+                res = run_tool(args, text=True, check=True)
+                result.stderr = res.stderr
         if verbose:
             self._log_after()
+        return result
 
     @classmethod
-    def parallel_run(cls, cmds: list["PngQuantCmd"], verbose: bool = False):
+    def parallel_run(
+        cls,
+        cmds: list["PngQuantCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ):
         """
         Batch process multiple PNG files in parallel using multiprocessing.
 
@@ -139,10 +281,13 @@ class PngQuantCmd(BaseCmd):
         Args:
             cmds: List of PngQuantCmd instances, each configured for a specific
                   input file and compression settings.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
 
         Returns:
-            List of results from each worker process (typically None for each
-            successful compression).
+            One :class:`~my_icon_vault.base.CmdResult` per command.
 
         Raises:
             subprocess.CalledProcessError: If any pngquant process fails.
@@ -158,14 +303,241 @@ class PngQuantCmd(BaseCmd):
             [2] Compressing: img2.png -> img2.png
         """
 
-        def main(ith: int, cmd: PngQuantCmd):
-            print(f"[{ith}] Compressing: {cmd.path_in} -> {cmd.path_out}")
-            cmd.run(verbose=verbose)
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_parallel_run_main, tasks, executor=executor)
+
+    # suffix of the files pngquant writes next to the inputs in batch mode
+    _batch_ext = "-pngquant-batch.png"
 
-        tasks = [{"ith": i, "cmd": cmd} for i, cmd in enumerate(cmds, start=1)]
-        with mpire.WorkerPool(start_method="fork") as pool:
-            results = pool.map(
-                main,
-                tasks,
+    def _batch_key(self) -> tuple:
+        """
+        Commands with the same batch key can share one pngquant process.
+        """
+        return (
+            str(self.path_bin),
+            tuple(self.quality_range),
+            self.speed,
+            self.ncolors,
+            self.backend,
+        )
+
+    def _batch_output(self) -> Path:
+        """
+        Where pngquant writes the result of this command in batch mode.
+        """
+        return self.path_in.with_name(self.path_in.stem + self._batch_ext)
+
+    @classmethod
+    def to_batch_args(cls, cmds: list["PngQuantCmd"]) -> list[str]:
+        """
+        Generate the command line arguments that compress all the given files
+        in one pngquant process. All commands must share the same settings.
+        The results are written next to the inputs with the ``--ext`` suffix.
+
+        Example:
+            >>> args = PngQuantCmd.to_batch_args([cmd1, cmd2])
+            >>> # Returns: ["pngquant", "--quality", "25-50", "--force",
+            >>> #          "--ext", "-pngquant-batch.png", "a.png", "b.png"]
+        """
+        first = cmds[0]
+        if len({cmd._batch_key() for cmd in cmds}) != 1:
+            raise ValueError("all commands of a batch must share the same settings")
+        args = [str(first.path_bin)]
+        args.extend(["--quality", f"{first.quality_range[0]}-{first.quality_range[1]}"])
+        if first.speed is not None:
+            args.extend(["--speed", str(first.speed)])
+        args.extend(["--force", "--ext", cls._batch_ext])
+        if first.ncolors:
+            args.append(str(first.ncolors))
+        args.extend(str(cmd.path_in) for cmd in cmds)
+        return args
+
+    @classmethod
+    def _batch_run(cls, cmds: list["PngQuantCmd"]) -> dict[Path, tuple[int, str]]:
+        """
+        Compress all files in one pngquant process and return the failures,
+        ``{path_in: (returncode, error)}``.
+
+        pngquant keeps going when a file fails and only reports the last error
+        in its exit code. A file failed if its ``--ext`` output is missing,
+        those files are compressed again one by one to get their own exit code
+        (e.g. 99, quality too low).
+
+        The in-process backend has no process to amortize, it compresses the
+        files one by one.
+        """
+        if cmds[0].is_in_process:
+            return cls._batch_run_in_process(cmds)
+        for cmd in cmds:
+            cmd._batch_output().unlink(missing_ok=True)
+        run_tool(cls.to_batch_args(cmds))
+        failures = dict()
+        for cmd in cmds:
+            path_batch_output = cmd._batch_output()
+            if path_batch_output.exists():
+                shutil.move(path_batch_output, cmd._get_path_out())
+                continue
+            args = cmd.to_args()
+            if "--force" not in args:
+                args.insert(1, "--force")
+            res = run_tool(args, text=True)
+            if res.returncode == EXIT_CODE_QUALITY_TOO_LOW:
+                failures[cmd.path_in] = (
+                    res.returncode,
+                    f"exit code {res.returncode}, quality too low: "
+                    f"{res.stderr.strip()}",
+                )
+            elif res.returncode != 0:
+                failures[cmd.path_in] = (
+                    res.returncode,
+                    f"exit code {res.returncode}: {res.stderr.strip()}",
+                )
+        return failures
+
+    @classmethod
+    def _batch_run_in_process(
+        cls,
+        cmds: list["PngQuantCmd"],
+    ) -> dict[Path, tuple[int, str]]:
+        failures = dict()
+        for cmd in cmds:
+            try:
+                cmd._quantize_file()
+            except QualityTooLowError as e:
+                failures[cmd.path_in] = (
+                    e.returncode,
+                    f"exit code {e.returncode}, quality too low: {e}",
+                )
+            except Exception as e:
+                # e.g. a file that is not a PNG, like pngquant it only fails
+                # this file
+                failures[cmd.path_in] = (1, f"{type(e).__name__}: {e}")
+        return failures
+
+    @classmethod
+    def batch_run(
+        cls,
+        cmds: list["PngQuantCmd"],
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> list[CmdResult]:
+        """
+        Compress multiple PNG files in a single pngquant process.
+
+        For thousands of small PNG files the process creation dominates the
+        wall clock time, batching amortizes it.
+
+        Args:
+            cmds: List of PngQuantCmd instances that share the same settings.
+                The outputs still land at each command's ``path_out``.
+            profile_dir: If given, profile the command,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command, the time of
+            the pngquant process is split evenly between the files.
+
+        Raises:
+            BatchRunError: If any file failed, with the error of every failed file.
+        """
+        if verbose:
+            for cmd in cmds:
+                cmd._log_before()
+        with cls._measure_batch(cmds, profile_dir) as results:
+            failures = cls._batch_run(cmds)
+            for result in results:
+                if result.path_in in failures:
+                    result.returncode, result.stderr = failures[result.path_in]
+        if verbose:
+            for cmd in cmds:
+                if cmd.path_in not in failures:
+                    cmd._log_after()
+        if failures:
+            raise BatchRunError(
+                {path: error for path, (_, error) in failures.items()},
+                results=results,
+            )
+        return results
+
+    @classmethod
+    def parallel_batch_run(
+        cls,
+        cmds: list["PngQuantCmd"],
+        chunk_size: int = 50,
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ) -> list[CmdResult]:
+        """
+        Split the commands into chunks of files that share the same settings,
+        and compress the chunks in parallel, one pngquant process per chunk.
+
+        Args:
+            cmds: List of PngQuantCmd instances.
+            chunk_size: Maximum number of files per pngquant process.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command, grouped by chunk.
+
+        Raises:
+            BatchRunError: If any file failed, after all chunks are processed.
+        """
+        groups: dict[tuple, list[PngQuantCmd]] = dict()
+        for cmd in cmds:
+            groups.setdefault(cmd._batch_key(), list()).append(cmd)
+        chunks = list()
+        for group in groups.values():
+            for i in range(0, len(group), chunk_size):
+                chunks.append(group[i : i + chunk_size])
+
+        tasks = [
+            {"ith": i, "chunk": chunk, "verbose": verbose, "profile_dir": profile_dir}
+            for i, chunk in enumerate(chunks, start=1)
+        ]
+        results = list(
+            itertools.chain(
+                *parallel_map(_parallel_batch_run_main, tasks, executor=executor)
             )
+        )
+        failures = {
+            result.path_in: result.stderr
+            for result in results
+            if result.is_succeeded is False
+        }
+        if failures:
+            raise BatchRunError(failures, results=results)
         return results
+
+
+# module level functions, so they can be sent to a reused worker pool
+def _parallel_run_main(
+    ith: int,
+    cmd: PngQuantCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(f"[{ith}] Compressing: {cmd.path_in} -> {cmd.path_out}")
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
+
+
+def _parallel_batch_run_main(
+    ith: int,
+    chunk: list[PngQuantCmd],
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> list[CmdResult]:
+    print(
+        f"[{ith}] Compressing {len(chunk)} files: "
+        f"{chunk[0].path_in.name} ... {chunk[-1].path_in.name}"
+    )
+    try:
+        return PngQuantCmd.batch_run(chunk, verbose=verbose, profile_dir=profile_dir)
+    except BatchRunError as e:
+        return e.results
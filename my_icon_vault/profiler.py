@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in Profiling - cProfile and tracemalloc per stage and per worker
+
+Profiling is switched on by passing a ``profile_dir`` to a command ``run()``
+or ``parallel_run()``, or ``profile=True`` to a ``One`` build stage. Every
+process (the main process and each worker) then:
+
+- accumulates one ``cProfile`` profile over all the commands it runs, and
+  dumps it to ``${profile_dir}/process-${pid}.prof``;
+- records the ``tracemalloc`` peak memory and wall time of every command, one
+  JSON line per command in ``${profile_dir}/process-${pid}.memory.jsonl``, so a
+  memory spike can be attributed to a specific icon.
+
+:func:`merge_profiles` merges the profiles of all processes into
+``${profile_dir}/merged.prof``, which can be opened with ``pstats`` or
+``snakeviz``.
+
+.. note::
+
+    tracemalloc slows down Python code noticeably, and only the Python side of
+    a command is measured, not the svgo or pngquant process.
+"""
+
+import typing as T
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import tracemalloc
+import contextlib
+from pathlib import Path
+
+#: ``{(pid, profile_dir): profile}``, the pid is part of the key because
+#: forked workers inherit the parent's profiles
+_profiles: dict[tuple[int, Path], cProfile.Profile] = dict()
+
+MERGED_PROF = "merged.prof"
+
+
+def _get_profile(profile_dir: Path) -> cProfile.Profile:
+    key = (os.getpid(), profile_dir)
+    try:
+        return _profiles[key]
+    except KeyError:
+        profile = cProfile.Profile()
+        _profiles[key] = profile
+        return profile
+
+
+def stop_inherited_profiling():
+    """
+    Stop the cProfile and tracemalloc a forked worker inherited from a
+    :func:`profile_block` of its parent. Otherwise a worker forked inside a
+    profiled stage keeps being traced in every later, unprofiled stage.
+    """
+    pid = os.getpid()
+    for (profile_pid, _), profile in list(_profiles.items()):
+        if profile_pid != pid:
+            profile.disable()
+    sys.setprofile(None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def profile_block(profile_dir: Path | None, label: str) -> T.Iterator[None]:
+    """
+    Profile the with block if ``profile_dir`` is not None, otherwise do nothing.
+
+    Args:
+        profile_dir: Directory of the profile files of one stage.
+        label: Name of the block in the memory records, e.g. the input file.
+    """
+    if profile_dir is None:
+        yield
+        return
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profile = _get_profile(profile_dir)
+    is_tracing = tracemalloc.is_tracing()
+    if is_tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    try:
+        profile.enable()
+        is_profiling = True
+    except ValueError:  # pragma: no cover
+        # another profiler is already active in this thread
+        is_profiling = False
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if is_profiling:
+            profile.disable()
+        _, peak = tracemalloc.get_traced_memory()
+        if is_tracing is False:
+            tracemalloc.stop()
+        pid = os.getpid()
+        profile.dump_stats(profile_dir / f"process-{pid}.prof")
+        path_memory = profile_dir / f"process-{pid}.memory.jsonl"
+        with path_memory.open("a", encoding="utf-8") as f:
+            record = {
+                "label": label,
+                "pid": pid,
+                "peak_memory": peak,
+                "wall_time": elapsed,
+            }
+            f.write(json.dumps(record) + "\n")
+
+
+def merge_profiles(profile_dir: Path) -> Path | None:
+    """
+    Merge the profiles of all processes into ``${profile_dir}/merged.prof``.
+
+    Returns:
+        The path of the merged profile, None if there is no profile.
+    """
+    paths = sorted(
+        path for path in profile_dir.glob("*.prof") if path.name != MERGED_PROF
+    )
+    if not paths:
+        return None
+    stats = pstats.Stats(str(paths[0]))
+    for path in paths[1:]:
+        stats.add(str(path))
+    path_merged = profile_dir / MERGED_PROF
+    stats.dump_stats(path_merged)
+    return path_merged
+
+
+def read_memory_records(profile_dir: Path) -> list[dict[str, T.Any]]:
+    """
+    Read the memory records of all processes, sorted by peak memory descending.
+    """
+    records = list()
+    for path in profile_dir.glob("*.memory.jsonl"):
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line:
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["peak_memory"], reverse=True)
+    return records
+
+
+def print_summary(profile_dir: Path, top_n: int = 10):
+    """
+    Merge the profiles, then print the functions with the highest cumulative
+    time and the blocks with the highest peak memory.
+    """
+    path_merged = merge_profiles(profile_dir)
+    if path_merged is None:
+        return
+    print(f"Merged profile: {path_merged}")
+    pstats.Stats(str(path_merged)).sort_stats("cumulative").print_stats(top_n)
+    print("Peak memory:")
+    for record in read_memory_records(profile_dir)[:top_n]:
+        print(
+            f"  {record['peak_memory'] / 1_000_000:8.2f} MB "
+            f"{record['wall_time']:8.3f} sec  {record['label']}"
+        )
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+"""
+Publish Layout - cache friendly object keys and metadata
+
+Every file is published at its mutable key (e.g. ``github/github-96x96.png``),
+which must be revalidated by CDN and browser caches because its content may
+change. Optionally every file is also published at a content-addressed key that
+has the content hash in its name (e.g. ``github/github-96x96.1a2b3c4d5e6f.png``).
+Such a key never changes its content, so it is served with a long-lived
+``Cache-Control: immutable`` header.
+
+The icon manifest maps each logical ``(name, size)`` pair to its content-addressed
+URL, so frontends can look up the current URL once and cache the icons forever::
+
+    {
+        "version": 1,
+        "icons": {
+            "github": {
+                "svg": "https://cdn.example.com/assets/icons/github/github.0f1e2d3c4b5a.svg",
+                "png": {
+                    "96": "https://cdn.example.com/assets/icons/github/github-96x96.1a2b3c4d5e6f.png"
+                }
+            }
+        }
+    }
+"""
+
+import re
+import typing as T
+import mimetypes
+from pathlib import Path
+
+from s3pathlib import S3Path
+
+from .manifest import get_file_sha256
+
+MANIFEST_VERSION = 1
+
+#: for content-addressed keys, the content of the object never changes
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+#: for the icon manifest, it changes on every publish
+CACHE_CONTROL_NO_CACHE = "no-cache"
+
+#: number of hex digits of the SHA256 in content-addressed keys
+HASH_LENGTH = 12
+
+_content_addressed_pattern = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.[^./]+$")
+
+_content_types = {
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".json": "application/json",
+    ".css": "text/css",
+}
+
+
+def guess_content_type(path: Path) -> str | None:
+    """
+    Return the MIME type of a file based on its extension.
+    """
+    try:
+        return _content_types[path.suffix.lower()]
+    except KeyError:
+        return mimetypes.guess_type(path.name)[0]
+
+
+def get_content_hash(path: Path) -> str:
+    return get_file_sha256(path)[:HASH_LENGTH]
+
+
+def to_content_addressed_s3path(s3path: S3Path, content_hash: str) -> S3Path:
+    """
+    Insert the content hash before the extension of the object name.
+
+    Example:
+        >>> to_content_addressed_s3path(S3Path("s3://bucket/github.svg"), "0f1e2d3c4b5a")
+        S3Path('s3://bucket/github.0f1e2d3c4b5a.svg')
+    """
+    return s3path.change(new_basename=f"{s3path.fname}.{content_hash}{s3path.ext}")
+
+
+def is_content_addressed_key(key: str) -> bool:
+    """
+    Return True if the object key has a content hash before its extension,
+    see :func:`to_content_addressed_s3path`.
+
+    Example:
+        >>> is_content_addressed_key("github/github-96x96.1a2b3c4d5e6f.png")
+        True
+        >>> is_content_addressed_key("github/github-96x96.png")
+        False
+    """
+    return _content_addressed_pattern.search(key) is not None
+
+
+def to_url(s3path: S3Path, s3dir_root: S3Path, url_root: str | None = None) -> str:
+    """
+    Convert an object to its public URL. If ``url_root`` is None, return the
+    key relative to ``s3dir_root``.
+    """
+    relative_key = s3path.key[len(s3dir_root.key) :]
+    if url_root is None:
+        return relative_key
+    return f"{url_root.rstrip('/')}/{relative_key}"
+
+
+def new_icon_manifest(icons: dict[str, dict[str, T.Any]]) -> dict[str, T.Any]:
+    return {
+        "version": MANIFEST_VERSION,
+        "icons": dict(sorted(icons.items())),
+    }
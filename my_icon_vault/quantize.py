@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Quantization Backends - pngquant binary or in-process Pillow
+
+A quantization backend turns a PNG into a palette PNG. Every backend has the
+``quantize_bytes(data: bytes) -> bytes`` method of :class:`Quantizer`, so the
+PNG can come from a file or straight from the renderer:
+
+- ``pngquant``: :class:`~my_icon_vault.pngquant_wrapper.PngQuantCmd`, pipes the
+  PNG through the pngquant binary, one process per image (or per batch).
+- ``pillow``: :class:`PillowQuantizer`, quantizes in the current process with
+  Pillow, no process spawn and no binary to install.
+
+:class:`PillowQuantizer` follows the pngquant options:
+
+- ``quality_range=(min, max)``: use the fewest colors that reach ``max``,
+  raise :class:`QualityTooLowError` if even ``ncolors`` colors are below ``min``.
+  The quality is the pngquant 0 - 100 scale computed from the mean squared
+  error of the premultiplied RGBA pixels, see :func:`mse_to_quality`.
+- ``ncolors``: maximum palette size, defaults to 256.
+- ``speed``: 1 (slow) - 11 (fast), a lower speed searches the palette size
+  more thoroughly, speed 10 and up skips the zlib optimization of the
+  output, and speed 11 also turns off dithering.
+"""
+
+import typing as T
+import io
+import enum
+import dataclasses
+
+from PIL import Image, ImageChops, ImageStat, features
+
+#: pngquant exit code when the result is below the minimum quality
+EXIT_CODE_QUALITY_TOO_LOW = 99
+
+#: bump it when the output of :class:`PillowQuantizer` changes
+PILLOW_QUANTIZER_VERSION = 1
+
+
+class QuantizeBackendEnum(str, enum.Enum):
+    pngquant = "pngquant"
+    pillow = "pillow"
+
+
+class Quantizer(T.Protocol):
+    """
+    The interface of a quantization backend.
+    """
+
+    def quantize_bytes(self, data: bytes) -> bytes:  # pragma: no cover
+        ...
+
+
+class QualityTooLowError(Exception):
+    """
+    The quantized image is below the minimum quality, the in-process
+    counterpart of pngquant exit code 99.
+    """
+
+    returncode = EXIT_CODE_QUALITY_TOO_LOW
+
+    def __init__(self, quality: int, min_quality: int):
+        self.quality = quality
+        self.min_quality = min_quality
+        super().__init__(f"quality {quality} is below the minimum {min_quality}")
+
+
+def quality_to_mse(quality: int) -> float:
+    """
+    The maximum mean squared error of a quality, the same curve as
+    libimagequant, the library behind pngquant.
+    """
+    if quality <= 0:
+        return float("inf")
+    if quality >= 100:
+        return 0.0
+    extra_low_quality_fudge = max(0.0, 0.016 / (0.001 + quality) - 0.001)
+    return (
+        extra_low_quality_fudge
+        + 2.5 / pow(210.0 + quality, 1.2) * (100.1 - quality) / 100.0
+    )
+
+
+def mse_to_quality(mse: float) -> int:
+    """
+    The highest quality whose maximum error is not below ``mse``. The error is
+    the sum over the RGBA channels of the mean squared difference, with the
+    channels scaled to 0 - 1.
+    """
+    for quality in range(100, 0, -1):
+        if mse <= quality_to_mse(quality) + 0.000001:
+            return quality
+    return 0
+
+
+def get_mse(image: Image.Image, other: Image.Image) -> float:
+    """
+    Compare two images on premultiplied RGBA, so the color of fully
+    transparent pixels doesn't count.
+    """
+    image = image.convert("RGBA").convert("RGBa")
+    other = other.convert("RGBA").convert("RGBa")
+    diff = ImageChops.difference(image, other)
+    return sum((rms / 255.0) ** 2 for rms in ImageStat.Stat(diff).rms)
+
+
+@dataclasses.dataclass
+class PillowQuantizer:
+    """
+    In-process palette quantization with Pillow, see module docstring.
+
+    Args:
+        quality_range: Quality range (min, max) from 0-100, as in pngquant.
+        speed: Speed/quality trade-off from 1 to 11, as in pngquant.
+        ncolors: Maximum number of colors of the palette.
+        dither: Apply Floyd-Steinberg dithering.
+
+    Example:
+        >>> quantizer = PillowQuantizer(quality_range=(65, 85))
+        >>> png = quantizer.quantize_bytes(Path("icon.png").read_bytes())
+    """
+
+    quality_range: tuple[int, int] = dataclasses.field(default=(80, 95))
+    speed: int | None = dataclasses.field(default=None)
+    ncolors: int | None = dataclasses.field(default=None)
+    dither: bool = dataclasses.field(default=True)
+
+    @classmethod
+    def get_version(cls) -> str:
+        return f"pillow {Image.__version__}, quantizer {PILLOW_QUANTIZER_VERSION}"
+
+    @property
+    def _speed(self) -> int:
+        return 4 if self.speed is None else self.speed
+
+    def _quantize(self, image: Image.Image, colors: int) -> Image.Image:
+        method = (
+            Image.Quantize.LIBIMAGEQUANT
+            if features.check("libimagequant")
+            else Image.Quantize.FASTOCTREE
+        )
+        dither = self.dither and self._speed < 11
+        paletted = image.quantize(
+            colors=colors,
+            method=method,
+            dither=Image.Dither.FLOYDSTEINBERG if dither else Image.Dither.NONE,
+        )
+        # drop the unused palette entries, a smaller palette is a smaller file
+        used = sorted(index for _, index in paletted.getcolors(256))
+        if len(used) < len(paletted.getpalette(rawmode="RGBA")) // 4:
+            paletted = paletted.remap_palette(used)
+        return paletted
+
+    def quantize_image(self, image: Image.Image) -> Image.Image:
+        """
+        Quantize an image with the fewest colors that reach the maximum quality.
+
+        Raises:
+            QualityTooLowError: If the image is below the minimum quality.
+        """
+        image = image.convert("RGBA")
+        min_quality, max_quality = self.quality_range
+        max_colors = min(256, max(2, self.ncolors or 256))
+        best = self._quantize(image, max_colors)
+        quality = mse_to_quality(get_mse(image, best))
+        if quality < min_quality:
+            raise QualityTooLowError(quality, min_quality)
+        if quality <= max_quality or self._speed >= 8:
+            return best
+        # binary search the fewest colors that still reach the maximum
+        # quality, a slower speed allows more steps
+        n_steps = 8 if self._speed <= 3 else 4
+        lo, hi = 2, len(best.getpalette(rawmode="RGBA")) // 4
+        for _ in range(n_steps):
+            if lo >= hi:
+                break
+            mid = (lo + hi) // 2
+            candidate = self._quantize(image, mid)
+            if mse_to_quality(get_mse(image, candidate)) >= max_quality:
+                best, hi = candidate, mid
+            else:
+                lo = mid + 1
+        return best
+
+    def quantize_bytes(self, data: bytes) -> bytes:
+        """
+        Quantize in-memory PNG content.
+
+        Raises:
+            QualityTooLowError: If the image is below the minimum quality.
+        """
+        with Image.open(io.BytesIO(data)) as image:
+            paletted = self.quantize_image(image)
+        buffer = io.BytesIO()
+        paletted.save(buffer, format="PNG", optimize=self._speed < 10)
+        return buffer.getvalue()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+Raster Helpers - vectorized pixel operations on NumPy RGBA arrays
+
+This module collects the small amount of image math the build pipeline needs
+on top of the external tools, implemented with NumPy so that a whole image is
+processed with a handful of matrix operations instead of per-pixel Python loops.
+
+All functions work on ``(height, width, 4)`` ``uint8`` arrays. Whether the color
+channels are premultiplied by alpha (cairo's native ``ARGB32`` layout) or not
+(PNG / Pillow ``RGBA``) is stated by each function.
+
+.. note::
+
+    NumPy is an optional dependency, install it with
+    ``pip install my_icon_vault[raster]``.
+"""
+
+import numpy as np
+
+
+def premultiply(rgba: np.ndarray) -> np.ndarray:
+    """
+    Convert straight alpha RGBA to premultiplied alpha, alpha is the last channel.
+    """
+    arr = rgba.astype(np.float64)
+    arr[..., :3] *= arr[..., 3:4] / 255.0
+    return np.rint(arr).astype(np.uint8)
+
+
+def unpremultiply(rgba: np.ndarray) -> np.ndarray:
+    """
+    Convert premultiplied alpha RGBA to straight alpha, alpha is the last channel.
+    Fully transparent pixels become ``(0, 0, 0, 0)``.
+    """
+    arr = rgba.astype(np.float64)
+    alpha = arr[..., 3:4]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        arr[..., :3] = np.where(alpha > 0, arr[..., :3] * 255.0 / alpha, 0.0)
+    return np.clip(np.rint(arr), 0, 255).astype(np.uint8)
+
+
+def _area_weights(n_in: int, n_out: int) -> np.ndarray:
+    """
+    Build the ``(n_out, n_in)`` box filter matrix of area averaging.
+
+    Output pixel ``i`` covers the input interval ``[i * scale, (i + 1) * scale)``,
+    the weight of input pixel ``j`` is the length of its overlap with that
+    interval. Every row sums to 1, so non integer ratios (e.g. 512 -> 96) are
+    handled exactly.
+    """
+    scale = n_in / n_out
+    edges = np.arange(n_out + 1, dtype=np.float64) * scale
+    lo = edges[:-1, None]
+    hi = edges[1:, None]
+    px = np.arange(n_in, dtype=np.float64)[None, :]
+    overlap = np.clip(np.minimum(hi, px + 1) - np.maximum(lo, px), 0.0, None)
+    return overlap / scale
+
+
+def area_downsample(
+    arr: np.ndarray,
+    width: int,
+    height: int,
+    premultiplied: bool = True,
+) -> np.ndarray:
+    """
+    Downsample an image by area averaging.
+
+    Averaging has to happen on premultiplied colors, otherwise the color of
+    transparent pixels bleeds into the edges of the shape. Straight alpha input
+    is premultiplied before and unpremultiplied after the resize.
+
+    Args:
+        arr: ``(height, width, channels)`` uint8 image.
+        width: Output width, must not be larger than the input width.
+        height: Output height, must not be larger than the input height.
+        premultiplied: Whether the color channels of ``arr`` are already
+            premultiplied by alpha (True for cairo surfaces).
+
+    Returns:
+        ``(height, width, channels)`` uint8 image in the same alpha mode as ``arr``.
+    """
+    in_height, in_width = arr.shape[:2]
+    if width > in_width or height > in_height:
+        raise ValueError(
+            f"cannot downsample {in_width}x{in_height} to {width}x{height}"
+        )
+    if premultiplied is False:
+        arr = premultiply(arr)
+    weight_h = _area_weights(in_height, height)
+    weight_w = _area_weights(in_width, width)
+    # (height, in_height) x (in_height, in_width, C) -> (height, in_width, C)
+    out = np.tensordot(weight_h, arr.astype(np.float64), axes=(1, 0))
+    # (height, in_width, C) x (width, in_width) -> (height, C, width)
+    out = np.tensordot(out, weight_w, axes=(1, 1)).transpose(0, 2, 1)
+    out = np.clip(np.rint(out), 0, 255).astype(np.uint8)
+    if premultiplied is False:
+        out = unpremultiply(out)
+    return out
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Peak signal-to-noise ratio in dB between two uint8 images of the same
+    shape. Identical images return ``inf``.
+    """
+    if a.shape != b.shape:
+        raise ValueError(f"shape mismatch: {a.shape} != {b.shape}")
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float("inf")
+    return float(10.0 * np.log10(255.0**2 / mse))
+
+
+def _box_mean(arr: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean over every ``window x window`` neighborhood that fits in the image,
+    computed from an integral image, so the cost doesn't grow with the window.
+    """
+    integral = np.cumsum(np.cumsum(arr, axis=0), axis=1)
+    pad = [(1, 0), (1, 0)] + [(0, 0)] * (arr.ndim - 2)
+    integral = np.pad(integral, pad)
+    total = (
+        integral[window:, window:]
+        - integral[:-window, window:]
+        - integral[window:, :-window]
+        + integral[:-window, :-window]
+    )
+    return total / (window * window)
+
+
+def ssim(a: np.ndarray, b: np.ndarray, window: int = 7) -> float:
+    """
+    Mean structural similarity (SSIM) between two uint8 images of the same
+    shape, with a ``window x window`` uniform window, averaged over all
+    channels. 1.0 means identical, compare premultiplied RGBA images so the
+    color of transparent pixels doesn't count.
+    """
+    if a.shape != b.shape:
+        raise ValueError(f"shape mismatch: {a.shape} != {b.shape}")
+    window = min(window, a.shape[0], a.shape[1])
+    x = a.astype(np.float64)
+    y = b.astype(np.float64)
+    mu_x = _box_mean(x, window)
+    mu_y = _box_mean(y, window)
+    var_x = _box_mean(x * x, window) - mu_x * mu_x
+    var_y = _box_mean(y * y, window) - mu_y * mu_y
+    cov_xy = _box_mean(x * y, window) - mu_x * mu_y
+    c1 = (0.01 * 255.0) ** 2
+    c2 = (0.03 * 255.0) ** 2
+    score = ((2.0 * mu_x * mu_y + c1) * (2.0 * cov_xy + c2)) / (
+        (mu_x * mu_x + mu_y * mu_y + c1) * (var_x + var_y + c2)
+    )
+    return float(score.mean())
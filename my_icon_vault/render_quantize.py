@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+SVG to Compressed PNG Pipeline - CairoSVG and pngquant fused in one task
+
+The staged build writes every rendered PNG to ``dir_tmp`` with
+:class:`~my_icon_vault.cairosvg_wrapper.Svg2PngMultiSizeCmd`, then
+:class:`~my_icon_vault.pngquant_wrapper.PngQuantCmd` reads it back and writes
+the final file. This module fuses both steps per asset: every size is rendered
+to an in-memory buffer, streamed through ``pngquant -`` over stdin / stdout,
+and only the final artifact is written to disk.
+
+Compared to the staged build this saves one write and one read per size, and
+there is no shared temporary namespace between assets.
+"""
+
+import typing as T
+import dataclasses
+from pathlib import Path
+
+from pathlib_mate.mate_tool_box import repr_data_size
+
+from .base import CmdResult, BaseCmd, get_file_size
+from .executor import WorkerPoolExecutor, parallel_map
+from .cairosvg_wrapper import PngTarget, Svg2PngMultiSizeCmd
+from .pngquant_wrapper import PngQuantCmd
+from .quantize import QuantizeBackendEnum
+
+
+@dataclasses.dataclass
+class RenderQuantizeCmd(BaseCmd):
+    """
+    Command configuration for rendering one SVG file to compressed PNG files.
+
+    Args:
+        path_in: Path to the input SVG file.
+        path_out: Not used, set it to None. The outputs are defined by ``targets``.
+        targets: The final PNG files and their dimensions.
+        path_bin: Path to the pngquant binary executable.
+        quality_range: pngquant quality range (min, max) from 0-100.
+        speed: pngquant speed/quality trade-off.
+        ncolors: Number of colors in the output palette.
+        downsample: Render once at the largest size and downsample the
+            smaller sizes, see :class:`~my_icon_vault.cairosvg_wrapper.Svg2PngMultiSizeCmd`.
+        backend: Quantization backend, ``"pngquant"`` or ``"pillow"``,
+            see :mod:`my_icon_vault.quantize`.
+
+    Example:
+        >>> cmd = RenderQuantizeCmd(
+        ...     path_in=Path("icon.svg"),
+        ...     path_out=None,
+        ...     targets=[PngTarget(Path("icon-96x96.png"), 96, 96)],
+        ...     path_bin=Path("pngquant"),
+        ...     quality_range=(25, 50),
+        ... )
+        >>> cmd.run()
+    """
+
+    targets: list[PngTarget] = dataclasses.field(default_factory=list)
+    path_bin: Path = dataclasses.field(default=None)
+    quality_range: tuple[int, int] = dataclasses.field(default=(80, 95))
+    speed: int | None = dataclasses.field(default=None)
+    ncolors: int | None = dataclasses.field(default=None)
+    downsample: bool = dataclasses.field(default=False)
+    backend: str = dataclasses.field(default=QuantizeBackendEnum.pngquant.value)
+
+    @classmethod
+    def get_version(cls, path_bin: Path | str) -> str:
+        return (
+            f"cairosvg {Svg2PngMultiSizeCmd.get_version()}, "
+            f"pngquant {PngQuantCmd.get_version(path_bin)}"
+        )
+
+    def get_tool_version(self) -> str:
+        """
+        Return the versions of the renderer and of the :attr:`backend`.
+        """
+        return (
+            f"cairosvg {Svg2PngMultiSizeCmd.get_version()}, "
+            f"{self.backend} {self.to_pngquant_cmd().get_tool_version()}"
+        )
+
+    def to_svg2png_cmd(self) -> Svg2PngMultiSizeCmd:
+        return Svg2PngMultiSizeCmd(
+            path_in=self.path_in,
+            path_out=None,
+            targets=self.targets,
+            downsample=self.downsample,
+        )
+
+    def to_pngquant_cmd(self) -> PngQuantCmd:
+        return PngQuantCmd(
+            path_bin=self.path_bin,
+            path_in=None,
+            path_out=None,
+            quality_range=self.quality_range,
+            speed=self.speed,
+            ncolors=self.ncolors,
+            backend=self.backend,
+        )
+
+    def to_params(self) -> dict[str, T.Any]:
+        return {
+            "svg2png": self.to_svg2png_cmd().to_params(),
+            "pngquant": self.to_pngquant_cmd().to_params(),
+        }
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
+        """
+        Render every target in memory, compress it with the quantization
+        backend (pngquant over stdin and stdout, or in-process), and write
+        the final PNG file.
+
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the asset,
+            ``bytes_out`` is the total size of all targets.
+
+        Raises:
+            subprocess.CalledProcessError: If pngquant exits with non-zero status.
+            FileNotFoundError: If the input SVG file or pngquant is not found.
+            QualityTooLowError: If the in-process backend is below the
+                minimum quality.
+        """
+        if verbose:
+            self._log_before()
+        quantizer = self.to_pngquant_cmd().to_quantizer()
+        with self._measure(profile_dir) as result:
+            for target, png in self.to_svg2png_cmd().iter_png():
+                target.path_out.write_bytes(quantizer.quantize_bytes(png))
+        if verbose:
+            self._log_after()
+        return result
+
+    def _get_bytes_out(self) -> int:
+        return sum(get_file_size(target.path_out) for target in self.targets)
+
+    def _log_after(self):
+        for target in self.targets:
+            size_after = target.path_out.stat().st_size
+            print(
+                f"Size before: {repr_data_size(self._size_before)}, "
+                f"after ({target.output_width}x{target.output_height}): "
+                f"{repr_data_size(size_after)}"
+            )
+
+    @classmethod
+    def parallel_run(
+        cls,
+        cmds: list["RenderQuantizeCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ):
+        """
+        Render and compress multiple SVG files in parallel using multiprocessing.
+
+        Args:
+            cmds: List of RenderQuantizeCmd instances.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command.
+        """
+
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_parallel_run_main, tasks, executor=executor)
+
+
+# module level function, so it can be sent to a reused worker pool
+def _parallel_run_main(
+    ith: int,
+    cmd: RenderQuantizeCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(
+        f"[{ith}] Rendering and compressing: {cmd.path_in} -> "
+        f"{', '.join(target.path_out.name for target in cmd.targets)}"
+    )
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
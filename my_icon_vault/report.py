@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+Run Report - aggregate per-command results into a machine-readable summary
+
+Every command ``run()`` returns a :class:`~my_icon_vault.base.CmdResult`.
+:class:`RunReport` aggregates the results of one stage into totals, time
+percentiles, the slowest assets and the least compressible assets, and dumps
+them to JSON::
+
+    {
+        "stage": "compress_png",
+        "elapsed": 12.3,
+        "totals": {"count": 1200, "succeeded": 1199, "failed": 1, ...},
+        "wall_time_percentiles": {"p50": 0.01, "p90": 0.03, "p99": 0.2, "max": 1.4},
+        "slowest": [{"path_in": "...", "wall_time": 1.4, ...}, ...],
+        "least_compressible": [{"path_in": "...", "compression_ratio": 0.98, ...}, ...],
+        "failures": [{"path_in": "...", "returncode": 99, "stderr": "..."}]
+    }
+"""
+
+import typing as T
+import json
+import math
+import dataclasses
+from pathlib import Path
+
+from .base import CmdResult
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """
+    Return the ``q`` (0 - 100) percentile with linear interpolation,
+    None if there is no value.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * q / 100
+    lower, upper = math.floor(rank), math.ceil(rank)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+@dataclasses.dataclass
+class RunReport:
+    """
+    The report of one stage.
+
+    Args:
+        stage: Name of the stage.
+        results: Results of every command of the stage.
+        elapsed: Wall clock time of the whole stage in seconds. The commands
+            run in parallel, so it is usually less than the total wall time.
+        top_n: Number of assets in the slowest and least compressible lists.
+    """
+
+    stage: str = dataclasses.field()
+    results: list[CmdResult] = dataclasses.field(default_factory=list)
+    elapsed: float | None = dataclasses.field(default=None)
+    top_n: int = dataclasses.field(default=10)
+
+    @property
+    def succeeded(self) -> list[CmdResult]:
+        return [result for result in self.results if result.is_succeeded]
+
+    @property
+    def failed(self) -> list[CmdResult]:
+        return [result for result in self.results if result.is_succeeded is False]
+
+    def get_totals(self) -> dict[str, T.Any]:
+        succeeded = self.succeeded
+        bytes_in = sum(result.bytes_in for result in succeeded)
+        bytes_out = sum(result.bytes_out for result in succeeded)
+        return {
+            "count": len(self.results),
+            "succeeded": len(succeeded),
+            "failed": len(self.results) - len(succeeded),
+            "wall_time": sum(result.wall_time for result in self.results),
+            "cpu_time": sum(result.cpu_time for result in self.results),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "compression_ratio": (bytes_out / bytes_in) if bytes_in else None,
+        }
+
+    def get_percentiles(self, attr: str) -> dict[str, float | None]:
+        values = [getattr(result, attr) for result in self.results]
+        return {
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p99": percentile(values, 99),
+            "max": max(values) if values else None,
+        }
+
+    def get_slowest(self) -> list[CmdResult]:
+        return sorted(self.results, key=lambda r: r.wall_time, reverse=True)[
+            : self.top_n
+        ]
+
+    def get_least_compressible(self) -> list[CmdResult]:
+        results = [r for r in self.succeeded if r.compression_ratio is not None]
+        return sorted(results, key=lambda r: r.compression_ratio, reverse=True)[
+            : self.top_n
+        ]
+
+    def to_dict(self) -> dict[str, T.Any]:
+        return {
+            "stage": self.stage,
+            "elapsed": self.elapsed,
+            "totals": self.get_totals(),
+            "wall_time_percentiles": self.get_percentiles("wall_time"),
+            "cpu_time_percentiles": self.get_percentiles("cpu_time"),
+            "slowest": [result.to_dict() for result in self.get_slowest()],
+            "least_compressible": [
+                result.to_dict() for result in self.get_least_compressible()
+            ],
+            "failures": [result.to_dict() for result in self.failed],
+        }
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=4) + "\n", encoding="utf-8")
+
+    def print_summary(self):
+        totals = self.get_totals()
+        p = self.get_percentiles("wall_time")
+        ratio = totals["compression_ratio"]
+        print(
+            f"[{self.stage}] {totals['succeeded']} succeeded, "
+            f"{totals['failed']} failed, "
+            f"elapsed: {self.elapsed or 0:.2f}s, "
+            f"cpu: {totals['cpu_time']:.2f}s, "
+            f"p50 / p99: {p['p50'] or 0:.3f}s / {p['p99'] or 0:.3f}s, "
+            f"ratio: {'n/a' if ratio is None else f'{ratio:.2%}'}"
+        )
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline Scheduler - run each asset through a chain of stages without barriers
+
+The staged build runs ``compress_svg``, ``generate_png`` and ``compress_png`` as
+global stages with a full barrier after each one, so a single slow SVG stalls
+the start of the next stage for every other asset. This module treats each
+asset as a chain of tasks (e.g. optimize -> render -> quantize -> upload) and
+submits the next task of an asset as soon as its previous task finished, so the
+rendering of asset B overlaps with the quantization and upload of asset A.
+
+Each stage runs at most ``concurrency`` items at a time. The thread stages get
+a thread pool each, the process stages share one process pool, which is forked
+before any thread stage starts, because forking a process that runs other
+threads can deadlock the child. A stage can also run on a shared executor, e.g.
+the warm :class:`~my_icon_vault.executor.WorkerPoolExecutor` of the build.
+``max_in_flight`` bounds the number of assets that entered the pipeline but
+didn't leave it yet, which keeps the number of queued tasks and temporary files
+small on large vaults.
+
+Example::
+
+    scheduler = PipelineScheduler(
+        stages=[
+            Stage(name="optimize", func=optimize, concurrency=8),
+            Stage(name="render", func=render, concurrency=4, use_process=True),
+            Stage(name="quantize", func=quantize, concurrency=8),
+        ],
+        max_in_flight=32,
+    )
+    result = scheduler.run(assets)
+"""
+
+import typing as T
+import os
+import time
+import functools
+import dataclasses
+import multiprocessing
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    ProcessPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+
+from .tracing import Span, Tracer
+
+
+def _noop():
+    pass
+
+
+def _traced_call(
+    func: T.Callable,
+    cat: str,
+    name: str,
+    item: T.Any,
+) -> tuple[Span, T.Any]:
+    """
+    Call ``func(item)`` in the worker and return its span and its result.
+    """
+    start, wall_start = time.time(), time.perf_counter()
+    value = func(item)
+    span = Span(
+        name=name,
+        cat=cat,
+        start=start,
+        duration=time.perf_counter() - wall_start,
+        pid=os.getpid(),
+    )
+    return span, value
+
+
+@dataclasses.dataclass
+class Stage:
+    """
+    One step of the per-item task chain.
+
+    Args:
+        name: Name of the stage.
+        func: Function that processes one item. With ``use_process=True`` it
+            has to be picklable (a module level function or a
+            ``functools.partial`` of one).
+        concurrency: Maximum number of items processed by this stage at the same time.
+        use_process: If True, run in a process pool (for CPU bound Python code
+            like cairosvg), otherwise in a thread pool (for stages that wait on
+            a subprocess or the network).
+        is_up_to_date: Optional function called in the scheduler thread before
+            the item is submitted to this stage. If it returns True the stage
+            is skipped for this item.
+        on_done: Optional function called in the scheduler thread after the
+            stage succeeded for an item, e.g. to update the build manifest.
+        executor: Optional shared executor to run the stage on instead, any
+            object with a ``concurrent.futures`` style ``submit(func, item)``.
+            The scheduler doesn't shut it down, and with a process pool its
+            workers should be started before the pipeline runs.
+    """
+
+    name: str = dataclasses.field()
+    func: T.Callable[[T.Any], T.Any] = dataclasses.field()
+    concurrency: int = dataclasses.field(default=4)
+    use_process: bool = dataclasses.field(default=False)
+    is_up_to_date: T.Callable[[T.Any], bool] | None = dataclasses.field(default=None)
+    on_done: T.Callable[[T.Any], T.Any] | None = dataclasses.field(default=None)
+    executor: T.Any = dataclasses.field(default=None)
+
+    def new_executor(self) -> Executor:
+        return ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix=self.name,
+        )
+
+
+@dataclasses.dataclass
+class PipelineResult:
+    """
+    The outcome of :meth:`PipelineScheduler.run`.
+
+    Args:
+        completed: Items that went through every stage.
+        failed: ``{item_key: (stage_name, error_message)}``, a failed item
+            doesn't enter its later stages.
+        skipped: ``{stage_name: [item_key, ...]}`` items that skipped a stage
+            because it was up to date.
+        results: ``{stage_name: [value, ...]}`` the return values of the
+            stage function, one per succeeded item, in completion order.
+    """
+
+    completed: list[T.Any] = dataclasses.field(default_factory=list)
+    failed: dict[T.Any, tuple[str, str]] = dataclasses.field(default_factory=dict)
+    skipped: dict[str, list[T.Any]] = dataclasses.field(default_factory=dict)
+    results: dict[str, list[T.Any]] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class PipelineScheduler:
+    """
+    Run items through a chain of stages, see module docstring.
+
+    Args:
+        stages: The stages, in dependency order.
+        max_in_flight: Maximum number of items inside the pipeline.
+        key: Function that returns a hashable identifier of an item,
+            used in :class:`PipelineResult`.
+        tracer: Optional tracer, if given one span per succeeded task is
+            added to it, see :mod:`my_icon_vault.tracing`.
+    """
+
+    stages: list[Stage] = dataclasses.field()
+    max_in_flight: int = dataclasses.field(default=32)
+    key: T.Callable[[T.Any], T.Any] = dataclasses.field(default=lambda item: item)
+    tracer: Tracer | None = dataclasses.field(default=None)
+
+    def _new_executors(self) -> tuple[list[T.Any], list[Executor]]:
+        """
+        Return the executor of every stage, and the executors to shut down.
+        """
+        executors = [stage.executor for stage in self.stages]
+        owned = list()
+        n_process = sum(
+            stage.concurrency
+            for stage in self.stages
+            if stage.use_process and stage.executor is None
+        )
+        if n_process:
+            pool = ProcessPoolExecutor(
+                max_workers=n_process,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            owned.append(pool)
+            # fork every worker now, while this is the only thread
+            pool.submit(_noop).result()
+        for ith, stage in enumerate(self.stages):
+            if stage.executor is not None:
+                continue
+            if stage.use_process:
+                executors[ith] = pool
+            else:
+                executors[ith] = stage.new_executor()
+                owned.append(executors[ith])
+        return executors, owned
+
+    def run(self, items: T.Iterable[T.Any], verbose: bool = False) -> PipelineResult:
+        result = PipelineResult(
+            skipped={stage.name: [] for stage in self.stages},
+            results={stage.name: [] for stage in self.stages},
+        )
+        executors, owned = self._new_executors()
+        pending = deque(items)
+        futures: dict[Future, tuple[T.Any, int]] = dict()
+        # items that wait for a free slot of each stage
+        waiting = [deque() for _ in self.stages]
+        running = [0] * len(self.stages)
+        in_flight = 0
+
+        def start(item: T.Any, ith: int):
+            stage = self.stages[ith]
+            if self.tracer is None:
+                func = stage.func
+            else:
+                func = functools.partial(
+                    _traced_call, stage.func, stage.name, str(self.key(item))
+                )
+            future = executors[ith].submit(func, item)
+            futures[future] = (item, ith)
+            running[ith] += 1
+
+        def submit(item: T.Any, ith: int):
+            """
+            Submit the item to the first stage starting at ``ith`` that is not
+            up to date, or mark it completed if there is none.
+            """
+            nonlocal in_flight
+            while ith < len(self.stages):
+                stage = self.stages[ith]
+                if stage.is_up_to_date is not None and stage.is_up_to_date(item):
+                    result.skipped[stage.name].append(self.key(item))
+                    ith += 1
+                    continue
+                if running[ith] < stage.concurrency:
+                    start(item, ith)
+                else:
+                    waiting[ith].append(item)
+                return
+            result.completed.append(item)
+            in_flight -= 1
+
+        def admit():
+            nonlocal in_flight
+            while pending and in_flight < self.max_in_flight:
+                in_flight += 1
+                submit(pending.popleft(), 0)
+
+        try:
+            admit()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, ith = futures.pop(future)
+                    stage = self.stages[ith]
+                    running[ith] -= 1
+                    if waiting[ith]:
+                        start(waiting[ith].popleft(), ith)
+                    error = future.exception()
+                    if error is None:
+                        if self.tracer is None:
+                            value = future.result()
+                        else:
+                            span, value = future.result()
+                            self.tracer.add_span(span)
+                        result.results[stage.name].append(value)
+                        if verbose:
+                            print(f"[{stage.name}] done: {self.key(item)}")
+                        if stage.on_done is not None:
+                            stage.on_done(item)
+                        submit(item, ith + 1)
+                    else:
+                        if verbose:
+                            print(f"[{stage.name}] failed: {self.key(item)}: {error}")
+                        result.failed[self.key(item)] = (
+                            stage.name,
+                            f"{type(error).__name__}: {error}",
+                        )
+                        in_flight -= 1
+                admit()
+        finally:
+            for executor in owned:
+                executor.shutdown(wait=True, cancel_futures=True)
+        return result
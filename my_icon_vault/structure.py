@@ -1,18 +1,39 @@
 # -*- coding: utf-8 -*-
 
+import typing as T
 import dataclasses
 from pathlib import Path
 from functools import cached_property
 
 from s3pathlib import S3Path
 
-from .constants import size_list
-from .paths import dir_project_root, dir_tmp, path_bin_svgo, path_bin_pngquant
+from .constants import size_list, BuildStageEnum
+from .paths import (
+    dir_project_root,
+    dir_tmp,
+    dir_assets_icons,
+    path_bin_svgo,
+    path_bin_pngquant,
+)
+from .manifest import get_file_sha256, get_files_sha256, StageRecord
 from .svgo_wrapper import SvgoCmd
-from .cairosvg_wrapper import Svg2PngCmd
+from .svgmin import SvgoBackendEnum
+from .cairosvg_wrapper import PngTarget, Svg2PngMultiSizeCmd
 from .pngquant_wrapper import PngQuantCmd
+from .palette import SharedPaletteCmd
+from .quantize import QuantizeBackendEnum
+from .render_quantize import RenderQuantizeCmd
+from .uploader import UploadTask
+from .publish import (
+    CACHE_CONTROL_IMMUTABLE,
+    guess_content_type,
+    get_content_hash,
+    to_content_addressed_s3path,
+    to_url,
+)
 
-dir_assets_icons = dir_project_root.joinpath("assets", "icons")
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .autotune import TuneSettings
 
 
 @dataclasses.dataclass
@@ -34,16 +55,10 @@ class IconAsset:
     def get_path_png(self, width: int = 96, height: int = 96) -> Path:
         return self.dir_asset.joinpath(f"{self.name}-{width}x{height}.png")
 
-    @classmethod
-    def list_all(cls) -> list["IconAsset"]:
-        assets = list()
-        for path in dir_assets_icons.rglob("*.svg"):
-            if len(path.relative_to(dir_assets_icons).parts) == 2:
-                asset = cls(name=path.parent.name)
-                assets.append(asset)
-        return assets
-
-    def to_svgo_cmd(self):
+    def to_svgo_cmd(
+        self,
+        backend: str = SvgoBackendEnum.svgo.value,
+    ) -> SvgoCmd:
         return SvgoCmd(
             path_bin=path_bin_svgo,
             path_in=self.path_svg,
@@ -51,35 +66,175 @@ class IconAsset:
             precision=1,
             quite=True,
             multipass=True,
+            backend=backend,
         )
 
-    def to_svg2png_cmds(self):
-        cmds = list()
-        for size in size_list:
-            cmd = Svg2PngCmd(
-                path_in=self.path_svg,
-                path_out=dir_tmp / self.get_path_png(size, size).name,
-                output_width=size,
-                output_height=size,
-            )
-            cmds.append(cmd)
-        return cmds
+    def to_svg2png_multi_size_cmd(
+        self,
+        downsample: bool = False,
+        quality_check: bool = True,
+    ) -> Svg2PngMultiSizeCmd:
+        return Svg2PngMultiSizeCmd(
+            path_in=self.path_svg,
+            path_out=None,
+            targets=[
+                PngTarget(
+                    path_out=dir_tmp / self.get_path_png(size, size).name,
+                    output_width=size,
+                    output_height=size,
+                )
+                for size in size_list
+            ],
+            downsample=downsample,
+            quality_check=quality_check,
+        )
+
+    def get_render_paths(self) -> dict[int, Path]:
+        """
+        Return the unquantized render of each size, the output of
+        :meth:`to_svg2png_multi_size_cmd` and the input of :meth:`to_pngquant_cmds`.
+        """
+        return {
+            size: dir_tmp / self.get_path_png(size, size).name for size in size_list
+        }
 
-    def to_pngquant_cmds(self):
+    def to_pngquant_cmds(
+        self,
+        backend: str = QuantizeBackendEnum.pngquant.value,
+        tune_settings: "TuneSettings | None" = None,
+    ) -> list[PngQuantCmd]:
+        """
+        :param tune_settings: the settings chosen by
+            :class:`~my_icon_vault.autotune.AutoTuner`, the sizes without
+            settings use the fixed quality range.
+        """
+        tuned = dict() if tune_settings is None else tune_settings.get(self.name, {})
         cmds = list()
-        for size in size_list:
-            path_out = self.get_path_png(size, size)
-            path_out.unlink(missing_ok=True)
+        for size, path_in in self.get_render_paths().items():
+            quality_range, ncolors = (25, 50), None
+            if size in tuned:
+                quality_range, ncolors = tuned[size].quality_range, tuned[size].ncolors
             cmd = PngQuantCmd(
                 path_bin=path_bin_pngquant,
-                path_in=dir_tmp / self.get_path_png(size, size).name,
-                path_out=path_out,
-                quality_range=(25, 50),
-                # quality_range=(50, 75),
+                path_in=path_in,
+                path_out=self.get_path_png(size, size),
+                quality_range=quality_range,
+                force=True,
+                ncolors=ncolors,
+                backend=backend,
             )
             cmds.append(cmd)
         return cmds
 
+    def to_shared_palette_cmd(self, **kwargs) -> SharedPaletteCmd:
+        """
+        Compress every size with one shared palette, see
+        :mod:`my_icon_vault.palette`.
+
+        :param kwargs: the arguments of :meth:`to_pngquant_cmds`.
+        """
+        return SharedPaletteCmd(
+            path_in=None,
+            path_out=None,
+            cmds=self.to_pngquant_cmds(**kwargs),
+        )
+
+    def get_stage_input_hash(self, stage: BuildStageEnum) -> str:
+        """
+        Hash the files the given build stage reads. ``compress_png`` reads the
+        renders of ``generate_png``, so it is rebuilt whenever a render
+        changes (e.g. a new cairosvg version, or ``downsample`` toggled), every
+        other stage reads the SVG.
+        """
+        if stage is BuildStageEnum.compress_png:
+            return get_files_sha256(self.get_render_paths().values())
+        return get_file_sha256(self.path_svg)
+
+    def get_stage_record(self, stage: BuildStageEnum, **kwargs) -> StageRecord:
+        """
+        Build the manifest record that determines the output of the given
+        build stage for this asset, keyed on the hash of the stage input,
+        see :meth:`get_stage_input_hash`.
+
+        :param kwargs: extra arguments for the ``to_xyz_cmd`` method of the stage.
+        """
+        if stage is BuildStageEnum.compress_svg:
+            cmd = self.to_svgo_cmd(**kwargs)
+            params = cmd.to_params()
+            tool_version = cmd.get_tool_version()
+        elif stage is BuildStageEnum.generate_png:
+            params = self.to_svg2png_multi_size_cmd(**kwargs).to_params()
+            tool_version = Svg2PngMultiSizeCmd.get_version()
+        elif stage is BuildStageEnum.compress_png:
+            if kwargs.pop("shared_palette", False):
+                cmd = self.to_shared_palette_cmd(**kwargs)
+                params = cmd.to_params()
+                tool_version = cmd.get_tool_version()
+            else:
+                cmds = self.to_pngquant_cmds(**kwargs)
+                params = [cmd.to_params() for cmd in cmds]
+                tool_version = cmds[0].get_tool_version()
+        elif stage is BuildStageEnum.build_png:
+            cmd = self.to_render_quantize_cmd(**kwargs)
+            params = cmd.to_params()
+            tool_version = cmd.get_tool_version()
+        else:  # pragma: no cover
+            raise NotImplementedError
+        return StageRecord(
+            input_hash=self.get_stage_input_hash(stage),
+            params=params,
+            tool_version=tool_version,
+        )
+
+    def get_stage_outputs(self, stage: BuildStageEnum, **kwargs) -> list[Path]:
+        """
+        Return the files the given build stage produces for this asset.
+        A stage is rebuilt if any of them is missing.
+        """
+        if stage is BuildStageEnum.compress_svg:
+            return [self.path_svg]
+        elif stage is BuildStageEnum.generate_png:
+            return [
+                target.path_out
+                for target in self.to_svg2png_multi_size_cmd(**kwargs).targets
+            ]
+        elif stage is BuildStageEnum.compress_png:
+            kwargs.pop("shared_palette", None)
+            return [cmd.path_out for cmd in self.to_pngquant_cmds(**kwargs)]
+        elif stage is BuildStageEnum.build_png:
+            return [
+                target.path_out
+                for target in self.to_render_quantize_cmd(**kwargs).targets
+            ]
+        else:  # pragma: no cover
+            raise NotImplementedError
+
+    def to_render_quantize_cmd(
+        self,
+        downsample: bool = False,
+        backend: str = QuantizeBackendEnum.pngquant.value,
+    ) -> RenderQuantizeCmd:
+        """
+        The in-memory alternative to :meth:`to_svg2png_multi_size_cmd` followed
+        by :meth:`to_pngquant_cmds`, it writes the final PNG files directly.
+        """
+        return RenderQuantizeCmd(
+            path_in=self.path_svg,
+            path_out=None,
+            targets=[
+                PngTarget(
+                    path_out=self.get_path_png(size, size),
+                    output_width=size,
+                    output_height=size,
+                )
+                for size in size_list
+            ],
+            path_bin=path_bin_pngquant,
+            quality_range=(25, 50),
+            downsample=downsample,
+            backend=backend,
+        )
+
     def get_local_and_s3_pairs(
         self,
         s3dir_root: S3Path,
@@ -100,14 +255,55 @@ class IconAsset:
             )
         return pairs
 
-    def upload_to_cloudflare_r2(
+    def to_upload_tasks(
+        self,
+        s3dir_root: S3Path,
+        content_addressed: bool = False,
+    ) -> list[UploadTask]:
+        """
+        :param content_addressed: if True, also upload every file to its
+            content-addressed key with a long-lived immutable ``Cache-Control``.
+        """
+        tasks = list()
+        for path, s3path in self.get_local_and_s3_pairs(s3dir_root):
+            content_type = guess_content_type(path)
+            tasks.append(
+                UploadTask(path=path, s3path=s3path, content_type=content_type)
+            )
+            if content_addressed:
+                tasks.append(
+                    UploadTask(
+                        path=path,
+                        s3path=to_content_addressed_s3path(
+                            s3path, get_content_hash(path)
+                        ),
+                        content_type=content_type,
+                        cache_control=CACHE_CONTROL_IMMUTABLE,
+                    )
+                )
+        return tasks
+
+    def to_icon_manifest_entry(
         self,
-        s3_client,
         s3dir_root: S3Path,
-    ):
-        pairs = self.get_local_and_s3_pairs(s3dir_root)
-        for path, s3path in pairs:
-            s3path.write_bytes(path.read_bytes(), bsm=s3_client)
+        url_root: str | None = None,
+    ) -> dict[str, T.Any]:
+        """
+        Map the SVG and each PNG size to its content-addressed URL,
+        see :mod:`my_icon_vault.publish`.
+        """
+
+        def get_url(path: Path) -> str:
+            s3path = s3dir_root.joinpath(*path.relative_to(dir_project_root).parts)
+            s3path = to_content_addressed_s3path(s3path, get_content_hash(path))
+            return to_url(s3path, s3dir_root, url_root)
+
+        return {
+            "svg": get_url(self.path_svg),
+            "png": {
+                str(size): get_url(self.get_path_png(size, size)) for size in size_list
+            },
+        }
 
     def to_icon_list_bullet(self) -> str:
         identifier = self.name
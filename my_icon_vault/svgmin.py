@@ -0,0 +1,684 @@
+# -*- coding: utf-8 -*-
+
+"""
+SVG Minifier - an in-process alternative to svgo
+
+:class:`~my_icon_vault.svgo_wrapper.SvgoCmd` needs a global Node.js install and
+pays the Node startup per process. :class:`SvgMinifier` covers the common icon
+cases in pure Python (the XML parser is the standard library ``expat``):
+
+- drop the XML declaration, doctype, comments, ``<metadata>``, and every
+  element and attribute of an editor namespace (Inkscape, Sodipodi,
+  Illustrator, Sketch, Figma, ...);
+- round numbers to ``precision`` decimals, e.g. ``x="10.04"`` -> ``x="10"``;
+- collapse useless groups, i.e. groups without attributes and groups with one
+  child that can take over their attributes, and drop empty groups;
+- shorten colors, e.g. ``rgb(255, 0, 0)`` -> ``red``, ``#FFFFFF`` -> ``#fff``;
+- minify path data: round the coordinates, pick the shorter of absolute and
+  relative coordinates per segment, and drop redundant command letters and
+  separators;
+- remove the whitespace between elements.
+
+With ``multipass``, the passes repeat until the output stops changing, like
+``svgo --multipass``. Use it through ``SvgoCmd(backend="svgmin")``, see
+:class:`SvgoBackendEnum`.
+"""
+
+import typing as T
+import io
+import re
+import enum
+import dataclasses
+import xml.etree.ElementTree as ET
+
+#: bump it when the output of :class:`SvgMinifier` changes
+SVGMIN_VERSION = 1
+
+#: svgo's default ``floatPrecision``
+DEFAULT_PRECISION = 3
+
+#: precision of the numbers of a transform, they scale everything inside
+TRANSFORM_PRECISION = 5
+
+#: maximum number of passes in multipass mode, the same as svgo
+MAX_PASSES = 10
+
+
+class SvgoBackendEnum(str, enum.Enum):
+    svgo = "svgo"
+    svgmin = "svgmin"
+
+
+NS_SVG = "http://www.w3.org/2000/svg"
+NS_XLINK = "http://www.w3.org/1999/xlink"
+NS_XML = "http://www.w3.org/XML/1998/namespace"
+
+# the editor namespaces of svgo's ``removeEditorsNSData`` plugin
+EDITOR_NAMESPACES = {
+    "http://creativecommons.org/ns#",
+    "http://inkscape.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://krita.org/namespaces/svg/krita",
+    "http://ns.adobe.com/AdobeIllustrator/10.0/",
+    "http://ns.adobe.com/AdobeSVGViewerExtensions/3.0/",
+    "http://ns.adobe.com/Extensibility/1.0/",
+    "http://ns.adobe.com/Flows/1.0/",
+    "http://ns.adobe.com/GenericCustomNamespace/1.0/",
+    "http://ns.adobe.com/Graphs/1.0/",
+    "http://ns.adobe.com/ImageReplacement/1.0/",
+    "http://ns.adobe.com/SaveForWeb/1.0/",
+    "http://ns.adobe.com/Variables/1.0/",
+    "http://ns.adobe.com/XPath/1.0/",
+    "http://purl.org/dc/elements/1.1/",
+    "http://schemas.microsoft.com/visio/2003/SVGExtensions/",
+    "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://taptrix.com/vectorillustrator/svg_extensions",
+    "http://www.bohemiancoding.com/sketch/ns",
+    "http://www.figma.com/figma/ns",
+    "http://www.inkscape.org/namespaces/inkscape",
+    "http://www.serif.com/",
+    "http://www.vector.evaxdesign.sk",
+    "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+}
+
+NUMERIC_ATTRIBUTES = {
+    "x",
+    "y",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "cx",
+    "cy",
+    "r",
+    "rx",
+    "ry",
+    "fx",
+    "fy",
+    "width",
+    "height",
+    "offset",
+    "opacity",
+    "fill-opacity",
+    "stroke-opacity",
+    "stop-opacity",
+    "stroke-width",
+    "stroke-miterlimit",
+    "stroke-dashoffset",
+    "stroke-dasharray",
+    "font-size",
+    "viewBox",
+    "points",
+}
+
+TRANSFORM_ATTRIBUTES = {"transform", "gradientTransform", "patternTransform"}
+
+COLOR_ATTRIBUTES = {
+    "fill",
+    "stroke",
+    "color",
+    "stop-color",
+    "flood-color",
+    "lighting-color",
+    "solid-color",
+}
+
+# the presentation attributes a child inherits from its group
+INHERITABLE_ATTRIBUTES = {
+    "clip-rule",
+    "color",
+    "color-interpolation",
+    "color-interpolation-filters",
+    "color-rendering",
+    "cursor",
+    "direction",
+    "fill",
+    "fill-opacity",
+    "fill-rule",
+    "font",
+    "font-family",
+    "font-size",
+    "font-size-adjust",
+    "font-stretch",
+    "font-style",
+    "font-variant",
+    "font-weight",
+    "image-rendering",
+    "letter-spacing",
+    "marker",
+    "marker-end",
+    "marker-mid",
+    "marker-start",
+    "paint-order",
+    "pointer-events",
+    "shape-rendering",
+    "stroke",
+    "stroke-dasharray",
+    "stroke-dashoffset",
+    "stroke-linecap",
+    "stroke-linejoin",
+    "stroke-miterlimit",
+    "stroke-opacity",
+    "stroke-width",
+    "text-anchor",
+    "text-rendering",
+    "visibility",
+    "word-spacing",
+    "writing-mode",
+}
+
+# elements whose text content is rendered, their whitespace is kept
+TEXT_ELEMENTS = {"text", "tspan", "textPath"}
+
+# named colors that can replace a hex color or be replaced by one
+NAMED_COLORS = {
+    "black": "#000000",
+    "white": "#ffffff",
+    "red": "#ff0000",
+    "lime": "#00ff00",
+    "blue": "#0000ff",
+    "yellow": "#ffff00",
+    "fuchsia": "#ff00ff",
+    "magenta": "#ff00ff",
+    "aqua": "#00ffff",
+    "cyan": "#00ffff",
+    "gray": "#808080",
+    "grey": "#808080",
+    "silver": "#c0c0c0",
+    "maroon": "#800000",
+    "olive": "#808000",
+    "green": "#008000",
+    "purple": "#800080",
+    "teal": "#008080",
+    "navy": "#000080",
+    "orange": "#ffa500",
+    "brown": "#a52a2a",
+    "tan": "#d2b48c",
+    "pink": "#ffc0cb",
+    "plum": "#dda0dd",
+    "peru": "#cd853f",
+    "gold": "#ffd700",
+    "snow": "#fffafa",
+    "wheat": "#f5deb3",
+    "khaki": "#f0e68c",
+    "coral": "#ff7f50",
+    "beige": "#f5f5dc",
+    "azure": "#f0ffff",
+    "linen": "#faf0e6",
+    "ivory": "#fffff0",
+    "orchid": "#da70d6",
+    "violet": "#ee82ee",
+    "indigo": "#4b0082",
+    "tomato": "#ff6347",
+    "salmon": "#fa8072",
+    "sienna": "#a0522d",
+}
+
+_HEX_TO_NAME: dict[str, str] = dict()
+for _name, _hex in NAMED_COLORS.items():
+    _HEX_TO_NAME.setdefault(_hex, _name)
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_HEX_COLOR = re.compile(r"#([0-9a-f]{6}|[0-9a-f]{3})")
+_RGB_COLOR = re.compile(
+    r"rgb\(\s*([\d.]+%?)\s*,?\s*([\d.]+%?)\s*,?\s*([\d.]+%?)\s*\)",
+    re.IGNORECASE,
+)
+
+
+def format_number(value: float, precision: int) -> str:
+    """
+    Format a number with at most ``precision`` decimals in its shortest form,
+    e.g. ``0.50`` -> ``.5`` and ``-0.0`` -> ``0``.
+    """
+    text = f"{value:.{precision}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    if text == "-0":
+        return "0"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+
+def round_numbers(value: str, precision: int) -> str:
+    """
+    Round every number of an attribute value, and separate the numbers of a
+    list (e.g. ``viewBox``) with a single space.
+    """
+    value = _NUMBER.sub(
+        lambda match: format_number(float(match.group()), precision),
+        value,
+    )
+    value = re.sub(r"\s*,\s*|\s+", " ", value.strip())
+    return re.sub(r"\s*([()])\s*", r"\1", value)
+
+
+def shorten_color(value: str) -> str:
+    """
+    Return the shortest equivalent of a color, values that are not a plain
+    color (``none``, ``currentColor``, ``url(#id)``, ...) are unchanged.
+    """
+    color = value.strip().lower()
+    match = _RGB_COLOR.fullmatch(color)
+    if match:
+        channels = list()
+        for channel in match.groups():
+            if channel.endswith("%"):
+                channels.append(round(float(channel[:-1]) * 2.55))
+            else:
+                channels.append(round(float(channel)))
+        if any(channel > 255 for channel in channels):
+            return value
+        color = "#" + "".join(f"{channel:02x}" for channel in channels)
+    color = NAMED_COLORS.get(color, color)
+    if _HEX_COLOR.fullmatch(color) is None:
+        return value
+    if len(color) == 4:
+        color = "#" + "".join(c * 2 for c in color[1:])
+    candidates = [color]
+    if color[1] == color[2] and color[3] == color[4] and color[5] == color[6]:
+        candidates.append("#" + color[1::2])
+    if color in _HEX_TO_NAME:
+        candidates.append(_HEX_TO_NAME[color])
+    # min() keeps the first of equally short candidates, i.e. the hex form
+    return min(candidates, key=len)
+
+
+# ------------------------------------------------------------------------------
+# Path data
+# ------------------------------------------------------------------------------
+_N_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7}
+_PATH_COMMAND = re.compile(r"[\s,]*([MmZzLlHhVvCcSsQqTtAa])")
+_PATH_NUMBER = re.compile(r"[\s,]*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+_PATH_FLAG = re.compile(r"[\s,]*([01])")
+
+#: ``(command, absolute arguments)``, the command is upper case
+Segment = tuple[str, list[float]]
+
+
+def _invalid_path(d: str, pos: int) -> ValueError:
+    return ValueError(f"invalid path data at {pos}: {d[pos : pos + 20]!r}")
+
+
+def parse_path(d: str) -> list[Segment]:
+    """
+    Parse path data into segments with absolute coordinates, one segment per
+    argument group, e.g. ``m1 1 2 2`` -> ``[("M", [1, 1]), ("L", [3, 3])]``.
+
+    Raises:
+        ValueError: If the path data is malformed.
+    """
+    segments = list()
+    x = y = start_x = start_y = 0.0
+    pos = 0
+    d = d.rstrip(" \t\r\n,")
+    while pos < len(d):
+        match = _PATH_COMMAND.match(d, pos)
+        if match is None:
+            raise _invalid_path(d, pos)
+        pos = match.end()
+        letter = match.group(1)
+        command, is_relative = letter.upper(), letter.islower()
+        if command == "Z":
+            segments.append(("Z", []))
+            x, y = start_x, start_y
+            continue
+        n_args = _N_ARGS[command]
+        is_first = True
+        while is_first or _PATH_NUMBER.match(d, pos):
+            args = list()
+            for i in range(n_args):
+                pattern = _PATH_FLAG if command == "A" and i in (3, 4) else _PATH_NUMBER
+                arg_match = pattern.match(d, pos)
+                if arg_match is None:
+                    raise _invalid_path(d, pos)
+                pos = arg_match.end()
+                args.append(float(arg_match.group(1)))
+            if is_relative:
+                if command == "H":
+                    args[0] += x
+                elif command == "V":
+                    args[0] += y
+                elif command == "A":
+                    args[5] += x
+                    args[6] += y
+                else:
+                    for i in range(0, n_args, 2):
+                        args[i] += x
+                        args[i + 1] += y
+            if command == "H":
+                x = args[0]
+            elif command == "V":
+                y = args[0]
+            else:
+                x, y = args[-2], args[-1]
+            if command == "M":
+                if is_first is False:
+                    # the argument groups after a moveto are lineto
+                    command = "L"
+                else:
+                    start_x, start_y = x, y
+            segments.append((command, args))
+            is_first = False
+    return segments
+
+
+def _join_numbers(numbers: list[str]) -> str:
+    """
+    Join numbers without the separators the parser doesn't need, e.g.
+    ``["1", "-2", ".5", ".5"]`` -> ``"1-2.5.5"``.
+    """
+    parts = list()
+    previous = None
+    for number in numbers:
+        if previous is not None and not (
+            number.startswith("-") or (number.startswith(".") and "." in previous)
+        ):
+            parts.append(" ")
+        parts.append(number)
+        previous = number
+    return "".join(parts)
+
+
+def format_path(segments: list[Segment], precision: int) -> str:
+    """
+    Serialize segments as short as possible, see :func:`parse_path`.
+
+    Each segment uses the shorter of its absolute and relative form. The
+    relative coordinates are computed from the point the output itself
+    reaches, so the rounding errors don't add up along the path.
+    """
+
+    def fmt(value: float) -> str:
+        return format_number(value, precision)
+
+    out = list()
+    x = y = start_x = start_y = 0.0
+    previous_letter = None  # the letter the parser would repeat
+    last_number: str | None = None
+    for command, args in segments:
+        if command == "Z":
+            out.append("z")
+            previous_letter, last_number = "z", None
+            x, y = start_x, start_y
+            continue
+        if command == "H":
+            absolute = [fmt(args[0])]
+            relative = [fmt(args[0] - x)]
+        elif command == "V":
+            absolute = [fmt(args[0])]
+            relative = [fmt(args[0] - y)]
+        elif command == "A":
+            head = [fmt(value) for value in args[:3]]
+            flags = [str(int(args[3])), str(int(args[4]))]
+            absolute = head + flags + [fmt(args[5]), fmt(args[6])]
+            relative = head + flags + [fmt(args[5] - x), fmt(args[6] - y)]
+        else:
+            absolute = [fmt(value) for value in args]
+            relative = [
+                fmt(value - (x if i % 2 == 0 else y)) for i, value in enumerate(args)
+            ]
+        candidates = list()
+        for letter, numbers in [(command.lower(), relative), (command, absolute)]:
+            is_implicit = (
+                letter == previous_letter and letter not in "Mm"
+            ) or (previous_letter, letter) in (("M", "L"), ("m", "l"))
+            text = _join_numbers(numbers)
+            if is_implicit and last_number is not None:
+                text = _join_numbers([last_number, text])[len(last_number) :]
+            else:
+                text = letter + text
+            candidates.append((len(text), letter, numbers, text, is_implicit))
+        _, letter, numbers, text, is_implicit = min(candidates, key=lambda c: c[0])
+        out.append(text)
+        if is_implicit is False:
+            previous_letter = letter
+        last_number = numbers[-1]
+
+        # move to the point the output reaches, not the exact one
+        is_relative = letter.islower()
+        if command == "H":
+            x = (x if is_relative else 0.0) + float(numbers[0])
+        elif command == "V":
+            y = (y if is_relative else 0.0) + float(numbers[0])
+        else:
+            end_x, end_y = float(numbers[-2]), float(numbers[-1])
+            x, y = (x + end_x, y + end_y) if is_relative else (end_x, end_y)
+        if command == "M":
+            start_x, start_y = x, y
+    return "".join(out)
+
+
+def minify_path(d: str, precision: int) -> str:
+    """
+    Minify path data, malformed path data is returned unchanged.
+    """
+    try:
+        segments = parse_path(d)
+    except ValueError:
+        return d
+    return format_path(segments, precision)
+
+
+# ------------------------------------------------------------------------------
+# Document
+# ------------------------------------------------------------------------------
+def split_tag(tag: str) -> tuple[str | None, str]:
+    """
+    Split an ElementTree tag into namespace and local name.
+    """
+    if tag.startswith("{"):
+        namespace, _, name = tag[1:].partition("}")
+        return namespace, name
+    return None, tag
+
+
+def _escape_attribute(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace('"', "&quot;")
+
+
+def _escape_text(value: str) -> str:
+    return value.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+@dataclasses.dataclass
+class SvgMinifier:
+    """
+    In-process SVG optimization, see module docstring.
+
+    Args:
+        precision: Number of decimals of the numbers, the numbers of
+            transforms keep at least :data:`TRANSFORM_PRECISION` decimals.
+        multipass: Repeat the passes until the output stops changing.
+
+    Example:
+        >>> minifier = SvgMinifier(precision=1)
+        >>> svg = minifier.minify(Path("icon.svg").read_text())
+    """
+
+    precision: int = dataclasses.field(default=DEFAULT_PRECISION)
+    multipass: bool = dataclasses.field(default=True)
+
+    @classmethod
+    def get_version(cls) -> str:
+        return f"svgmin {SVGMIN_VERSION}"
+
+    def minify(self, svg: str | bytes) -> str:
+        """
+        Minify an SVG document.
+
+        Raises:
+            xml.etree.ElementTree.ParseError: If the SVG is not valid XML.
+        """
+        text = self._minify_once(svg)
+        if self.multipass:
+            for _ in range(MAX_PASSES - 1):
+                new_text = self._minify_once(text)
+                if new_text == text:
+                    break
+                text = new_text
+        return text
+
+    def minify_bytes(self, data: bytes) -> bytes:
+        return self.minify(data).encode("utf-8")
+
+    def _minify_once(self, svg: str | bytes) -> str:
+        data = svg.encode("utf-8") if isinstance(svg, str) else svg
+        prefixes = dict()
+        root = None
+        # comments, processing instructions and the doctype are not kept
+        for event, item in ET.iterparse(io.BytesIO(data), events=("start-ns", "start")):
+            if event == "start-ns":
+                prefix, namespace = item
+                prefixes.setdefault(namespace, prefix)
+            elif root is None:
+                root = item
+        has_style = any(
+            split_tag(element.tag)[1] == "style" for element in root.iter()
+        )
+        self._clean(root)
+        self._collapse_groups(root, has_style=has_style)
+        return self._serialize(root, prefixes)
+
+    def _clean(self, element: ET.Element):
+        """
+        Drop the editor data and metadata, and minify the attribute values.
+        """
+        for child in list(element):
+            namespace, name = split_tag(child.tag)
+            if namespace in EDITOR_NAMESPACES or name == "metadata":
+                element.remove(child)
+            else:
+                self._clean(child)
+        for key in list(element.attrib):
+            namespace, name = split_tag(key)
+            if namespace in EDITOR_NAMESPACES:
+                del element.attrib[key]
+                continue
+            if namespace is None:
+                element.attrib[key] = self._minify_attribute(name, element.attrib[key])
+
+    def _minify_attribute(self, name: str, value: str) -> str:
+        if name == "d":
+            return minify_path(value, self.precision)
+        if name in NUMERIC_ATTRIBUTES:
+            return round_numbers(value, self.precision)
+        if name in TRANSFORM_ATTRIBUTES:
+            return round_numbers(value, max(self.precision, TRANSFORM_PRECISION))
+        if name in COLOR_ATTRIBUTES:
+            return shorten_color(value)
+        if name == "style":
+            return self._minify_style(value)
+        return value
+
+    def _minify_style(self, style: str) -> str:
+        declarations = list()
+        for declaration in style.split(";"):
+            name, sep, value = declaration.partition(":")
+            name, value = name.strip(), value.strip()
+            if not (sep and name and value):
+                continue
+            if name in NUMERIC_ATTRIBUTES or name in COLOR_ATTRIBUTES:
+                value = self._minify_attribute(name, value)
+            declarations.append(f"{name}:{value}")
+        return ";".join(declarations)
+
+    def _collapse_groups(self, element: ET.Element, has_style: bool):
+        """
+        Replace the groups that don't need to exist by their children, the
+        same rules as svgo's ``collapseGroups`` and ``removeEmptyContainers``.
+        Groups are kept if a ``<style>`` element may select them, and inside
+        a ``<switch>``, which renders only one of its direct children.
+        """
+        if split_tag(element.tag)[1] == "switch":
+            has_style = True
+        index = 0
+        while index < len(element):
+            child = element[index]
+            self._collapse_groups(child, has_style=has_style)
+            if split_tag(child.tag) != (NS_SVG, "g") or has_style:
+                index += 1
+                continue
+            if len(child) == 0 and not {"id", "filter"} & set(child.attrib):
+                del element[index]
+                continue
+            if child.attrib and len(child) == 1:
+                self._move_attributes(child, child[0])
+            if child.attrib:
+                index += 1
+                continue
+            element[index : index + 1] = list(child)
+
+    def _move_attributes(self, group: ET.Element, child: ET.Element):
+        """
+        Move the attributes of a group to its only child, if all of them can
+        be moved.
+        """
+        if "id" in child.attrib:
+            return
+        for key, value in group.attrib.items():
+            if key == "transform":
+                if {"clip-path", "mask"} & set(child.attrib):
+                    return
+            elif key not in INHERITABLE_ATTRIBUTES:
+                return
+        for key, value in group.attrib.items():
+            if key == "transform" and "transform" in child.attrib:
+                child.set(key, f"{value} {child.attrib[key]}")
+            elif child.attrib.get(key, "inherit") == "inherit":
+                child.set(key, value)
+        group.attrib.clear()
+
+    def _serialize(self, root: ET.Element, prefixes: dict[str, str]) -> str:
+        namespaces = dict()  # namespace -> prefix, of the used namespaces
+
+        def qualify(tag: str) -> str:
+            namespace, name = split_tag(tag)
+            if namespace is None:
+                return name
+            if namespace == NS_XML:
+                return f"xml:{name}"
+            if namespace not in namespaces:
+                if namespace == NS_SVG:
+                    prefix = ""
+                elif namespace == NS_XLINK:
+                    prefix = "xlink"
+                else:
+                    prefix = prefixes.get(namespace) or f"ns{len(namespaces)}"
+                namespaces[namespace] = prefix
+            prefix = namespaces[namespace]
+            return f"{prefix}:{name}" if prefix else name
+
+        parts: list[str] = list()
+
+        def write(element: ET.Element, preserve: bool):
+            _, name = split_tag(element.tag)
+            preserve = preserve or name in TEXT_ELEMENTS
+            tag = qualify(element.tag)
+            parts.append(f"<{tag}")
+            for key, value in element.attrib.items():
+                parts.append(f' {qualify(key)}="{_escape_attribute(value)}"')
+            text = element.text or ""
+            if preserve is False:
+                text = text.strip()
+            if len(element) == 0 and not text:
+                parts.append("/>")
+                return
+            parts.append(">")
+            parts.append(_escape_text(text))
+            for child in element:
+                write(child, preserve)
+                if preserve and child.tail:
+                    parts.append(_escape_text(child.tail))
+            parts.append(f"</{tag}>")
+
+        write(root, preserve=False)
+        # the namespace declarations are known once every tag is qualified
+        declarations = "".join(
+            f' xmlns="{namespace}"' if not prefix else f' xmlns:{prefix}="{namespace}"'
+            for namespace, prefix in namespaces.items()
+        )
+        head = parts[0]
+        return head + declarations + "".join(parts[1:])
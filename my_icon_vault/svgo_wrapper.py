@@ -22,6 +22,7 @@ Key features:
 - Batch processing with multiprocessing support
 - Quiet mode for suppressing output during batch operations
 - Multi-pass optimization for maximum compression
+- Batch mode that optimizes many files in one Node.js process
 - Preserves visual quality while minimizing file size
 
 Typical use cases include:
@@ -32,13 +33,16 @@ Typical use cases include:
 - Preprocessing SVG files before further conversion or deployment
 """
 
-import subprocess
+import typing as T
+import itertools
+import functools
 import dataclasses
+import xml.etree.ElementTree as ET
 from pathlib import Path
 
-import mpire
-
-from .base import BaseCmd
+from .base import BatchRunError, CmdResult, BaseCmd, run_tool
+from .executor import WorkerPoolExecutor, parallel_map
+from .svgmin import DEFAULT_PRECISION, SvgoBackendEnum, SvgMinifier
 
 
 @dataclasses.dataclass
@@ -61,6 +65,8 @@ class SvgoCmd(BaseCmd):
                Useful for batch processing to reduce log verbosity.
         multipass: If True, runs multiple optimization passes for better compression.
                    This may significantly improve optimization but takes more time.
+        backend: ``"svgo"`` runs the svgo binary, ``"svgmin"`` optimizes in the
+                 current process without Node.js, see :mod:`my_icon_vault.svgmin`.
 
     Example:
         >>> cmd = SvgoCmd(
@@ -86,6 +92,57 @@ class SvgoCmd(BaseCmd):
     precision: int | None = dataclasses.field(default=None)
     quite: bool = dataclasses.field(default=False)
     multipass: bool = dataclasses.field(default=True)
+    backend: str = dataclasses.field(default=SvgoBackendEnum.svgo.value)
+
+    _non_param_fields = ("path_in", "path_out", "path_bin", "quite")
+
+    @classmethod
+    @functools.cache
+    def get_version(cls, path_bin: Path | str) -> str:
+        """
+        Return the version string reported by ``svgo --version``.
+
+        The result is cached, so the Node process is only spawned once.
+        """
+        res = run_tool([str(path_bin), "--version"], text=True, check=True)
+        return res.stdout.strip()
+
+    @property
+    def is_in_process(self) -> bool:
+        return self.backend != SvgoBackendEnum.svgo.value
+
+    def get_tool_version(self) -> str:
+        """
+        Return the version of the tool of :attr:`backend`.
+        """
+        if self.is_in_process:
+            return SvgMinifier.get_version()
+        return self.get_version(self.path_bin)
+
+    def to_params(self) -> dict[str, T.Any]:
+        params = super().to_params()
+        # the default backend is left out, so the build manifest records
+        # made before the backend option existed stay valid
+        if self.backend == SvgoBackendEnum.svgo.value:
+            params.pop("backend")
+        return params
+
+    def to_minifier(self) -> SvgMinifier:
+        """
+        Return the in-process minifier with the settings of this command.
+        """
+        return SvgMinifier(
+            precision=DEFAULT_PRECISION if self.precision is None else self.precision,
+            multipass=self.multipass,
+        )
+
+    def _minify_file(self, minifier: SvgMinifier | None = None):
+        """
+        Optimize the file with the in-process backend.
+        """
+        if minifier is None:
+            minifier = self.to_minifier()
+        self.path_out.write_bytes(minifier.minify_bytes(self.path_in.read_bytes()))
 
     @property
     def args(self) -> list[str]:
@@ -126,7 +183,18 @@ class SvgoCmd(BaseCmd):
             args.append("--multipass")
         return args
 
-    def run(self, verbose: bool = False):
+    def to_args(self) -> list[str]:
+        """
+        Same as :attr:`args`, the common interface with
+        :meth:`~my_icon_vault.pngquant_wrapper.PngQuantCmd.to_args`.
+        """
+        return self.args
+
+    def run(
+        self,
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> CmdResult:
         """
         Execute SVGO optimization on the specified input SVG file.
 
@@ -138,12 +206,19 @@ class SvgoCmd(BaseCmd):
         Args:
             verbose: If True, prints the full command line before execution.
                      Useful for debugging or understanding the exact SVGO invocation.
+            profile_dir: If given, profile the command,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            The :class:`~my_icon_vault.base.CmdResult` of the optimization.
 
         Raises:
             subprocess.CalledProcessError: If SVGO exits with non-zero status,
                 typically indicating an invalid SVG file or SVGO configuration error.
             FileNotFoundError: If the SVGO binary is not found in the specified path.
                 Make sure SVGO is installed via: npm install -g svgo
+            xml.etree.ElementTree.ParseError: If the in-process backend gets
+                an invalid SVG file.
 
         Example:
             >>> cmd = SvgoCmd(
@@ -162,12 +237,24 @@ class SvgoCmd(BaseCmd):
         #     print(" ".join(args))
         if verbose:
             self._log_before()
-        subprocess.run(args, check=True)
+        with self._measure(profile_dir) as result:
+            if self.is_in_process:
+                self._minify_file()
+            else:
+                res = run_tool(args, text=True, check=True)
+                result.stderr = res.stderr
         if verbose:
             self._log_after()
+        return result
 
     @classmethod
-    def parallel_run(cls, cmds: list["SvgoCmd"], verbose: bool = False):
+    def parallel_run(
+        cls,
+        cmds: list["SvgoCmd"],
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ):
         """
         Batch optimize multiple SVG files in parallel using multiprocessing.
 
@@ -178,10 +265,13 @@ class SvgoCmd(BaseCmd):
         Args:
             cmds: List of SvgoCmd instances, each configured for a specific
                   input SVG file and optimization settings.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
 
         Returns:
-            List of results from each worker process (typically None for each
-            successful optimization).
+            One :class:`~my_icon_vault.base.CmdResult` per command.
 
         Raises:
             subprocess.CalledProcessError: If any SVGO process fails, typically
@@ -210,14 +300,220 @@ class SvgoCmd(BaseCmd):
             original SVG optimization level and complexity.
         """
 
-        def main(ith: int, cmd: SvgoCmd):
-            print(f"[{ith}] Compressing: {cmd.path_in} -> {cmd.path_out}")
-            cmd.run(verbose=verbose)
+        tasks = [
+            {"ith": i, "cmd": cmd, "verbose": verbose, "profile_dir": profile_dir}
+            for i, cmd in enumerate(cmds, start=1)
+        ]
+        return parallel_map(_parallel_run_main, tasks, executor=executor)
+
+    def _batch_key(self) -> tuple:
+        """
+        Commands with the same batch key can share one svgo process.
+        """
+        return (
+            str(self.path_bin),
+            self.precision,
+            self.quite,
+            self.multipass,
+            self.backend,
+        )
+
+    @classmethod
+    def to_batch_args(cls, cmds: list["SvgoCmd"]) -> list[str]:
+        """
+        Generate the command line arguments that optimize all the given files
+        in one svgo process. All commands must share the same settings.
+
+        Example:
+            >>> args = SvgoCmd.to_batch_args([cmd1, cmd2])
+            >>> # Returns: ["svgo", "--input", "a.svg", "b.svg",
+            >>> #          "--output", "a_opt.svg", "b_opt.svg", "--precision", "1"]
+        """
+        first = cmds[0]
+        if len({cmd._batch_key() for cmd in cmds}) != 1:
+            raise ValueError("all commands of a batch must share the same settings")
+        args = [str(first.path_bin), "--input"]
+        args.extend(str(cmd.path_in) for cmd in cmds)
+        args.append("--output")
+        args.extend(str(cmd.path_out) for cmd in cmds)
+        if first.precision:
+            args.extend(["--precision", str(first.precision)])
+        if first.quite:
+            args.append("--quiet")
+        if first.multipass:
+            args.append("--multipass")
+        return args
 
-        tasks = [{"ith": i, "cmd": cmd} for i, cmd in enumerate(cmds, start=1)]
-        with mpire.WorkerPool(start_method="fork") as pool:
-            results = pool.map(
-                main,
-                tasks,
+    @classmethod
+    def _batch_run(cls, cmds: list["SvgoCmd"]) -> dict[Path, tuple[int, str]]:
+        """
+        Optimize all files in one svgo process and return the failures,
+        ``{path_in: (returncode, error)}``.
+
+        svgo aborts the whole process on the first invalid file, so when the
+        batch fails, each file is optimized again in its own process to find
+        out which files are broken and why.
+
+        The in-process backend streams the files through one
+        :class:`~my_icon_vault.svgmin.SvgMinifier`.
+        """
+        if cmds[0].is_in_process:
+            return cls._batch_run_in_process(cmds)
+        res = run_tool(cls.to_batch_args(cmds), text=True)
+        if res.returncode == 0:
+            return {}
+        failures = dict()
+        for cmd in cmds:
+            res = run_tool(cmd.args, text=True)
+            if res.returncode != 0:
+                failures[cmd.path_in] = (
+                    res.returncode,
+                    (res.stderr or res.stdout).strip(),
+                )
+        return failures
+
+    @classmethod
+    def _batch_run_in_process(
+        cls,
+        cmds: list["SvgoCmd"],
+    ) -> dict[Path, tuple[int, str]]:
+        minifier = cmds[0].to_minifier()
+        failures = dict()
+        for cmd in cmds:
+            try:
+                cmd._minify_file(minifier)
+            except ET.ParseError as e:
+                failures[cmd.path_in] = (1, f"invalid SVG: {e}")
+            except Exception as e:
+                # e.g. an unreadable file, like svgo it only fails this file
+                failures[cmd.path_in] = (1, f"{type(e).__name__}: {e}")
+        return failures
+
+    @classmethod
+    def batch_run(
+        cls,
+        cmds: list["SvgoCmd"],
+        verbose: bool = False,
+        profile_dir: Path | None = None,
+    ) -> list[CmdResult]:
+        """
+        Optimize multiple SVG files in a single svgo process.
+
+        Spawning Node.js and loading the svgo plugins usually costs more than
+        optimizing a small icon, batching amortizes that startup cost.
+
+        Args:
+            cmds: List of SvgoCmd instances that share the same settings.
+            profile_dir: If given, profile the command,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command, the time of
+            the svgo process is split evenly between the files.
+
+        Raises:
+            BatchRunError: If any file failed, with the error of every failed file.
+        """
+        if verbose:
+            for cmd in cmds:
+                cmd._log_before()
+        with cls._measure_batch(cmds, profile_dir) as results:
+            failures = cls._batch_run(cmds)
+            for result in results:
+                if result.path_in in failures:
+                    result.returncode, result.stderr = failures[result.path_in]
+        if verbose:
+            for cmd in cmds:
+                if cmd.path_in not in failures:
+                    cmd._log_after()
+        if failures:
+            raise BatchRunError(
+                {path: error for path, (_, error) in failures.items()},
+                results=results,
+            )
+        return results
+
+    @classmethod
+    def parallel_batch_run(
+        cls,
+        cmds: list["SvgoCmd"],
+        chunk_size: int = 50,
+        verbose: bool = False,
+        executor: WorkerPoolExecutor | None = None,
+        profile_dir: Path | None = None,
+    ) -> list[CmdResult]:
+        """
+        Split the commands into chunks of files that share the same settings,
+        and optimize the chunks in parallel, one svgo process per chunk.
+
+        Args:
+            cmds: List of SvgoCmd instances.
+            chunk_size: Maximum number of files per svgo process.
+            executor: Optional shared worker pool, see
+                :class:`~my_icon_vault.executor.WorkerPoolExecutor`.
+            profile_dir: If given, profile every command in its worker,
+                see :mod:`my_icon_vault.profiler`.
+
+        Returns:
+            One :class:`~my_icon_vault.base.CmdResult` per command, grouped by chunk.
+
+        Raises:
+            BatchRunError: If any file failed, after all chunks are processed.
+
+        Example:
+            >>> SvgoCmd.parallel_batch_run(cmds, chunk_size=50)
+            [1] Compressing 50 files: icon1.svg ... icon50.svg
+            [2] Compressing 12 files: icon51.svg ... icon62.svg
+        """
+        groups: dict[tuple, list[SvgoCmd]] = dict()
+        for cmd in cmds:
+            groups.setdefault(cmd._batch_key(), list()).append(cmd)
+        chunks = list()
+        for group in groups.values():
+            for i in range(0, len(group), chunk_size):
+                chunks.append(group[i : i + chunk_size])
+
+        tasks = [
+            {"ith": i, "chunk": chunk, "verbose": verbose, "profile_dir": profile_dir}
+            for i, chunk in enumerate(chunks, start=1)
+        ]
+        results = list(
+            itertools.chain(
+                *parallel_map(_parallel_batch_run_main, tasks, executor=executor)
             )
+        )
+        failures = {
+            result.path_in: result.stderr
+            for result in results
+            if result.is_succeeded is False
+        }
+        if failures:
+            raise BatchRunError(failures, results=results)
         return results
+
+
+# module level functions, so they can be sent to a reused worker pool
+def _parallel_run_main(
+    ith: int,
+    cmd: SvgoCmd,
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> CmdResult:
+    print(f"[{ith}] Compressing: {cmd.path_in} -> {cmd.path_out}")
+    return cmd.run(verbose=verbose, profile_dir=profile_dir)
+
+
+def _parallel_batch_run_main(
+    ith: int,
+    chunk: list[SvgoCmd],
+    verbose: bool,
+    profile_dir: Path | None = None,
+) -> list[CmdResult]:
+    print(
+        f"[{ith}] Compressing {len(chunk)} files: "
+        f"{chunk[0].path_in.name} ... {chunk[-1].path_in.name}"
+    )
+    try:
+        return SvgoCmd.batch_run(chunk, verbose=verbose, profile_dir=profile_dir)
+    except BatchRunError as e:
+        return e.results
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timeline Tracing - export the build as a Chrome / Perfetto trace
+
+A :class:`Tracer` collects spans: one span per stage in the main process, and
+one span per command or upload, tagged by worker process, asset and size. The
+spans are built from the :class:`~my_icon_vault.base.CmdResult` and
+:class:`~my_icon_vault.uploader.UploadResult` the stages already return, so
+tracing adds no work to the workers.
+
+:meth:`Tracer.dump` writes the
+`Chrome trace event format <https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU>`_,
+open it in ``chrome://tracing`` or https://ui.perfetto.dev to see worker idle
+time, stragglers and the barriers between stages::
+
+    with one.tracing() as tracer:
+        one.compress_svg()
+        one.generate_png()
+        one.compress_png()
+        one.upload_to_cloudflare_r2()
+    # the trace is written to tmp/traces/trace-{time}.json
+
+Each process is one row group. The stage spans are on the ``stages`` row of the
+main process. Spans of the same process that overlap in time (async tool
+processes, upload threads) are laid out on separate lanes.
+"""
+
+import typing as T
+import os
+import json
+import time
+import threading
+import contextlib
+import dataclasses
+from pathlib import Path
+
+from .base import CmdResult, get_file_size
+
+if T.TYPE_CHECKING:  # pragma: no cover
+    from .uploader import UploadResult
+
+#: the lane of the stage spans in the main process
+STAGE_TID = 0
+
+
+@dataclasses.dataclass
+class Span:
+    """
+    One complete event of the trace.
+
+    Args:
+        name: Name of the span, e.g. the file name of the asset.
+        cat: Category, the stage name.
+        start: Seconds since the epoch.
+        duration: Duration in seconds.
+        pid: Process of the span.
+        tid: Lane of the span, if None a free lane is assigned on export.
+        args: Tags shown in the trace viewer, e.g. the file sizes.
+    """
+
+    name: str = dataclasses.field()
+    cat: str = dataclasses.field()
+    start: float = dataclasses.field()
+    duration: float = dataclasses.field()
+    pid: int = dataclasses.field()
+    tid: int | None = dataclasses.field(default=None)
+    args: dict[str, T.Any] = dataclasses.field(default_factory=dict)
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+    def to_event(self, t0: float) -> dict[str, T.Any]:
+        """
+        Convert to a trace event, ``t0`` is the start of the trace.
+        """
+        return {
+            "name": self.name,
+            "cat": self.cat,
+            "ph": "X",
+            "ts": round((self.start - t0) * 1_000_000, 3),
+            "dur": round(self.duration * 1_000_000, 3),
+            "pid": self.pid,
+            "tid": self.tid,
+            "args": self.args,
+        }
+
+
+def assign_lanes(spans: list[Span]):
+    """
+    Set the ``tid`` of the spans without one, so that the spans of a process
+    on the same lane don't overlap. Lane 0 is reserved for the stage spans.
+    """
+    by_pid: dict[int, list[Span]] = dict()
+    for span in spans:
+        if span.tid is None:
+            by_pid.setdefault(span.pid, []).append(span)
+    for pid_spans in by_pid.values():
+        lane_ends: list[float] = list()
+        for span in sorted(pid_spans, key=lambda span: span.start):
+            for ith, end in enumerate(lane_ends):
+                if end <= span.start:
+                    lane_ends[ith] = span.end
+                    span.tid = ith + 1
+                    break
+            else:
+                lane_ends.append(span.end)
+                span.tid = len(lane_ends)
+
+
+@dataclasses.dataclass
+class Tracer:
+    """
+    Collect the spans of one or more stages, see module docstring.
+
+    Args:
+        spans: The collected spans.
+    """
+
+    spans: list[Span] = dataclasses.field(default_factory=list)
+    _lock: threading.Lock = dataclasses.field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def add_span(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, cat: str = "stage", **args) -> T.Iterator[Span]:
+        """
+        Trace the with block as a stage span of the current process.
+        """
+        span = Span(
+            name=name,
+            cat=cat,
+            start=time.time(),
+            duration=0.0,
+            pid=os.getpid(),
+            tid=STAGE_TID,
+            args=args,
+        )
+        wall_start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - wall_start
+            self.add_span(span)
+
+    def add_results(self, cat: str, results: T.Iterable[CmdResult]):
+        """
+        Add one span per command result.
+        """
+        for result in results:
+            if not result.start_time:
+                continue
+            self.add_span(
+                Span(
+                    name=result.path_in.name if result.path_in else cat,
+                    cat=cat,
+                    start=result.start_time,
+                    duration=result.wall_time,
+                    pid=result.pid,
+                    args={
+                        "path_in": str(result.path_in),
+                        "bytes_in": result.bytes_in,
+                        "bytes_out": result.bytes_out,
+                        "cpu_time": result.cpu_time,
+                        "returncode": result.returncode,
+                    },
+                )
+            )
+
+    def add_upload_results(
+        self,
+        results: T.Iterable["UploadResult"],
+        cat: str = "upload",
+        pid: int | None = None,
+    ):
+        """
+        Add one span per upload, the uploads run in threads of ``pid``,
+        defaults to the current process.
+        """
+        pid = os.getpid() if pid is None else pid
+        for result in results:
+            if not result.start_time:
+                continue
+            self.add_span(
+                Span(
+                    name=result.task.path.name,
+                    cat=cat,
+                    start=result.start_time,
+                    duration=result.wall_time,
+                    pid=pid,
+                    args={
+                        "path": str(result.task.path),
+                        "key": result.task.s3path.key,
+                        "bytes": get_file_size(result.task.path),
+                        "attempts": result.attempts,
+                        "error": result.error,
+                    },
+                )
+            )
+
+    def to_dict(self) -> dict[str, T.Any]:
+        with self._lock:
+            spans = list(self.spans)
+        assign_lanes(spans)
+        t0 = min((span.start for span in spans), default=0.0)
+        events = list()
+        main_pid = os.getpid()
+        for pid in sorted({span.pid for span in spans}):
+            name = "main" if pid == main_pid else "worker"
+            events.append(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "args": {"name": f"{name} {pid}"},
+                }
+            )
+        for pid, tid in sorted({(span.pid, span.tid) for span in spans}):
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": "stages" if tid == STAGE_TID else f"lane {tid}"},
+                }
+            )
+        events.extend(
+            span.to_event(t0) for span in sorted(spans, key=lambda span: span.start)
+        )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()) + "\n", encoding="utf-8")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+import asyncio
+import dataclasses
+from pathlib import Path
+
+import pytest
+
+from my_icon_vault.base import BatchRunError
+from my_icon_vault.async_runner import run_process, AsyncCmdRunner
+
+
+@dataclasses.dataclass
+class PythonCmd:
+    """
+    Run a Python snippet in a new interpreter, it stands in for a tool command.
+    """
+
+    path_in: Path
+    code: str
+
+    def to_args(self) -> list[str]:
+        return [sys.executable, "-c", self.code]
+
+
+def test_run_process():
+    code = "import sys; sys.stdout.write(sys.stdin.read().upper())"
+    result = asyncio.run(run_process([sys.executable, "-c", code], input=b"abc"))
+    assert result.is_succeeded
+    assert result.stdout == b"ABC"
+
+
+class TestAsyncCmdRunner:
+    def test_run(self):
+        cmds = [
+            PythonCmd(path_in=Path(f"{i}.svg"), code="import time; time.sleep(0.5)")
+            for i in range(4)
+        ]
+        st = time.perf_counter()
+        results = AsyncCmdRunner(concurrency=4).run(cmds)
+        elapsed = time.perf_counter() - st
+        assert len(results) == 4
+        assert all(result.is_succeeded for result in results)
+        assert all(result.wall_time >= 0.5 for result in results)
+        # the processes run concurrently
+        assert elapsed < 1.5
+
+    def test_run_failure(self):
+        cmds = [
+            PythonCmd(path_in=Path("good.svg"), code="pass"),
+            PythonCmd(
+                path_in=Path("bad.svg"),
+                code="import sys; sys.stderr.write('broken svg'); sys.exit(1)",
+            ),
+            PythonCmd(path_in=Path("also-good.svg"), code="pass"),
+        ]
+        with pytest.raises(BatchRunError) as e:
+            AsyncCmdRunner(concurrency=1).run(cmds)
+        assert e.value.failures == {Path("bad.svg"): "broken svg"}
+        assert [result.returncode for result in e.value.results] == [0, 1, 0]
+
+    def test_run_binary_not_found(self):
+        @dataclasses.dataclass
+        class MissingCmd:
+            path_in: Path
+
+            def to_args(self) -> list[str]:
+                return ["/not-exists/svgo", str(self.path_in)]
+
+        with pytest.raises(BatchRunError) as e:
+            AsyncCmdRunner().run([MissingCmd(path_in=Path("icon.svg"))])
+        assert list(e.value.failures) == [Path("icon.svg")]
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.async_runner",
+        preview=False,
+    )
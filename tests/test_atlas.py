@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+import json
+import shutil
+
+import pytest
+from PIL import Image
+
+from my_icon_vault.atlas import AtlasMap, AtlasBuilder, to_css_class
+from my_icon_vault.paths import path_test_png, dir_tmp
+
+
+def test_atlas_map_pack():
+    atlas_map = AtlasMap(size=96, prefix="icons", max_size=100, padding=2)
+    sprites = [atlas_map.insert(f"icon{i}", 48, 48, hash="") for i in range(5)]
+    assert [(s.page, s.x, s.y) for s in sprites] == [
+        (0, 0, 0),
+        (0, 50, 0),
+        (0, 0, 50),
+        (0, 50, 50),
+        (1, 0, 0),
+    ]
+    assert atlas_map.pages[0].get_dimensions(2) == (98, 98)
+    # a small sprite goes on the shortest shelf that fits
+    sprite = atlas_map.insert("small", 20, 20, hash="")
+    assert (sprite.page, sprite.x, sprite.y) == (1, 50, 0)
+    # a removed slot is reused
+    atlas_map.remove("icon1")
+    sprite = atlas_map.insert("new", 48, 48, hash="")
+    assert (sprite.page, sprite.x, sprite.y) == (0, 50, 0)
+
+    with pytest.raises(ValueError):
+        atlas_map.insert("too-large", 101, 10, hash="")
+
+    data = json.loads(json.dumps(atlas_map.to_dict()))
+    assert AtlasMap.from_dict(data, prefix="icons").to_dict() == data
+
+
+def test_to_css_class():
+    assert to_css_class("google-docs") == "google-docs"
+    assert to_css_class("node.js") == "node-js"
+
+
+def new_icon(path, color, size=32):
+    Image.new("RGBA", (size, size), color).save(path)
+    return path
+
+
+def test_atlas_builder():
+    dir_root = dir_tmp / "test_atlas"
+    shutil.rmtree(dir_root, ignore_errors=True)
+    dir_icons = dir_root / "icons"
+    dir_icons.mkdir(parents=True)
+    paths = {
+        "microsoft": path_test_png,
+        "red": new_icon(dir_icons / "red.png", (255, 0, 0, 255), size=128),
+        "blue": new_icon(dir_icons / "blue.png", (0, 0, 255, 255), size=128),
+    }
+    builder = AtlasBuilder(
+        dir_out=dir_root / "atlas",
+        max_size=130,
+        backend="pillow",
+    )
+    atlas_map = builder.build(128, paths, verbose=True)
+    assert len(atlas_map.pages) == 3
+    assert builder.get_path_css(128).read_text().count("background-image") == 3
+    assert len(builder.list_files(128)) == 5
+    sprite = atlas_map.sprites["red"]
+    with Image.open(builder.dir_out / atlas_map.pages[sprite.page].file) as page:
+        assert page.mode == "P"
+        assert page.convert("RGBA").getpixel((sprite.x + 1, sprite.y + 1)) == (
+            255,
+            0,
+            0,
+            255,
+        )
+
+    # nothing changed, no page is rebuilt
+    page_hashes = [page.hash for page in atlas_map.pages]
+    mtimes = [
+        (builder.dir_out / page.file).stat().st_mtime_ns for page in atlas_map.pages
+    ]
+    atlas_map = builder.build(128, paths)
+    assert [page.hash for page in atlas_map.pages] == page_hashes
+    assert [
+        (builder.dir_out / page.file).stat().st_mtime_ns for page in atlas_map.pages
+    ] == mtimes
+
+    # a changed icon keeps its slot, only its page is rebuilt
+    before = atlas_map.sprites["blue"]
+    new_icon(paths["blue"], (0, 255, 0, 255), size=128)
+    atlas_map = builder.build(128, paths)
+    after = atlas_map.sprites["blue"]
+    assert (after.page, after.x, after.y) == (before.page, before.x, before.y)
+    assert after.hash != before.hash
+    changed = [
+        i for i, (a, b) in enumerate(zip(page_hashes, atlas_map.pages)) if a != b.hash
+    ]
+    assert changed == [after.page]
+
+    # a removed icon frees its slot for a new one
+    del paths["red"]
+    paths["yellow"] = new_icon(dir_icons / "yellow.png", (255, 255, 0, 255), 128)
+    atlas_map = builder.build(128, paths)
+    assert set(atlas_map.sprites) == {"microsoft", "blue", "yellow"}
+    assert (atlas_map.sprites["yellow"].page, atlas_map.sprites["yellow"].x) == (
+        sprite.page,
+        sprite.x,
+    )
+
+    # a new layout repacks everything and removes the unused pages
+    builder.max_size = 512
+    atlas_map = builder.build(128, paths)
+    assert len(atlas_map.pages) == 1
+    assert not (builder.dir_out / "icons-128-1.png").exists()
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.atlas",
+        preview=False,
+    )
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import io
+import shutil
+import dataclasses
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from my_icon_vault.autotune import AutoTuner, AutoTuneCache
+from my_icon_vault.paths import path_test_png, dir_tmp
+
+dir_test = dir_tmp / "test_autotune"
+
+
+@dataclasses.dataclass
+class Asset:
+    """
+    The part of :class:`~my_icon_vault.structure.IconAsset` the tuner uses.
+    """
+
+    name: str
+    render_paths: dict[int, Path]
+
+    def get_render_paths(self) -> dict[int, Path]:
+        return self.render_paths
+
+
+def write_gradient_png(path: Path, size: int = 64):
+    x = np.linspace(0, 255, size, dtype=np.uint8)
+    arr = np.zeros((size, size, 4), dtype=np.uint8)
+    arr[..., 0] = x[None, :]
+    arr[..., 1] = x[:, None]
+    arr[..., 3] = 255
+    buffer = io.BytesIO()
+    Image.fromarray(arr).save(buffer, format="PNG")
+    path.write_bytes(buffer.getvalue())
+
+
+def test_tune_png():
+    shutil.rmtree(dir_test, ignore_errors=True)
+    dir_test.mkdir(parents=True)
+    path_gradient = dir_test / "gradient.png"
+    write_gradient_png(path_gradient)
+
+    tuner = AutoTuner(metric="ssim", backend="pillow")
+    assert tuner.threshold == 0.99
+    flat = tuner.tune_png(path_test_png)
+    assert flat.score >= tuner.threshold
+    assert flat.bytes_out < path_test_png.stat().st_size
+    gradient = tuner.tune_png(path_gradient)
+    # a gradient needs a higher quality than a flat logo
+    assert gradient.quality_range[1] >= flat.quality_range[1]
+
+    # an unreachable threshold falls back to the best score
+    tuner = AutoTuner(metric="psnr", threshold=1000, backend="pillow")
+    result = tuner.tune_png(path_gradient)
+    assert result.score < 1000
+    lowest = AutoTuner(metric="psnr", threshold=0, backend="pillow")
+    lowest = lowest.tune_png(path_gradient)
+    assert result.score >= lowest.score
+    assert result.bytes_out >= lowest.bytes_out
+
+
+def test_tune():
+    shutil.rmtree(dir_test, ignore_errors=True)
+    dir_test.mkdir(parents=True)
+    path_96 = dir_test / "logo-96x96.png"
+    shutil.copyfile(path_test_png, path_96)
+    asset = Asset(
+        name="logo",
+        render_paths={96: path_96, 256: dir_test / "logo-256x256.png"},
+    )
+    tuner = AutoTuner(backend="pillow", qualities=(20, 50, 90), ncolors_list=(256,))
+    cache = AutoTuneCache(path=dir_test / "autotune.json")
+    settings = tuner.tune([asset], cache=cache)
+    # the missing render has no settings
+    assert list(settings["logo"]) == [96]
+
+    cache = AutoTuneCache.load(cache.path)
+    assert cache.get("logo", 96) == settings["logo"][96]
+    # cached, the result is reused without a search
+    cache.assets["logo"][96].bytes_out = -1
+    assert tuner.tune([asset], cache=cache)["logo"][96].bytes_out == -1
+    # another threshold searches again
+    tuner = dataclasses.replace(tuner, threshold=0.5)
+    assert tuner.tune([asset], cache=cache)["logo"][96].bytes_out > 0
+
+    # a missing render keeps its cached settings
+    path_96.unlink()
+    assert tuner.tune([asset], cache=cache)["logo"][96].bytes_out > 0
+    cache.prune([])
+    assert cache.assets == {}
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.autotune",
+        preview=False,
+    )
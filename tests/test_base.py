@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from my_icon_vault.base import get_cpu_time, run_tool
+
+BUSY = "import time\nwhile time.process_time() < 0.5: pass"
+IDLE = "import time; time.sleep(0.5)"
+
+
+def test_run_tool():
+    code = "import sys; sys.stdout.write(sys.stdin.read())"
+    res = run_tool([sys.executable, "-c", code], input="abc", text=True)
+    assert (res.returncode, res.stdout) == (0, "abc")
+
+    # outputs larger than a pipe buffer, binary input
+    code = "import sys; sys.stdout.buffer.write(sys.stdin.buffer.read() * 1000)"
+    res = run_tool([sys.executable, "-c", code], input=bytes(range(256)) * 10)
+    assert res.stdout == bytes(range(256)) * 10_000
+
+    res = run_tool([sys.executable, "-c", "raise SystemExit(3)"])
+    assert res.returncode == 3
+    with pytest.raises(subprocess.CalledProcessError):
+        run_tool([sys.executable, "-c", "raise SystemExit(3)"], check=True)
+
+
+def measure(code: str) -> float:
+    cpu_start = get_cpu_time()
+    run_tool([sys.executable, "-c", code])
+    return get_cpu_time() - cpu_start
+
+
+def test_get_cpu_time():
+    # concurrent threads are only charged for their own tool process
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        busy = executor.submit(measure, BUSY)
+        idle = executor.submit(measure, IDLE)
+    assert busy.result() >= 0.5
+    assert idle.result() < 0.25
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.base",
+        preview=False,
+    )
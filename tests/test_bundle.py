@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from my_icon_vault.bundle import write_bundle, LRUCache, BundleReader
+from my_icon_vault.paths import path_test_svg, path_test_png, dir_tmp
+
+path_bundle = dir_tmp / "test_bundle" / "icons.bundle"
+
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2)
+    assert cache.get_or_set("a", lambda: 1) == 1
+    assert cache.get_or_set("b", lambda: 2) == 2
+    assert cache.get_or_set("a", lambda: -1) == 1
+    # "b" is the least recently used
+    assert cache.get_or_set("c", lambda: 3) == 3
+    assert cache.get_or_set("b", lambda: 20) == 20
+    assert cache.get_or_set("a", lambda: 10) == 10
+    assert (cache.hits, cache.misses) == (1, 5)
+    assert len(cache) == 2
+
+
+def test_bundle():
+    n_files = write_bundle(
+        path_bundle,
+        [
+            (("microsoft", 0, "svg"), path_test_svg),
+            (("microsoft", 96, "png"), path_test_png),
+        ],
+    )
+    assert n_files == 2
+
+    with BundleReader(path_bundle, cache_size=1) as reader:
+        assert len(reader) == 2
+        assert ("microsoft", 96, "png") in reader
+        assert set(reader.keys()) == {("microsoft", 0, "svg"), ("microsoft", 96, "png")}
+
+        view = reader.get("microsoft", 96, "png")
+        assert isinstance(view, memoryview)
+        assert view == path_test_png.read_bytes()
+        view.release()
+
+        svg = reader.get_decoded("microsoft")
+        assert svg == path_test_svg.read_text("utf-8")
+        assert reader.get_decoded("microsoft") is svg
+        png = reader.get_decoded("microsoft", 96, "png")
+        assert png == path_test_png.read_bytes()
+        assert len(reader.cache) == 1
+
+        with pytest.raises(KeyError):
+            reader.get("microsoft", 512, "png")
+
+
+def test_bundle_errors():
+    with pytest.raises(ValueError):
+        write_bundle(
+            path_bundle,
+            [
+                (("microsoft", 0, "svg"), path_test_svg),
+                (("microsoft", 0, "svg"), path_test_svg),
+            ],
+        )
+    # the partial bundle is removed
+    assert not path_bundle.with_name(f"{path_bundle.name}.tmp").exists()
+    path = dir_tmp / "test_bundle" / "not-a-bundle"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        BundleReader(path)
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.bundle",
+        preview=False,
+    )
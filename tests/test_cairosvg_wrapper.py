@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
 
-from my_icon_vault.cairosvg_wrapper import Svg2PngCmd
-from my_icon_vault.paths import path_test_svg, dir_tmp
+import numpy as np
+from PIL import Image
+
+from my_icon_vault.cairosvg_wrapper import Svg2PngCmd, PngTarget, Svg2PngMultiSizeCmd
+from my_icon_vault.paths import path_test_svg, path_test_hairline_svg, dir_tmp
 
 
 def test_svg2png():
@@ -17,6 +20,85 @@ def test_svg2png():
     cmd.run(verbose=True)
 
 
+def test_svg2png_multi_size():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    targets = list()
+    for size in [32, 64, 128]:
+        path_png = dir_tmp / f"{path_test_svg.stem}-{size}x{size}.png"
+        path_png.unlink(missing_ok=True)
+        targets.append(PngTarget(path_png, size, size))
+    cmd = Svg2PngMultiSizeCmd(
+        path_in=path_test_svg,
+        path_out=None,
+        targets=targets,
+    )
+    cmd.run(verbose=True)
+    for target in targets:
+        assert target.path_out.exists()
+    assert cmd.to_params() == {"sizes": [(32, 32), (64, 64), (128, 128)]}
+
+
+def test_svg2png_multi_size_downsample():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    for quality_check in [False, True]:
+        targets = list()
+        for size in [32, 64, 128]:
+            path_png = dir_tmp / f"{path_test_svg.stem}-downsample-{size}x{size}.png"
+            path_png.unlink(missing_ok=True)
+            targets.append(PngTarget(path_png, size, size))
+        cmd = Svg2PngMultiSizeCmd(
+            path_in=path_test_svg,
+            path_out=None,
+            targets=targets,
+            downsample=True,
+            quality_check=quality_check,
+        )
+        cmd.run(verbose=True)
+        for target in targets:
+            assert target.path_out.exists()
+
+
+def test_svg2png_multi_size_downsample_fallback():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    sizes = [32, 64, 128]
+
+    def new_cmd(mode: str, **kwargs) -> Svg2PngMultiSizeCmd:
+        return Svg2PngMultiSizeCmd(
+            path_in=path_test_hairline_svg,
+            path_out=None,
+            targets=[
+                PngTarget(
+                    dir_tmp / f"{path_test_hairline_svg.stem}-{mode}-{size}.png",
+                    size,
+                    size,
+                )
+                for size in sizes
+            ],
+            **kwargs,
+        )
+
+    def read_pixels(target: PngTarget) -> np.ndarray:
+        with Image.open(target.path_out) as image:
+            return np.asarray(image.convert("RGBA"))
+
+    direct = new_cmd("direct")
+    assert direct.run().is_succeeded
+    # the hairlines of the downsampled sizes can't reach an infinite PSNR,
+    # so every size falls back to a direct render
+    fallback = new_cmd("fallback", downsample=True, min_psnr=float("inf"))
+    assert fallback.quality_check is True
+    assert fallback.run().is_succeeded
+    for target_direct, target_fallback in zip(direct.targets, fallback.targets):
+        assert np.array_equal(read_pixels(target_direct), read_pixels(target_fallback))
+
+    # without the check, the 64x64 size is downsampled from the 128x128 render
+    downsample = new_cmd("downsample", downsample=True, quality_check=False)
+    assert downsample.run().is_succeeded
+    assert not np.array_equal(
+        read_pixels(direct.targets[1]), read_pixels(downsample.targets[1])
+    )
+
+
 if __name__ == "__main__":
     from my_icon_vault.tests import run_cov_test
 
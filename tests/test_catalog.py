@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+from my_icon_vault.catalog import parse_svg_size, to_match_expr, AssetCatalog
+from my_icon_vault.paths import path_test_svg, dir_tmp
+
+dir_root = dir_tmp / "test_catalog" / "icons"
+path_db = dir_tmp / "test_catalog" / "catalog.sqlite"
+
+
+def make_asset(name: str, view_box: str = "0 0 24 24", readme: str | None = None):
+    dir_asset = dir_root / name
+    dir_asset.mkdir(parents=True, exist_ok=True)
+    (dir_asset / f"{name}.svg").write_text(
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{view_box}"></svg>'
+    )
+    if readme is not None:
+        (dir_asset / "README.rst").write_text(readme)
+
+
+def test_parse_svg_size():
+    assert parse_svg_size(path_test_svg)[0] is not None
+    path = dir_tmp / "test_catalog_size.svg"
+    path.write_text('<svg width="32px" height="16"></svg>')
+    assert parse_svg_size(path) == (32.0, 16.0)
+    path.write_text("not an svg")
+    assert parse_svg_size(path) == (None, None)
+
+
+def test_to_match_expr():
+    assert to_match_expr("Google-Docs logo") == '"google"* "docs"* "logo"*'
+    assert to_match_expr("near AND") == '"near"* "and"*'
+    assert to_match_expr(" - ") is None
+
+
+def test_asset_catalog():
+    shutil.rmtree(dir_root.parent, ignore_errors=True)
+    make_asset("github", readme="GitHub logo\n\nmore text")
+    make_asset("python", view_box="0,0,48,32")
+    (dir_root / "python" / "python-16x16.png").write_bytes(b"")
+    (dir_root / "python" / "python-96x96.png").write_bytes(b"")
+    (dir_root / "empty").mkdir()
+
+    catalog = AssetCatalog(path_db=path_db, dir_root=dir_root)
+    result = catalog.refresh(verbose=True)
+    assert result.added == ["github", "python"]
+    assert catalog.list_names() == ["github", "python"]
+    github = catalog.get_entry("github")
+    assert github.description == "GitHub logo"
+    assert (github.width, github.height) == (24.0, 24.0)
+    python = catalog.get_entry("python")
+    assert (python.width, python.height) == (48.0, 32.0)
+    assert python.variants == ["16x16", "96x96"]
+    assert catalog.get_entry("empty") is None
+
+    # nothing changed
+    result = catalog.refresh()
+    assert (result.added, result.updated, result.removed) == ([], [], [])
+    assert result.unchanged == 2
+
+    # the SVG changed
+    path_svg = dir_root / "github" / "github.svg"
+    old_hash = github.svg_hash
+    make_asset("github", view_box="0 0 16 16")
+    st = path_svg.stat()
+    os.utime(path_svg, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    # an asset was removed, an asset was added
+    shutil.rmtree(dir_root / "python")
+    make_asset("aws")
+    result = catalog.refresh()
+    assert result.added == ["aws"]
+    assert result.updated == ["github"]
+    assert result.removed == ["python"]
+    github = catalog.get_entry("github")
+    assert github.width == 16.0
+    assert github.svg_hash != old_hash
+    assert catalog.count() == 2
+
+
+def test_search():
+    shutil.rmtree(dir_root.parent, ignore_errors=True)
+    make_asset("google-docs", readme="Google Docs\n\nThe logo of Google Docs.")
+    make_asset("git", readme="Git\n\nA distributed version control system.")
+    make_asset("github", readme="GitHub\n\nHosting for git repositories.")
+    make_asset("markdown", readme="Markdown\n\nA markup language for docs.")
+    make_asset("no-readme")
+    catalog = AssetCatalog(path_db=path_db, dir_root=dir_root)
+    catalog.refresh()
+
+    def search(query: str) -> list[str]:
+        return [entry.name for entry in catalog.search(query)]
+
+    assert search("google docs logo") == ["google-docs"]
+    assert search("version control") == ["git"]
+    # prefix match
+    assert sorted(search("git")) == ["git", "github"]
+    # name matches rank first
+    assert search("docs") == ["google-docs", "markdown"]
+    assert search("vers contr") == ["git"]
+    assert search("no readme") == ["no-readme"]
+    assert search("svn") == []
+    assert search("") == []
+
+    # the index is updated when a README changes
+    path_readme = dir_root / "github" / "README.rst"
+    path_readme.write_text("GitHub\n\nVersion control hosting.")
+    st = path_readme.stat()
+    os.utime(path_readme, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert catalog.refresh().updated == ["github"]
+    assert sorted(search("version control")) == ["git", "github"]
+    assert search("repositories") == []
+
+    # and when an asset is removed
+    shutil.rmtree(dir_root / "git")
+    catalog.refresh()
+    assert search("version control") == ["github"]
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.catalog",
+        preview=False,
+    )
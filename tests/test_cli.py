@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+
+from my_icon_vault.cli import main
+from my_icon_vault.paths import dir_tmp
+
+dir_root = dir_tmp / "test_cli" / "icons"
+path_db = dir_tmp / "test_cli" / "catalog.sqlite"
+
+
+def test_main(capsys):
+    shutil.rmtree(dir_root.parent, ignore_errors=True)
+    dir_asset = dir_root / "git"
+    dir_asset.mkdir(parents=True)
+    (dir_asset / "git.svg").write_text("<svg></svg>")
+    (dir_asset / "README.rst").write_text("Git\n\nVersion control.")
+    options = ["--db", str(path_db), "--root", str(dir_root)]
+
+    # the first search builds the catalog
+    assert main([*options, "search", "version", "control"]) == 0
+    assert capsys.readouterr().out == "git: Git\n"
+
+    assert main([*options, "refresh"]) == 0
+    assert "0 added, 0 updated, 0 removed, 1 unchanged" in capsys.readouterr().out
+
+    assert main([*options, "search", "svn", "--refresh"]) == 0
+    assert capsys.readouterr().out == ""
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.cli",
+        preview=False,
+    )
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import time
+import shutil
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from my_icon_vault.client import DiskLRUCache, IconClient
+from my_icon_vault.paths import dir_tmp
+
+dir_cache = dir_tmp / "test_client" / "cache"
+
+
+class Handler(BaseHTTPRequestHandler):
+    #: ``{path: content}``
+    files: dict[str, bytes] = dict()
+    #: ``[(path, status)]``
+    requests: list[tuple[str, int]] = list()
+    delay: float = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        content = self.files.get(self.path)
+        etag = None if content is None else f'"{hashlib.md5(content).hexdigest()}"'
+        if content is None:
+            status = 404
+        elif self.headers.get("If-None-Match") == etag:
+            status = 304
+        else:
+            status = 200
+        # record the request before the response, the client may check the
+        # requests as soon as it has the response
+        self.requests.append((self.path, status))
+        self.send_response(status)
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if status == 200:
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.files = {
+        "/assets/icons/github/github.svg": b"<svg>github</svg>",
+        "/assets/icons/github/github-96x96.png": b"png-96",
+    }
+    Handler.requests = []
+    Handler.delay = 0.0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def new_client(url_root: str, **kwargs) -> IconClient:
+    shutil.rmtree(dir_cache, ignore_errors=True)
+    return IconClient(url_root=url_root, dir_cache=dir_cache, **kwargs)
+
+
+def test_disk_lru_cache():
+    shutil.rmtree(dir_cache, ignore_errors=True)
+    cache = DiskLRUCache(dir_cache=dir_cache, max_bytes=10)
+    cache.put("a", "url-a", b"aaaa", etag='"a"')
+    cache.put("b", "url-b", b"bbbb", etag=None)
+    assert cache.read("a") == b"aaaa"
+    # "b" is the least recently used
+    cache.put("c", "url-c", b"cccc", etag=None)
+    assert cache.read("b") is None
+    assert cache.total_bytes == 8
+
+    # the cache survives a restart
+    cache = DiskLRUCache(dir_cache=dir_cache, max_bytes=10)
+    assert len(cache) == 2
+    assert cache.get_entry("a").etag == '"a"'
+    assert cache.read("c") == b"cccc"
+
+
+def test_get_icon(server):
+    client = new_client(server, max_age=0)
+    assert client.get_icon("github") == b"<svg>github</svg>"
+    assert client.get_icon("github", size=96) == b"png-96"
+    # revalidated with the ETag
+    assert client.get_icon("github") == b"<svg>github</svg>"
+    assert [status for _, status in Handler.requests] == [200, 200, 304]
+
+    # the icon changed
+    Handler.files["/assets/icons/github/github.svg"] = b"<svg>new</svg>"
+    assert client.get_icon("github") == b"<svg>new</svg>"
+
+    with pytest.raises(requests.HTTPError):
+        client.get_icon("not-exists")
+    client.close()
+
+
+def test_get_icon_fresh(server):
+    client = new_client(server, max_age=60)
+    assert client.get_icon("github") == b"<svg>github</svg>"
+    assert client.get_icon("github") == b"<svg>github</svg>"
+    assert len(Handler.requests) == 1
+
+
+def test_get_icon_stale_if_error(server):
+    client = new_client(server, max_age=0, timeout=1)
+    assert client.get_icon("github") == b"<svg>github</svg>"
+    client.url_root = "http://127.0.0.1:1"
+    with pytest.raises(requests.ConnectionError):
+        client.get_icon("github", size=96)
+    # the revalidation times out, the cached icon is returned
+    client.url_root = server
+    Handler.files.clear()
+    Handler.delay = 2
+    assert client.get_icon("github") == b"<svg>github</svg>"
+
+
+def test_get_icon_coalescing(server):
+    client = new_client(server, max_age=60)
+    Handler.delay = 0.3
+    results = list()
+    threads = [
+        threading.Thread(target=lambda: results.append(client.get_icon("github")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [b"<svg>github</svg>"] * 8
+    assert len(Handler.requests) == 1
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.client",
+        preview=False,
+    )
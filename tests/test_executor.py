@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+from my_icon_vault.executor import WorkerPoolExecutor, parallel_map
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def get_pid(x: int) -> int:
+    return os.getpid()
+
+
+def divide(x: int, y: int) -> float:
+    return x / y
+
+
+def is_imported(module: str) -> bool:
+    return module in sys.modules
+
+
+class TestWorkerPoolExecutor:
+    def test_get_chunk_size(self):
+        executor = WorkerPoolExecutor(n_jobs=4, preload_modules=())
+        assert executor.get_chunk_size(1) == 1
+        assert executor.get_chunk_size(1000) == 63
+        executor = WorkerPoolExecutor(n_jobs=4, chunk_size=10, preload_modules=())
+        assert executor.get_chunk_size(1000) == 10
+
+    def test_map(self):
+        with WorkerPoolExecutor(n_jobs=2, preload_modules=("json",)) as executor:
+            assert executor.map(square, []) == []
+            tasks = [{"x": x} for x in range(20)]
+            assert executor.map(square, tasks) == [x * x for x in range(20)]
+
+            # the workers are reused across map calls with different functions
+            pids_1 = set(executor.map(get_pid, tasks))
+            pids_2 = set(executor.map(get_pid, tasks))
+            assert os.getpid() not in pids_1
+            assert pids_1 == pids_2
+
+            assert all(executor.map(is_imported, [{"module": "json"}]))
+
+            # single tasks run on the same workers
+            assert executor.submit(square, 3).result() == 9
+            assert executor.submit(get_pid, 0).result() in pids_1
+            with pytest.raises(ZeroDivisionError):
+                executor.submit(divide, 1, 0).result()
+        assert executor._pool is None
+
+    def test_start(self):
+        with WorkerPoolExecutor(n_jobs=2, preload_modules=()) as executor:
+            executor.start()
+            pids = set(executor.map(get_pid, [{"x": x} for x in range(20)]))
+            executor.start()
+            assert set(executor.map(get_pid, [{"x": x} for x in range(20)])) == pids
+
+    def test_parallel_map(self):
+        tasks = [{"x": x} for x in range(5)]
+        assert parallel_map(square, tasks) == [0, 1, 4, 9, 16]
+        with WorkerPoolExecutor(n_jobs=2, preload_modules=()) as executor:
+            assert parallel_map(square, tasks, executor=executor) == [0, 1, 4, 9, 16]
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.executor",
+        preview=False,
+    )
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from my_icon_vault.manifest import (
+    get_file_sha256,
+    get_files_sha256,
+    StageRecord,
+    BuildManifest,
+)
+from my_icon_vault.paths import path_test_svg, dir_tmp
+
+
+def test_build_manifest():
+    path = dir_tmp / "test-build-manifest.json"
+    path.unlink(missing_ok=True)
+
+    manifest = BuildManifest.load(path)
+    assert manifest.stages == {}
+
+    record = StageRecord(
+        input_hash=get_file_sha256(path_test_svg),
+        params={"quality_range": (25, 50)},
+        tool_version="1.0.0",
+    )
+    assert manifest.is_up_to_date("compress_png", "microsoft", record) is False
+    manifest.update("compress_png", "microsoft", record)
+    manifest.update("compress_png", "github", record)
+    manifest.dump()
+
+    manifest = BuildManifest.load(path)
+    # tuple params are normalized, so a fresh record equals the loaded one
+    assert manifest.is_up_to_date("compress_png", "microsoft", record) is True
+    changed = StageRecord(
+        input_hash=record.input_hash,
+        params={"quality_range": (50, 75)},
+        tool_version="1.0.0",
+    )
+    assert manifest.is_up_to_date("compress_png", "microsoft", changed) is False
+
+    manifest.prune(["microsoft"])
+    assert manifest.get("compress_png", "github") is None
+
+    manifest.remove("compress_png", "microsoft")
+    assert manifest.get("compress_png", "microsoft") is None
+    # removing a missing record is a no-op
+    manifest.remove("build_png", "microsoft")
+
+
+def test_get_files_sha256():
+    path_a = dir_tmp / "test-files-sha256-a.txt"
+    path_b = dir_tmp / "test-files-sha256-b.txt"
+    path_a.write_text("a")
+    path_b.unlink(missing_ok=True)
+    digest = get_files_sha256([path_a, path_b])
+    # a missing file is part of the digest
+    assert digest != get_files_sha256([path_a])
+    path_b.write_text("b")
+    assert get_files_sha256([path_a, path_b]) != digest
+    digest = get_files_sha256([path_a, path_b])
+    assert get_files_sha256([path_a, path_b]) == digest
+    path_b.write_text("c")
+    assert get_files_sha256([path_a, path_b]) != digest
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.manifest",
+        preview=False,
+    )
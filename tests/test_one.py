@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+from pathlib import Path
+
+from my_icon_vault.constants import size_list, BuildStageEnum
+from my_icon_vault.manifest import BuildManifest
+from my_icon_vault.quantize import QuantizeBackendEnum
+from my_icon_vault.structure import IconAsset
+from my_icon_vault.one import One
+from my_icon_vault.paths import path_test_svg, dir_tmp
+
+
+def new_one(name: str) -> One:
+    """
+    Create a :class:`One` with a single asset and a manifest under ``tmp/``.
+    """
+    dir_root = dir_tmp / "test-one" / name
+    shutil.rmtree(dir_root, ignore_errors=True)
+    asset = IconAsset(name=name)
+    asset.dir_asset = dir_root / name
+    asset.dir_asset.mkdir(parents=True)
+    shutil.copy(path_test_svg, asset.path_svg)
+    one = One()
+    one.icon_assets = [asset]
+    one.manifest = BuildManifest(path=dir_root / "build-manifest.json")
+    return one
+
+
+def touch(paths: list[Path]):
+    for path in paths:
+        path.write_bytes(b"png")
+
+
+def test_plan():
+    one = new_one("test-plan")
+    asset = one.icon_assets[0]
+    stage = BuildStageEnum.generate_png
+    touch(asset.get_stage_outputs(stage))
+
+    # nothing recorded yet
+    assert one.plan(stage).todo == [asset]
+    one._commit(one.plan(stage))
+
+    # unchanged input, params and outputs
+    plan = one.plan(stage)
+    assert (plan.todo, plan.skipped) == ([], [asset])
+    assert one.is_up_to_date(stage, asset)
+
+    # changed params
+    assert one.plan(stage, downsample=True).todo == [asset]
+
+    # a missing output
+    asset.get_stage_outputs(stage)[-1].unlink()
+    assert one.plan(stage).todo == [asset]
+    touch(asset.get_stage_outputs(stage))
+    assert one.plan(stage).skipped == [asset]
+
+    # changed input
+    asset.path_svg.write_text(asset.path_svg.read_text() + "\n")
+    assert one.plan(stage).todo == [asset]
+    one._commit(one.plan(stage))
+    assert one.plan(stage).skipped == [asset]
+
+    # force
+    plan = one.plan(stage, force=True)
+    assert (plan.todo, plan.skipped) == ([asset], [])
+
+
+def test_shared_png_outputs():
+    one = new_one("test-shared-png-outputs")
+    asset = one.icon_assets[0]
+    compress_png, build_png = BuildStageEnum.compress_png, BuildStageEnum.build_png
+    backend = QuantizeBackendEnum.pillow.value
+    touch([asset.get_path_png(size, size) for size in size_list])
+
+    one._record(compress_png, asset, backend=backend)
+    assert one.is_up_to_date(compress_png, asset, backend=backend)
+
+    # build_png overwrites the final PNG files of compress_png
+    one._record(build_png, asset, downsample=True, backend=backend)
+    assert one.is_up_to_date(build_png, asset, downsample=True, backend=backend)
+    assert not one.is_up_to_date(compress_png, asset, backend=backend)
+
+    # and the other way round
+    one._record(compress_png, asset, backend=backend)
+    assert one.is_up_to_date(compress_png, asset, backend=backend)
+    assert not one.is_up_to_date(build_png, asset, downsample=True, backend=backend)
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.one",
+        preview=False,
+    )
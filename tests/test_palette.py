@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+
+from PIL import Image
+
+from my_icon_vault.palette import paste_composite, SharedPaletteCmd
+from my_icon_vault.pngquant_wrapper import PngQuantCmd
+from my_icon_vault.paths import path_test_png, dir_tmp, path_bin_pngquant
+
+
+def test_paste_composite():
+    images = [
+        Image.new("RGBA", (8, 8), (255, 0, 0, 255)),
+        Image.new("RGBA", (4, 4), (0, 0, 255, 255)),
+    ]
+    composite, boxes = paste_composite(images)
+    assert composite.size == (8, 12)
+    assert boxes == [(0, 0, 8, 8), (0, 8, 4, 12)]
+    assert composite.getpixel((0, 8)) == (0, 0, 255, 255)
+    # the padding is transparent
+    assert composite.getpixel((7, 11)) == (0, 0, 0, 0)
+
+
+def new_cmds(dir_out, sizes=(128, 64, 32)) -> list[PngQuantCmd]:
+    cmds = list()
+    with Image.open(path_test_png) as image:
+        image = image.convert("RGBA")
+        for size in sizes:
+            path_in = dir_out / f"{path_test_png.stem}-{size}.png"
+            image.resize((size, size), Image.Resampling.LANCZOS).save(path_in)
+            cmds.append(
+                PngQuantCmd(
+                    path_bin=path_bin_pngquant,
+                    path_in=path_in,
+                    path_out=dir_out / f"{path_test_png.stem}-{size}-out.png",
+                    quality_range=(25, 50),
+                    backend="pillow",
+                )
+            )
+    return cmds
+
+
+def test_shared_palette_cmd():
+    dir_out = dir_tmp / "shared_palette"
+    shutil.rmtree(dir_out, ignore_errors=True)
+    dir_out.mkdir(parents=True)
+
+    cmds = new_cmds(dir_out, sizes=(128, 64))
+    cmd = SharedPaletteCmd(path_in=None, path_out=None, cmds=cmds)
+    params = cmd.to_params()
+    assert params["shared_palette"] == {"max_quality_drop": 20}
+    assert params["pngquant"] == [c.to_params() for c in cmds]
+    assert "shared palette" in cmd.get_tool_version()
+
+    result = cmd.run(verbose=True)
+    assert result.is_succeeded
+    assert cmd._fallback_cmds == []
+    assert result.bytes_out == sum(c.path_out.stat().st_size for c in cmds)
+    palettes = list()
+    for c in cmds:
+        with Image.open(c.path_out) as image:
+            assert image.mode == "P"
+            assert image.size == Image.open(c.path_in).size
+            palettes.append(image.getpalette())
+    # all sizes share the same palette
+    assert palettes[0] == palettes[1]
+
+    # a size that is too far below the largest one gets its own palette
+    cmds = new_cmds(dir_out)
+    cmd = SharedPaletteCmd(
+        path_in=None, path_out=None, cmds=cmds, max_quality_drop=0
+    )
+    results = SharedPaletteCmd.parallel_run([cmd])
+    assert results[0].is_succeeded
+    for c in cmds:
+        assert c.path_out.exists()
+
+    # a composite below the minimum quality gives every size its own palette
+    cmds = new_cmds(dir_out, sizes=(128, 64))
+    Image.new("RGBA", (128, 128), (255, 0, 0, 255)).save(cmds[0].path_in)
+    cmds[0].quality_range, cmds[0].ncolors = (90, 100), 2
+    cmds[1].quality_range = (0, 100)
+    cmd = SharedPaletteCmd(path_in=None, path_out=None, cmds=cmds)
+    assert cmd.run(verbose=True).is_succeeded
+    assert cmd._fallback_cmds == cmds
+    with Image.open(cmds[0].path_out) as image:
+        assert image.convert("RGBA").getpixel((0, 0)) == (255, 0, 0, 255)
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.palette",
+        preview=False,
+    )
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import shutil
+
 from my_icon_vault.pngquant_wrapper import PngQuantCmd
 from my_icon_vault.paths import path_test_png, dir_tmp, path_bin_pngquant
 
@@ -15,7 +17,46 @@ def test_run():
         path_out=path_png,
         quality_range=(50, 75),
     )
-    cmd.run(verbose=True)
+    result = cmd.run(verbose=True)
+    assert result.is_succeeded
+    assert result.bytes_out == path_png.stat().st_size
+
+
+def test_batch_run():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    dir_out = dir_tmp / "pngquant_batch"
+    shutil.rmtree(dir_out, ignore_errors=True)
+    dir_out.mkdir()
+    cmds = list()
+    for i in range(3):
+        path_in = dir_tmp / f"{path_test_png.stem}-batch-{i}.png"
+        shutil.copyfile(path_test_png, path_in)
+        cmds.append(
+            PngQuantCmd(
+                path_bin=path_bin_pngquant,
+                path_in=path_in,
+                path_out=dir_out / path_in.name,
+                quality_range=(50, 75),
+            )
+        )
+    assert PngQuantCmd.to_batch_args(cmds)[-3:] == [str(cmd.path_in) for cmd in cmds]
+    results = PngQuantCmd.batch_run(cmds, verbose=True)
+    assert all(result.bytes_out > 0 for result in results)
+    for cmd in cmds:
+        assert cmd.path_out.exists()
+        assert cmd._batch_output().exists() is False
+
+
+def test_quantize_bytes():
+    cmd = PngQuantCmd(
+        path_bin=path_bin_pngquant,
+        path_in=None,
+        path_out=None,
+        quality_range=(50, 75),
+    )
+    assert cmd.to_stdio_args()[-1] == "-"
+    data = cmd.quantize_bytes(path_test_png.read_bytes())
+    assert data.startswith(b"\x89PNG")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import shutil
+import pstats
+import tracemalloc
+from pathlib import Path
+
+from my_icon_vault.executor import WorkerPoolExecutor
+from my_icon_vault.profiler import (
+    profile_block,
+    merge_profiles,
+    read_memory_records,
+    print_summary,
+)
+from my_icon_vault.paths import dir_tmp
+
+dir_profile = dir_tmp / "test_profiler"
+
+
+def square(x: int) -> int:
+    return x * x
+
+
+def allocate(n: int) -> int:
+    return len(bytearray(n))
+
+
+def work(n: int, profile_dir: Path) -> int:
+    with profile_block(profile_dir, label=f"allocate {n}"):
+        return allocate(n)
+
+
+def test_profile_block():
+    with profile_block(None, label="noop"):
+        pass
+
+    shutil.rmtree(dir_profile, ignore_errors=True)
+    with profile_block(dir_profile, label="main"):
+        allocate(1_000_000)
+    with WorkerPoolExecutor(n_jobs=2, preload_modules=()) as executor:
+        tasks = [{"n": n, "profile_dir": dir_profile} for n in [10_000, 5_000_000]]
+        executor.map(work, tasks)
+
+    records = read_memory_records(dir_profile)
+    assert len(records) == 3
+    # the block with the biggest allocation comes first
+    assert records[0]["label"] == "allocate 5000000"
+    assert records[0]["peak_memory"] >= 5_000_000
+
+    path_merged = merge_profiles(dir_profile)
+    stats = pstats.Stats(str(path_merged))
+    assert any(func[2] == "allocate" for func in stats.stats)
+    print_summary(dir_profile, top_n=3)
+
+
+def get_profiling_state(x: int) -> tuple[bool, bool]:
+    return tracemalloc.is_tracing(), sys.getprofile() is not None
+
+
+def test_workers_forked_in_profile_block():
+    dir_stage = dir_profile / "stage"
+    with WorkerPoolExecutor(n_jobs=2, preload_modules=()) as executor:
+        # the pool forks its workers inside the profiled stage
+        with profile_block(dir_stage, label="stage"):
+            executor.map(square, [{"x": x} for x in range(4)])
+        assert tracemalloc.is_tracing() is False
+        states = executor.map(get_profiling_state, [{"x": x} for x in range(4)])
+    assert set(states) == {(False, False)}
+
+
+def test_merge_profiles_empty():
+    dir_empty = dir_tmp / "test_profiler_empty"
+    dir_empty.mkdir(parents=True, exist_ok=True)
+    assert merge_profiles(dir_empty) is None
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.profiler",
+        preview=False,
+    )
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+from s3pathlib import S3Path
+
+from my_icon_vault.publish import (
+    guess_content_type,
+    get_content_hash,
+    to_content_addressed_s3path,
+    is_content_addressed_key,
+    to_url,
+)
+from my_icon_vault.paths import path_test_svg, path_test_png
+
+
+def test_guess_content_type():
+    assert guess_content_type(path_test_svg) == "image/svg+xml"
+    assert guess_content_type(path_test_png) == "image/png"
+
+
+def test_to_content_addressed_s3path():
+    content_hash = get_content_hash(path_test_svg)
+    assert len(content_hash) == 12
+    s3dir_root = S3Path("s3://bucket/projects/my_icon_vault/")
+    s3path = s3dir_root.joinpath("assets", "icons", "github", "github-96x96.png")
+    s3path = to_content_addressed_s3path(s3path, content_hash)
+    assert s3path.basename == f"github-96x96.{content_hash}.png"
+    assert is_content_addressed_key(s3path.key) is True
+    assert is_content_addressed_key("assets/icons/github/github-96x96.png") is False
+    assert is_content_addressed_key("assets/icons/github.svg/github.svg") is False
+    assert to_url(s3path, s3dir_root) == (
+        f"assets/icons/github/github-96x96.{content_hash}.png"
+    )
+    assert to_url(s3path, s3dir_root, "https://cdn.example.com/") == (
+        f"https://cdn.example.com/assets/icons/github/github-96x96.{content_hash}.png"
+    )
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.publish",
+        preview=False,
+    )
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+import io
+import shutil
+
+import pytest
+from PIL import Image
+
+from my_icon_vault.quantize import (
+    QualityTooLowError,
+    quality_to_mse,
+    mse_to_quality,
+    get_mse,
+    PillowQuantizer,
+)
+from my_icon_vault.pngquant_wrapper import PngQuantCmd
+from my_icon_vault.base import BatchRunError
+from my_icon_vault.paths import path_test_png, dir_tmp, path_bin_pngquant
+
+
+def new_gradient_png(size: int = 64) -> bytes:
+    image = Image.new("RGBA", (size, size))
+    image.putdata(
+        [
+            (x * 255 // size, y * 255 // size, 128, 255)
+            for y in range(size)
+            for x in range(size)
+        ]
+    )
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_quality_to_mse():
+    assert quality_to_mse(100) == 0.0
+    assert quality_to_mse(0) == float("inf")
+    assert quality_to_mse(50) > quality_to_mse(80) > quality_to_mse(95)
+    for quality in [10, 50, 80, 95]:
+        assert mse_to_quality(quality_to_mse(quality)) == quality
+    assert mse_to_quality(0.0) == 100
+    assert mse_to_quality(1.0) == 0
+
+
+def test_get_mse():
+    red = Image.new("RGBA", (4, 4), (255, 0, 0, 255))
+    assert get_mse(red, red) == 0.0
+    # the color of fully transparent pixels doesn't count
+    transparent_red = Image.new("RGBA", (4, 4), (255, 0, 0, 0))
+    transparent_blue = Image.new("RGBA", (4, 4), (0, 0, 255, 0))
+    assert get_mse(transparent_red, transparent_blue) == 0.0
+
+
+def test_pillow_quantizer():
+    data = path_test_png.read_bytes()
+    png = PillowQuantizer(quality_range=(25, 50)).quantize_bytes(data)
+    with Image.open(io.BytesIO(png)) as image:
+        assert image.mode == "P"
+        assert image.size == Image.open(path_test_png).size
+    assert len(png) < len(data)
+
+    # a higher maximum quality needs at least as many colors
+    data = new_gradient_png()
+    n_colors = list()
+    for quality_range in [(0, 30), (0, 90)]:
+        quantizer = PillowQuantizer(quality_range=quality_range, speed=1)
+        with Image.open(io.BytesIO(quantizer.quantize_bytes(data))) as image:
+            n_colors.append(len(image.getcolors(256)))
+    assert n_colors[0] <= n_colors[1]
+
+    quantizer = PillowQuantizer(quality_range=(100, 100), ncolors=2)
+    with pytest.raises(QualityTooLowError) as exc_info:
+        quantizer.quantize_bytes(data)
+    assert exc_info.value.returncode == 99
+
+
+def test_pngquant_cmd_pillow_backend():
+    dir_out = dir_tmp / "quantize_pillow"
+    shutil.rmtree(dir_out, ignore_errors=True)
+    dir_out.mkdir(parents=True)
+    cmd = PngQuantCmd(
+        path_bin=path_bin_pngquant,
+        path_in=path_test_png,
+        path_out=dir_out / path_test_png.name,
+        quality_range=(25, 50),
+        backend="pillow",
+    )
+    assert "backend" in cmd.to_params()
+    assert "pillow" in cmd.get_tool_version()
+    result = cmd.run()
+    assert result.is_succeeded
+    assert result.bytes_out == cmd.path_out.stat().st_size
+
+    cmds = list()
+    for i in range(3):
+        path_in = dir_out / f"{path_test_png.stem}-{i}.png"
+        shutil.copyfile(path_test_png, path_in)
+        cmds.append(
+            PngQuantCmd(
+                path_bin=path_bin_pngquant,
+                path_in=path_in,
+                path_out=dir_out / f"{path_test_png.stem}-{i}-out.png",
+                quality_range=(100, 100),
+                ncolors=2,
+                backend="pillow",
+            )
+        )
+    failures = PngQuantCmd._batch_run(cmds)
+    assert set(failures) == {cmd.path_in for cmd in cmds}
+    assert all(returncode == 99 for returncode, _ in failures.values())
+
+    # any other error only fails its own file
+    for cmd in cmds:
+        cmd.quality_range, cmd.ncolors = (25, 50), None
+    cmds[1].path_in.write_bytes(b"not a png")
+    with pytest.raises(BatchRunError) as e:
+        PngQuantCmd.batch_run(cmds)
+    assert list(e.value.failures) == [cmds[1].path_in]
+    assert "UnidentifiedImageError" in e.value.failures[cmds[1].path_in]
+    assert [result.is_succeeded for result in e.value.results] == [True, False, True]
+
+    # the default backend keeps the params of existing build manifests
+    cmd = PngQuantCmd(path_bin=path_bin_pngquant, path_in=path_test_png, path_out=None)
+    assert "backend" not in cmd.to_params()
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.quantize",
+        preview=False,
+    )
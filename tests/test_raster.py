@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from my_icon_vault.raster import (
+    premultiply,
+    unpremultiply,
+    area_downsample,
+    psnr,
+    ssim,
+)
+
+
+def test_premultiply():
+    rgba = np.array([[[255, 128, 0, 128], [10, 20, 30, 0]]], dtype=np.uint8)
+    premul = premultiply(rgba)
+    assert premul[0, 0].tolist() == [128, 64, 0, 128]
+    assert premul[0, 1].tolist() == [0, 0, 0, 0]
+    straight = unpremultiply(premul)
+    assert straight[0, 0].tolist() == [255, 128, 0, 128]
+    assert straight[0, 1].tolist() == [0, 0, 0, 0]
+
+
+def test_area_downsample():
+    # integer ratio, every output pixel is the mean of a 2x2 block
+    arr = np.arange(4 * 4 * 4, dtype=np.uint8).reshape(4, 4, 4)
+    out = area_downsample(arr, 2, 2)
+    assert out.shape == (2, 2, 4)
+    expected = arr[:2, :2].astype(float).mean(axis=(0, 1))
+    assert np.allclose(out[0, 0], np.rint(expected))
+
+    # non integer ratio keeps a solid color solid
+    arr = np.full((512, 512, 4), 200, dtype=np.uint8)
+    out = area_downsample(arr, 96, 96)
+    assert out.shape == (96, 96, 4)
+    assert (out == 200).all()
+
+    # straight alpha: the color of transparent pixels must not bleed in
+    arr = np.zeros((2, 2, 4), dtype=np.uint8)
+    arr[0, 0] = [255, 0, 0, 255]
+    arr[1, 1] = [0, 255, 0, 0]
+    out = area_downsample(arr, 1, 1, premultiplied=False)
+    assert out[0, 0].tolist() == [255, 0, 0, 64]
+
+
+def test_psnr():
+    a = np.zeros((8, 8, 4), dtype=np.uint8)
+    assert psnr(a, a) == float("inf")
+    b = a.copy()
+    b[0, 0, 0] = 255
+    assert round(psnr(a, b), 2) == 24.08
+
+
+def test_ssim():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 256, size=(32, 32, 4), dtype=np.uint8)
+    assert ssim(a, a) == 1.0
+    noisy = np.clip(a + rng.normal(0, 20, a.shape), 0, 255).astype(np.uint8)
+    very_noisy = np.clip(a + rng.normal(0, 60, a.shape), 0, 255).astype(np.uint8)
+    assert 1.0 > ssim(a, noisy) > ssim(a, very_noisy)
+    # the window shrinks to fit a small image
+    assert ssim(a[:3, :3], a[:3, :3]) == 1.0
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.raster",
+        preview=False,
+    )
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from my_icon_vault.cairosvg_wrapper import PngTarget
+from my_icon_vault.render_quantize import RenderQuantizeCmd
+from my_icon_vault.paths import path_test_svg, dir_tmp, path_bin_pngquant
+
+
+def test_run():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    targets = list()
+    for size in [32, 64]:
+        path_png = dir_tmp / f"{path_test_svg.stem}-quantized-{size}x{size}.png"
+        path_png.unlink(missing_ok=True)
+        targets.append(PngTarget(path_png, size, size))
+
+    cmd = RenderQuantizeCmd(
+        path_in=path_test_svg,
+        path_out=None,
+        targets=targets,
+        path_bin=path_bin_pngquant,
+        quality_range=(50, 75),
+    )
+    cmd.run(verbose=True)
+    for target in targets:
+        assert target.path_out.exists()
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.render_quantize",
+        preview=False,
+    )
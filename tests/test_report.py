@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+
+from my_icon_vault.base import CmdResult
+from my_icon_vault.report import percentile, RunReport
+from my_icon_vault.paths import dir_tmp
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([4.0, 1.0, 3.0, 2.0], 100) == 4.0
+
+
+class TestRunReport:
+    def test_to_dict(self):
+        results = [
+            CmdResult(
+                path_in=Path(f"{i}.png"),
+                wall_time=i / 10,
+                cpu_time=i / 20,
+                bytes_in=1000,
+                bytes_out=100 * i,
+            )
+            for i in range(1, 6)
+        ]
+        results.append(
+            CmdResult(
+                path_in=Path("bad.png"),
+                bytes_in=1000,
+                returncode=99,
+                stderr="quality too low",
+            )
+        )
+        report = RunReport(stage="compress_png", results=results, elapsed=1.0, top_n=2)
+        data = report.to_dict()
+        assert data["totals"]["count"] == 6
+        assert data["totals"]["succeeded"] == 5
+        assert data["totals"]["failed"] == 1
+        assert data["totals"]["bytes_in"] == 5000
+        assert data["totals"]["bytes_out"] == 1500
+        assert data["totals"]["compression_ratio"] == 0.3
+        assert data["wall_time_percentiles"]["max"] == 0.5
+        assert [d["path_in"] for d in data["slowest"]] == ["5.png", "4.png"]
+        assert [d["path_in"] for d in data["least_compressible"]] == ["5.png", "4.png"]
+        assert data["failures"][0]["returncode"] == 99
+
+        path = dir_tmp / "reports" / "test_report.json"
+        report.dump(path)
+        assert json.loads(path.read_text())["stage"] == "compress_png"
+        report.print_summary()
+
+    def test_empty(self):
+        report = RunReport(stage="compress_svg")
+        assert report.to_dict()["totals"]["compression_ratio"] is None
+        report.print_summary()
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.report",
+        preview=False,
+    )
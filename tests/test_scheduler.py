@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import threading
+import multiprocessing
+
+from my_icon_vault.executor import WorkerPoolExecutor
+from my_icon_vault.scheduler import Stage, PipelineScheduler
+
+
+def square(x: int) -> int:
+    if x == 3:
+        raise ValueError("bad item")
+    return x * x
+
+
+def get_pid(x: int) -> int:
+    return os.getpid()
+
+
+def test_run():
+    events = list()
+
+    def slow_if_one(x: int):
+        # item 1 is slow, it must not stall the other items
+        if x == 1:
+            time.sleep(0.3)
+
+    scheduler = PipelineScheduler(
+        stages=[
+            Stage(name="first", func=slow_if_one, concurrency=2),
+            Stage(
+                name="second",
+                func=square,
+                concurrency=2,
+                is_up_to_date=lambda x: x == 4,
+            ),
+            Stage(
+                name="third",
+                func=get_pid,
+                concurrency=2,
+                use_process=True,
+                on_done=lambda x: events.append(x),
+            ),
+        ],
+        max_in_flight=3,
+    )
+    result = scheduler.run(range(1, 7), verbose=True)
+    assert sorted(result.completed) == [1, 2, 4, 5, 6]
+    assert result.completed[-1] == 1
+    assert result.failed[3][0] == "second"
+    assert result.skipped == {"first": [], "second": [4], "third": []}
+    assert sorted(result.results["second"]) == [1, 4, 25, 36]
+    assert result.results["first"] == [None] * 6
+    assert sorted(events) == [1, 2, 4, 5, 6]
+
+
+def test_run_shared_pools():
+    lock = threading.Lock()
+    n_running, max_running, n_children = 0, 0, set()
+
+    def count_running(x: int):
+        nonlocal n_running, max_running
+        # the process pool is forked before the first thread stage starts
+        n_children.add(len(multiprocessing.active_children()))
+        with lock:
+            n_running += 1
+            max_running = max(max_running, n_running)
+        time.sleep(0.02)
+        with lock:
+            n_running -= 1
+
+    with WorkerPoolExecutor(n_jobs=2, preload_modules=()) as executor:
+        executor.start()
+        pids = set(executor.map(get_pid, [{"x": x} for x in range(20)]))
+        scheduler = PipelineScheduler(
+            stages=[
+                Stage(name="count", func=count_running, concurrency=2),
+                Stage(name="render", func=get_pid, concurrency=2, use_process=True),
+                Stage(name="quantize", func=get_pid, concurrency=1, use_process=True),
+                Stage(name="shared", func=get_pid, concurrency=1, executor=executor),
+            ],
+        )
+        result = scheduler.run(range(10))
+        assert executor.submit(get_pid, 0).result() in pids
+    assert sorted(result.completed) == list(range(10))
+    assert max_running == 2
+    # the two process stages share one pool, the executor workers stay alive
+    assert n_children == {2 + 3}
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.scheduler",
+        preview=False,
+    )
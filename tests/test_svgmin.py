@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+import shutil
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from my_icon_vault.svgmin import (
+    format_number,
+    round_numbers,
+    shorten_color,
+    parse_path,
+    minify_path,
+    SvgMinifier,
+)
+from my_icon_vault.svgo_wrapper import SvgoCmd
+from my_icon_vault.base import BatchRunError
+from my_icon_vault.paths import path_test_svg, dir_tmp, path_bin_svgo
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<!-- Generator: an editor -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:xlink="http://www.w3.org/1999/xlink"
+     xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     viewBox="0, 0, 24.0001, 24" inkscape:version="1.3">
+  <metadata><title>icon</title></metadata>
+  <sodipodi:namedview id="namedview" pagecolor="#ffffff"/>
+  <g>
+    <g fill="#FF0000" transform="translate(1, 2)">
+      <rect x="1.04" y="2.96" width="10" height="10"/>
+    </g>
+  </g>
+  <g></g>
+  <path d="M 10.000 10.000 L 20.500 10.000 L 20.500 20.500 Z" stroke="rgb(0, 0, 255)"/>
+  <use xlink:href="#a"/>
+  <text x="1"> keep <tspan>this</tspan> </text>
+</svg>
+"""
+
+
+def test_format_number():
+    assert format_number(0.5, 3) == ".5"
+    assert format_number(-0.5, 3) == "-.5"
+    assert format_number(-0.0001, 3) == "0"
+    assert format_number(100.0, 0) == "100"
+    assert format_number(1.23456, 2) == "1.23"
+    assert round_numbers("0, 0, 24.0001, 24", 3) == "0 0 24 24"
+    transform = round_numbers("translate( 1.5 , 2 ) scale(2)", 3)
+    assert transform == "translate(1.5 2)scale(2)"
+
+
+def test_shorten_color():
+    assert shorten_color("#FFFFFF") == "#fff"
+    assert shorten_color("white") == "#fff"
+    assert shorten_color("#ff0000") == "red"
+    assert shorten_color("rgb(0, 0, 255)") == "#00f"
+    assert shorten_color("rgb(100%, 0%, 0%)") == "red"
+    assert shorten_color("#123456") == "#123456"
+    for value in ["none", "currentColor", "url(#gradient)"]:
+        assert shorten_color(value) == value
+
+
+def test_minify_path():
+    assert minify_path("M 10 10 L 20.5 10 L 20.5 20.5 Z", 3) == "m10 10 10.5 0 0 10.5z"
+    assert minify_path("M0 0 C 0.5 0.5 1 1 2 2", 3) == "m0 0c.5.5 1 1 2 2"
+    assert minify_path("M1 1 A 5 5 0 0 1 11 1", 3) == "m1 1a5 5 0 0 1 10 0"
+    assert minify_path("M1 1 h 10 v 10 H 1 z", 3) == "m1 1h10v10H1z"
+    # malformed path data is kept
+    assert minify_path("M 1 1 X 2", 3) == "M 1 1 X 2"
+    with pytest.raises(ValueError):
+        parse_path("M 1")
+
+    # the rounding errors don't add up along a relative path
+    d = "M0 0" + " l0.14 0.14" * 100
+    end = parse_path(minify_path(d, 1))[-1][1]
+    assert end == pytest.approx([14, 14], abs=0.05)
+
+
+def test_svg_minifier():
+    svg = SvgMinifier(precision=1).minify(SVG)
+    assert svg == (
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 24 24">'
+        '<rect x="1" y="3" width="10" height="10" fill="red" '
+        'transform="translate(1 2)"/>'
+        '<path d="m10 10 10.5 0 0 10.5z" stroke="#00f"/>'
+        '<use xlink:href="#a"/>'
+        '<text x="1"> keep <tspan>this</tspan> </text>'
+        "</svg>"
+    )
+    # the output is stable
+    assert SvgMinifier(precision=1).minify(svg) == svg
+
+    # groups are kept if a style sheet may select them
+    svg = SvgMinifier().minify(
+        '<svg xmlns="http://www.w3.org/2000/svg"><style>g{fill:red}</style>'
+        "<g><rect/></g></svg>"
+    )
+    assert "<g><rect/></g>" in svg
+
+    with pytest.raises(ET.ParseError):
+        SvgMinifier().minify("<svg>")
+
+
+def test_svgo_cmd_svgmin_backend():
+    dir_out = dir_tmp / "svgmin"
+    shutil.rmtree(dir_out, ignore_errors=True)
+    dir_out.mkdir(parents=True)
+    cmd = SvgoCmd(
+        path_bin=path_bin_svgo,
+        path_in=path_test_svg,
+        path_out=dir_out / path_test_svg.name,
+        precision=1,
+        backend="svgmin",
+    )
+    assert "backend" in cmd.to_params()
+    assert cmd.get_tool_version().startswith("svgmin")
+    result = cmd.run()
+    assert result.is_succeeded
+    assert 0 < result.bytes_out <= path_test_svg.stat().st_size
+
+    cmds = list()
+    for i in range(3):
+        path_in = dir_out / f"{path_test_svg.stem}-{i}.svg"
+        shutil.copyfile(path_test_svg, path_in)
+        cmds.append(
+            SvgoCmd(
+                path_bin=path_bin_svgo,
+                path_in=path_in,
+                path_out=path_in,
+                precision=1,
+                backend="svgmin",
+            )
+        )
+    cmds[1].path_in.write_text("<svg>")
+    with pytest.raises(BatchRunError) as exc_info:
+        SvgoCmd.batch_run(cmds)
+    assert list(exc_info.value.failures) == [cmds[1].path_in]
+    assert len(exc_info.value.results) == 3
+
+    # any other error also fails only its own file
+    shutil.copyfile(path_test_svg, cmds[1].path_in)
+    cmds[2].path_in.unlink()
+    with pytest.raises(BatchRunError) as exc_info:
+        SvgoCmd.batch_run(cmds)
+    assert list(exc_info.value.failures) == [cmds[2].path_in]
+    assert "FileNotFoundError" in exc_info.value.failures[cmds[2].path_in]
+    assert len(exc_info.value.results) == 3
+    assert cmds[0].path_in.read_text() == cmd.path_out.read_text()
+
+    # the default backend keeps the params of existing build manifests
+    cmd = SvgoCmd(path_bin=path_bin_svgo, path_in=path_test_svg, path_out=None)
+    assert "backend" not in cmd.to_params()
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.svgmin",
+        preview=False,
+    )
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import pytest
+
+from my_icon_vault.base import BatchRunError
 from my_icon_vault.svgo_wrapper import SvgoCmd
 from my_icon_vault.paths import path_test_svg, dir_tmp, path_bin_svgo
 
@@ -17,7 +20,45 @@ def test_run():
         quite=True,
         multipass=True,
     )
-    cmd.run(verbose=True)
+    result = cmd.run(verbose=True)
+    assert result.is_succeeded
+    assert result.bytes_in == path_test_svg.stat().st_size
+    assert result.bytes_out == path_svg.stat().st_size
+
+
+def test_batch_run():
+    dir_tmp.mkdir(parents=True, exist_ok=True)
+    cmds = list()
+    for i in range(3):
+        path_svg = dir_tmp / f"{path_test_svg.stem}-batch-{i}.svg"
+        path_svg.unlink(missing_ok=True)
+        cmds.append(
+            SvgoCmd(
+                path_bin=path_bin_svgo,
+                path_in=path_test_svg,
+                path_out=path_svg,
+                precision=1,
+                quite=True,
+            )
+        )
+    args = SvgoCmd.to_batch_args(cmds)
+    assert args.count(str(path_test_svg)) == 3
+    results = SvgoCmd.batch_run(cmds, verbose=True)
+    assert [result.path_out for result in results] == [cmd.path_out for cmd in cmds]
+    for cmd in cmds:
+        assert cmd.path_out.exists()
+
+    # the broken file is attributed, the valid file is still optimized
+    path_bad = dir_tmp / "broken.svg"
+    path_bad.write_text("<svg", encoding="utf-8")
+    cmds = [
+        SvgoCmd(path_bin=path_bin_svgo, path_in=path_bad, path_out=path_bad),
+        SvgoCmd(path_bin=path_bin_svgo, path_in=path_test_svg, path_out=cmds[0].path_out),
+    ]
+    with pytest.raises(BatchRunError) as e:
+        SvgoCmd.batch_run(cmds)
+    assert list(e.value.failures) == [path_bad]
+    assert [result.is_succeeded for result in e.value.results] == [False, True]
 
 
 if __name__ == "__main__":
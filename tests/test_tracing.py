@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+from pathlib import Path
+
+from my_icon_vault.base import CmdResult
+from my_icon_vault.tracing import Span, assign_lanes, Tracer
+from my_icon_vault.scheduler import Stage, PipelineScheduler
+from my_icon_vault.paths import dir_tmp
+
+
+def sleep(item: int):
+    time.sleep(0.05)
+
+
+def test_assign_lanes():
+    spans = [
+        Span(name="a", cat="c", start=0.0, duration=2.0, pid=1),
+        Span(name="b", cat="c", start=1.0, duration=2.0, pid=1),
+        Span(name="c", cat="c", start=2.0, duration=1.0, pid=1),
+        Span(name="d", cat="c", start=0.0, duration=5.0, pid=2),
+        Span(name="stage", cat="c", start=0.0, duration=5.0, pid=1, tid=0),
+    ]
+    assign_lanes(spans)
+    assert [span.tid for span in spans] == [1, 2, 1, 1, 0]
+
+
+class TestTracer:
+    def test_to_dict(self):
+        tracer = Tracer()
+        with tracer.span("compress_png"):
+            start = time.time()
+            tracer.add_results(
+                "compress_png",
+                [
+                    CmdResult(
+                        path_in=Path("a.png"),
+                        wall_time=0.5,
+                        bytes_in=100,
+                        bytes_out=40,
+                        start_time=start,
+                        pid=1234,
+                    ),
+                    CmdResult(
+                        path_in=Path("b.png"),
+                        wall_time=0.5,
+                        start_time=start + 0.1,
+                        pid=1234,
+                    ),
+                    # a result that never ran has no span
+                    CmdResult(path_in=Path("c.png")),
+                ],
+            )
+        data = tracer.to_dict()
+        events = [event for event in data["traceEvents"] if event["ph"] == "X"]
+        assert [event["name"] for event in events] == [
+            "compress_png",
+            "a.png",
+            "b.png",
+        ]
+        assert events[0]["pid"] == os.getpid()
+        assert events[0]["tid"] == 0
+        assert [event["tid"] for event in events[1:]] == [1, 2]
+        assert events[1]["args"]["bytes_out"] == 40
+        assert events[1]["dur"] == 500000
+        names = {
+            event["args"]["name"]
+            for event in data["traceEvents"]
+            if event["name"] == "process_name"
+        }
+        assert names == {f"main {os.getpid()}", "worker 1234"}
+
+        path = dir_tmp / "traces" / "test_tracing.json"
+        tracer.dump(path)
+        assert len(json.loads(path.read_text())["traceEvents"]) == len(
+            data["traceEvents"]
+        )
+
+    def test_empty(self):
+        assert Tracer().to_dict()["traceEvents"] == []
+
+
+def test_pipeline_scheduler_tracer():
+    tracer = Tracer()
+    scheduler = PipelineScheduler(
+        stages=[
+            Stage(name="render", func=sleep, concurrency=2, use_process=True),
+            Stage(name="quantize", func=sleep, concurrency=2),
+        ],
+        tracer=tracer,
+    )
+    result = scheduler.run(range(4))
+    assert len(result.completed) == 4
+    assert sorted((span.cat, span.name) for span in tracer.spans) == sorted(
+        (stage, str(i)) for stage in ["render", "quantize"] for i in range(4)
+    )
+    render_pids = {span.pid for span in tracer.spans if span.cat == "render"}
+    assert os.getpid() not in render_pids
+    assert all(span.duration >= 0.05 for span in tracer.spans)
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.tracing",
+        preview=False,
+    )
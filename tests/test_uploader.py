@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+import moto
+from s3pathlib import S3Path
+
+from my_icon_vault.base import BatchRunError
+from my_icon_vault.uploader import new_s3_client, UploadTask, R2Uploader
+from my_icon_vault.paths import path_test_svg, path_test_png, dir_tmp
+
+bucket = "my-icon-vault-test"
+
+
+@pytest.fixture
+def s3_client():
+    with moto.mock_aws():
+        s3_client = new_s3_client(region_name="us-east-1", max_pool_connections=4)
+        s3_client.create_bucket(Bucket=bucket)
+        yield s3_client
+
+
+def test_upload(s3_client):
+    s3dir = S3Path(f"s3://{bucket}/icons/")
+    tasks = [
+        UploadTask(
+            path=path_test_svg,
+            s3path=s3dir.joinpath(path_test_svg.name),
+            content_type="image/svg+xml",
+        ),
+        UploadTask(
+            path=path_test_png,
+            s3path=s3dir.joinpath(path_test_png.name),
+        ),
+    ]
+    uploader = R2Uploader(s3_client=s3_client, max_workers=4)
+    results = uploader.upload(tasks, verbose=True)
+    assert [result.attempts for result in results] == [1, 1]
+
+    res = s3_client.get_object(Bucket=bucket, Key=f"icons/{path_test_svg.name}")
+    assert res["Body"].read() == path_test_svg.read_bytes()
+    assert res["ContentType"] == "image/svg+xml"
+
+
+def test_sync(s3_client):
+    s3dir = S3Path(f"s3://{bucket}/sync/")
+    tasks = [
+        UploadTask(path=path_test_svg, s3path=s3dir.joinpath(path_test_svg.name)),
+        UploadTask(path=path_test_png, s3path=s3dir.joinpath(path_test_png.name)),
+    ]
+    s3_client.put_object(Bucket=bucket, Key="sync/removed.svg", Body=b"<svg/>")
+    # an older content-addressed version, cached manifests may still use it
+    hashed_key = "sync/removed.0f1e2d3c4b5a.svg"
+    s3_client.put_object(Bucket=bucket, Key=hashed_key, Body=b"<svg/>")
+    uploader = R2Uploader(s3_client=s3_client, max_workers=4)
+
+    result = uploader.sync(tasks[:1], s3dir)
+    assert len(result.uploaded) == 1
+    assert result.deleted == []
+
+    result = uploader.sync(tasks, s3dir, delete=True, verbose=True)
+    assert [r.task for r in result.uploaded] == tasks[1:]
+    assert result.unchanged == tasks[:1]
+    assert result.deleted == ["sync/removed.svg"]
+    assert s3_client.get_object(Bucket=bucket, Key=hashed_key)["Body"].read()
+
+    result = uploader.sync(tasks, s3dir, delete=True)
+    assert result.uploaded == []
+    assert len(result.unchanged) == 2
+
+
+def test_upload_retry(s3_client):
+    tasks = [
+        UploadTask(
+            path=path_test_svg,
+            s3path=S3Path(f"s3://not-exists-bucket/{path_test_svg.name}"),
+        ),
+        UploadTask(
+            path=dir_tmp / "not-exists.svg",
+            s3path=S3Path(f"s3://{bucket}/not-exists.svg"),
+        ),
+    ]
+    uploader = R2Uploader(
+        s3_client=s3_client,
+        max_attempts=2,
+        backoff_base=0.01,
+    )
+    with pytest.raises(BatchRunError) as e:
+        uploader.upload(tasks)
+    assert set(e.value.failures) == {task.path for task in tasks}
+
+
+if __name__ == "__main__":
+    from my_icon_vault.tests import run_cov_test
+
+    run_cov_test(
+        __file__,
+        "my_icon_vault.uploader",
+        preview=False,
+    )
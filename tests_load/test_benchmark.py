@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+Load tests, run the benchmark suite over a small synthetic corpus::
+
+    pytest tests_load -s
+
+Increase ``CorpusSpec`` to measure scaling on a realistic vault size.
+"""
+
+import shutil
+
+import pytest
+import moto
+from s3pathlib import S3Path
+
+from my_icon_vault.benchmark import encode_png, CorpusSpec, Benchmark
+from my_icon_vault.uploader import new_s3_client
+from my_icon_vault.paths import dir_tmp, path_bin_svgo, path_bin_pngquant
+
+dir_root = dir_tmp / "benchmark"
+bucket = "my-icon-vault-load-test"
+
+
+def has_cairo() -> bool:
+    try:
+        import cairosvg  # noqa: F401
+    except OSError:
+        return False
+    return True
+
+
+def has_bin(path_bin) -> bool:
+    return shutil.which(str(path_bin)) is not None
+
+
+@pytest.fixture
+def benchmark():
+    benchmark = Benchmark(
+        spec=CorpusSpec(n_icons=50, n_paths=10, n_gradients=2, n_rasters=1),
+        dir_root=dir_root,
+        n_jobs=4,
+    )
+    yield benchmark
+    benchmark.print_table()
+
+
+def test_corpus():
+    assert encode_png(1, 1, b"\xff\x00\x00").startswith(b"\x89PNG")
+    spec = CorpusSpec(n_icons=3, n_gradients=1, n_rasters=1, raster_size=8)
+    paths_1 = spec.generate(dir_root / "corpus_1")
+    paths_2 = spec.generate(dir_root / "corpus_2")
+    # reproducible
+    assert [p.read_bytes() for p in paths_1] == [p.read_bytes() for p in paths_2]
+    content = paths_1[0].read_text()
+    assert "<linearGradient" in content
+    assert "data:image/png;base64," in content
+
+
+def test_manifest(benchmark):
+    benchmark.run(stages=["manifest"])
+    assert benchmark.results[0].icons_per_sec > 0
+
+
+def test_upload(benchmark):
+    with moto.mock_aws():
+        s3_client = new_s3_client(region_name="us-east-1", max_pool_connections=16)
+        s3_client.create_bucket(Bucket=bucket)
+        benchmark.run(
+            stages=["upload"],
+            s3_client=s3_client,
+            s3dir=S3Path(f"s3://{bucket}/icons/"),
+        )
+    assert [r.mode for r in benchmark.results] == ["serial", "parallel"]
+
+
+@pytest.mark.skipif(not has_bin(path_bin_svgo), reason="svgo is not installed")
+def test_svgo(benchmark):
+    benchmark.run(stages=["svgo"])
+
+
+@pytest.mark.skipif(not has_cairo(), reason="cairo is not installed")
+def test_svg2png(benchmark):
+    benchmark.run(stages=["svg2png"])
+
+
+@pytest.mark.skipif(
+    not (has_cairo() and has_bin(path_bin_pngquant)),
+    reason="cairo or pngquant is not installed",
+)
+def test_pngquant(benchmark):
+    benchmark.run(stages=["pngquant"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-s"])